@@ -2,6 +2,7 @@ import os
 import sys
 import re
 import time
+from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Add the directory containing this script to sys.path to ensure 'utils' can be imported
@@ -12,20 +13,27 @@ import yt_dlp
 from utils.logger import logger
 from utils.config import (
     CHANNELS_FILE, SCANNED_VIDEOS_FILE, COOKIES_FILE, 
-    ERROR_VIDEOS_FILE, REPORT_FILE, MAX_WORKERS, COOLDOWN_SECONDS
+    ERROR_VIDEOS_FILE, REPORT_FILE, MAX_WORKERS, COOLDOWN_SECONDS,
+    INCREMENTAL_SCAN, FULL_RESCAN_DAYS
 )
 from utils.cookie_parser import get_cookie_file
 from utils.downloader import process_video, download_plan_b_rescue, download_plan_c_rescue, is_video_in_archive
-from utils.bili_api import get_bilibili_channel_videos_fallback
+from utils.bili_api import get_bilibili_channel_videos_fallback, bvid_from_url
 from utils.caption_tool import run_caption_customizer
-from utils.scheduler import get_last_scan_date, update_last_scan_date
+from utils.scheduler import get_last_scan_date, update_last_scan_date, get_known_ids, update_known_ids
+from utils.prefetch import classify_scanned, ACCEPTED, ARCHIVED, TOO_LONG, SKIPPED_DATE
 
-def get_channel_videos(channel_url):
+def get_channel_videos(channel_url, known_ids=None):
     """
     Extracts video URLs from a given Bilibili channel/user URL.
+    known_ids: optional set of BV ids from the previous scan. The listing is then paged lazily
+    (newest first) and stops at the first known id, so a rescan only requests the newest page(s).
+    Returns (channel_name, video_urls, hit_known); hit_known tells whether a known id was reached,
+    i.e. video_urls only holds the videos uploaded since the previous scan.
     """
-    logger.info(f"Scanning channel: {channel_url}")
+    logger.info(f"Scanning channel: {channel_url}" + (" (incremental)" if known_ids else ""))
     video_urls = []
+    hit_known = False
     
     ydl_opts = {
         'extract_flat': 'in_playlist',
@@ -42,10 +50,17 @@ def get_channel_videos(channel_url):
 
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(channel_url, download=False)
+            # process=False leaves 'entries' unresolved: yt-dlp only requests the next page
+            # of the space listing while it is being iterated
+            info = ydl.extract_info(channel_url, download=False, process=not known_ids)
             
             if info and 'entries' in info:
                 for entry in info['entries']:
+                    if not entry:
+                        continue
+                    if known_ids and (entry.get('id') or bvid_from_url(entry.get('url'))) in known_ids:
+                        hit_known = True
+                        break
                     if entry.get('url'):
                         video_urls.append(entry['url'])
                     elif entry.get('id'):
@@ -54,23 +69,67 @@ def get_channel_videos(channel_url):
             else:
                 logger.warning(f"No entries found for {channel_url}")
                 
-        logger.info(f"Found {len(video_urls)} videos in channel {channel_url} using yt-dlp.")
+        if hit_known:
+            logger.info(f"Found {len(video_urls)} new videos in channel {channel_url} since the previous scan.")
+        else:
+            logger.info(f"Found {len(video_urls)} videos in channel {channel_url} using yt-dlp.")
         
         channel_name = channel_url
         if info:
             channel_name = info.get('uploader') or info.get('title') or channel_url
 
         # If yt-dlp fails to extract videos (Error 352 or silent fail), trigger fallback
-        if not video_urls:
+        if not video_urls and not hit_known:
             logger.warning(f"yt-dlp extracted no videos for {channel_url}. Attempting fallback API scraper...")
-            channel_name, video_urls = get_bilibili_channel_videos_fallback(channel_url)
+            channel_name, video_urls, hit_known = get_bilibili_channel_videos_fallback(channel_url, known_ids)
 
-        return channel_name, video_urls
+        return channel_name, video_urls, hit_known
 
     except Exception as e:
         logger.error(f"Failed to scan channel {channel_url} with yt-dlp: {str(e)}")
         logger.info(f"Server Block or Error detected! Auto-falling back to native bilibili-api-python scanner...")
-        return get_bilibili_channel_videos_fallback(channel_url)
+        return get_bilibili_channel_videos_fallback(channel_url, known_ids)
+
+def _known_ids_for(channel_url):
+    """
+    BV ids an incremental scan of the channel may stop at, or None when a full listing is due
+    (INCREMENTAL_SCAN off, channel never scanned, or last full listing older than FULL_RESCAN_DAYS).
+    """
+    if not INCREMENTAL_SCAN:
+        return None
+    newest_ids, last_full_scan = get_known_ids(channel_url)
+    if not newest_ids or not last_full_scan:
+        return None
+    try:
+        age_days = (datetime.now() - datetime.strptime(last_full_scan, '%Y%m%d')).days
+    except ValueError:
+        return None
+    return set(newest_ids) if age_days < FULL_RESCAN_DAYS else None
+
+# Line under each scanned_videos.txt section header holding the channel URL (ignored as a comment elsewhere)
+SCANNED_URL_PREFIX = '# channel_url:'
+
+def _read_scanned_sections():
+    """
+    Previous SCANNED_VIDEOS_FILE as {channel_url: [urls]}.
+    Sections are keyed by the `# channel_url:` line under each header; files written before
+    that line existed fall back to the channel name from the header.
+    """
+    sections = {}
+    if not os.path.exists(SCANNED_VIDEOS_FILE):
+        return sections
+    current = None
+    with open(SCANNED_VIDEOS_FILE, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            match = re.match(r'^# === \[ (.*) \] ===$', line)
+            if match:
+                current = match.group(1)
+            elif line.startswith(SCANNED_URL_PREFIX):
+                current = line[len(SCANNED_URL_PREFIX):].strip()
+            elif line and not line.startswith('#'):
+                sections.setdefault(current, []).append(line)
+    return sections
 
 def scan_channels():
     if not os.path.exists(CHANNELS_FILE):
@@ -92,9 +151,22 @@ def scan_channels():
     all_scanned_data = []
     total_videos = 0
     
+    # An incremental scan only lists new uploads: videos from the previous scan that were
+    # not downloaded yet are carried over from the old scanned list.
+    previous_sections = _read_scanned_sections()
+
     def _scan_worker(channel_url):
         time.sleep(COOLDOWN_SECONDS) # Cooldown before starting work
-        c_name, urls = get_channel_videos(channel_url)
+        known_ids = _known_ids_for(channel_url)
+        c_name, urls, hit_known = get_channel_videos(channel_url, known_ids)
+        
+        new_ids = [bvid_from_url(u) for u in urls]
+        if hit_known:
+            update_known_ids(channel_url, new_ids + list(get_known_ids(channel_url)[0]))
+            # Keyed by channel URL: the name can differ between scans (e.g. the `UID_<n>` fallback)
+            urls = urls + (previous_sections.get(channel_url) or previous_sections.get(c_name, []))
+        elif urls:
+            update_known_ids(channel_url, new_ids, full_scan=True)
         urls = list(dict.fromkeys(urls)) # remove duplicates
         
         # Pre-emptively filter out videos already in downloaded archive
@@ -103,23 +175,24 @@ def scan_channels():
         if len(urls) < original_count:
             logger.info(f"Filtered {original_count - len(urls)} already downloaded videos from {c_name} scan results.")
             
-        return c_name, urls
+        return c_name, channel_url, urls
 
     with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
         future_to_url = {executor.submit(_scan_worker, url): url for url in channels_to_scan}
         for future in as_completed(future_to_url):
             try:
-                channel_name, urls = future.result()
+                channel_name, channel_url, urls = future.result()
                 if urls:
-                    all_scanned_data.append((channel_name, urls))
+                    all_scanned_data.append((channel_name, channel_url, urls))
                     total_videos += len(urls)
             except Exception as e:
                 logger.error(f"Scan worker failed: {e}")
             
     if all_scanned_data:
         with open(SCANNED_VIDEOS_FILE, 'w', encoding='utf-8') as f:
-            for channel_name, urls in all_scanned_data:
+            for channel_name, channel_url, urls in all_scanned_data:
                 f.write(f"\n# === [ {channel_name} ] ===\n")
+                f.write(f"{SCANNED_URL_PREFIX} {channel_url}\n")
                 for url in urls:
                     f.write(f"{url}\n")
         logger.info(f"Successfully saved {total_videos} video URLs to {SCANNED_VIDEOS_FILE}")
@@ -179,7 +252,27 @@ def download_scanned():
         logger.info("Smart Scheduler mode activated.")
         use_smart_scheduler = True
         
-    logger.info(f"Starting concurrent download for {len(video_urls)} videos using {MAX_WORKERS} workers...")
+    def _date_after_for(url):
+        # If smart scheduler is strictly requested, we must find the channel URL that corresponds to this video.
+        # However, video URLs don't explicitly contain the channel info natively before yt-dlp extracts info.
+        # SCANNED_VIDEOS_FILE has the channel name in the `# === [ Channel Name ] ===` headers, so we use that mapping.
+        channel_name = video_channel_map.get(url)
+        if use_smart_scheduler and channel_name:
+            # We strictly use the Channel Name as the key in the JSON database for convenience
+            last_date = get_last_scan_date(channel_name)
+            if last_date:
+                logger.debug(f"Smart Scheduler: Using date {last_date} for {url} (Channel: {channel_name})")
+                return last_date
+        return date_after
+
+    # Prefetch lightweight metadata for every scanned video first, so rejected videos
+    # (too long / outside the date window / already archived) never occupy a download worker.
+    # Resolved once up front: update_last_scan_date during the run must not move the window
+    date_after_map = {url: _date_after_for(url) for url in video_urls}
+    classified = classify_scanned(video_urls, date_after_map.get)
+    accepted_urls = [u for u, (category, _meta) in classified.items() if category in ACCEPTED]
+
+    logger.info(f"Starting concurrent download for {len(accepted_urls)} of {len(video_urls)} videos using {MAX_WORKERS} workers...")
     
     # Reset report file
     if os.path.exists(REPORT_FILE):
@@ -190,26 +283,10 @@ def download_scanned():
     skipped_urls = []
     blacklisted_urls = []
     
-    def _dl_worker(url, d_after, use_scheduler):
+    def _dl_worker(url, meta):
         time.sleep(COOLDOWN_SECONDS) # Add safe delay
-        
-        # If smart scheduler is strictly requested, we must find the channel URL that corresponds to this video.
-        # However, video URLs don't explicitly contain the channel info natively before yt-dlp extracts info.
-        # If smart scheduler is strictly requested, we have to look up the uploader ID. 
-        # But wait, we can't efficiently map video URL -> channel URL without an API call, unless we pass down the channel context from scan...
-        # Wait, SCANNED_VIDEOS_FILE has the channel name in the `# === [ Channel Name ] ===` headers!
-        # This design needs the channel name mapping to video url.
-        final_date_after = d_after
         channel_name = video_channel_map.get(url)
-        
-        if use_scheduler and channel_name:
-            # We strictly use the Channel Name as the key in the JSON database for convenience
-            last_date = get_last_scan_date(channel_name)
-            if last_date:
-                final_date_after = last_date
-                logger.debug(f"Smart Scheduler: Using date {last_date} for {url} (Channel: {channel_name})")
-                
-        status = process_video(url, final_date_after)
+        status = process_video(url, date_after_map.get(url), meta=meta)
         
         # Auto-Fallback logic for scanned videos
         if status == "error":
@@ -233,6 +310,7 @@ def download_scanned():
             f.write(f"Total Processed: {len(success_urls) + len(skipped_urls) + len(failed_urls) + len(blacklisted_urls)} / {len(video_urls)}\n")
             f.write(f"Successful: {len(success_urls)}\n")
             f.write(f"Skipped (Date Filter): {len(skipped_urls)}\n")
+            f.write(f"Blacklisted (Too Long): {len(blacklisted_urls)}\n")
             f.write(f"Failed: {len(failed_urls)}\n\n")
             f.write(f"Untuk melihat daftar tautan video yang gagal (Error), silakan buka file: {os.path.basename(ERROR_VIDEOS_FILE)}\n")
                 
@@ -246,8 +324,18 @@ def download_scanned():
             with open(ERROR_VIDEOS_FILE, 'a', encoding='utf-8') as f:
                 f.write(f"{url}\n")
 
+    # Videos settled by the prefetch stage go straight into the report
+    for url, (category, _meta) in classified.items():
+        if category == ARCHIVED:
+            success_urls.append(url)
+        elif category == TOO_LONG:
+            blacklisted_urls.append(url)
+        elif category == SKIPPED_DATE:
+            skipped_urls.append(url)
+    _update_live_report()
+
     with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        future_to_url = {executor.submit(_dl_worker, url, date_after, use_smart_scheduler): url for url in video_urls}
+        future_to_url = {executor.submit(_dl_worker, url, classified[url][1]): url for url in accepted_urls}
         for future in as_completed(future_to_url):
             url = future_to_url[future]
             try:
@@ -278,6 +366,11 @@ def download_scanned():
             # Live write the report after every single completion
             _update_live_report()
             
+    if use_smart_scheduler:
+        archived_channels = {video_channel_map.get(u) for u, (category, _meta) in classified.items() if category == ARCHIVED}
+        for channel in archived_channels - {None}:
+            update_last_scan_date(channel)
+
     logger.info("All downloads completed.")
     
     if failed_urls:
@@ -0,0 +1,95 @@
+import os
+import re
+import threading
+from .logger import logger
+from .config import ARCHIVE_FILE
+
+_PART_SUFFIX = re.compile(r'_p\d+$')
+
+class ArchiveSet:
+    """
+    In-memory view of yt-dlp's downloaded_archive.txt ("bilibili <id>" per line).
+    - Loaded once into a set; each lookup only stats the file. New lines appended
+      by yt-dlp (download_archive) are picked up with a tail read from the last
+      known offset; a truncated or replaced file is reloaded in full.
+    - add() appends under a lock, so concurrent workers never interleave lines.
+    """
+
+    def __init__(self, path=ARCHIVE_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._ids = set()
+        self._offset = 0
+        self._inode = None
+        self._mtime = None
+
+    def _ingest(self, text):
+        for line in text.splitlines():
+            parts = line.strip().split()
+            if len(parts) >= 2 and parts[0].lower() == 'bilibili':
+                self._ids.add(parts[1])
+                # multi-part entries ("BVxxx_p2") also count as the BV id itself,
+                # like the old substring search did
+                self._ids.add(_PART_SUFFIX.sub('', parts[1]))
+
+    def _sync(self):
+        # caller holds self._lock
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._ids, self._offset, self._inode, self._mtime = set(), 0, None, None
+            return
+        if st.st_ino == self._inode and st.st_size == self._offset and st.st_mtime_ns == self._mtime:
+            return
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            self._ids, self._offset = set(), 0
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self._offset)
+                chunk = f.read()
+        except OSError as e:
+            logger.warning(f"Could not read archive {self.path}: {e}")
+            return
+        # only consume complete lines; a half-written last line is read next time
+        end = chunk.rfind(b'\n') + 1
+        if end:
+            self._ingest(chunk[:end].decode('utf-8', errors='ignore'))
+            self._offset += end
+        self._inode = st.st_ino
+        self._mtime = st.st_mtime_ns if self._offset == st.st_size else None
+
+    def contains(self, video_id):
+        with self._lock:
+            self._sync()
+            return video_id in self._ids
+
+    def add(self, video_id):
+        """
+        Appends "bilibili <id>" unless the id is already archived. Returns True if written.
+        """
+        with self._lock:
+            self._sync()
+            if video_id in self._ids:
+                return False
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(f"bilibili {video_id}\n")
+            self._ids.add(video_id)
+            return True
+
+    def __len__(self):
+        with self._lock:
+            self._sync()
+            return len(self._ids)
+
+_ARCHIVE = None
+_ARCHIVE_LOCK = threading.Lock()
+
+def get_archive():
+    """
+    Shared ArchiveSet for ARCHIVE_FILE.
+    """
+    global _ARCHIVE
+    with _ARCHIVE_LOCK:
+        if _ARCHIVE is None:
+            _ARCHIVE = ArchiveSet()
+        return _ARCHIVE
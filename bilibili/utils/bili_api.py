@@ -2,14 +2,176 @@ import os
 import re
 import json
 import subprocess
+import threading
+import http.client
+from datetime import datetime, timezone
+from urllib.parse import urlencode
 from .logger import logger
 from .config import COOKIES_JSON_FILE, COOKIES_FILE
 from .cookie_parser import get_cookie_file
 
-def get_bilibili_channel_videos_fallback(channel_url):
+API_HOST = "api.bilibili.com"
+API_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Referer': 'https://www.bilibili.com/',
+    'Accept': 'application/json',
+}
+
+def bvid_from_url(video_url):
+    """
+    Returns the BV id inside a Bilibili video URL (or a bare BV id), else None.
+    """
+    match = re.search(r'(BV[a-zA-Z0-9]{10})', video_url or "")
+    return match.group(1) if match else None
+
+class BiliClient:
+    """
+    Small JSON client for api.bilibili.com over keep-alive connections
+    (one persistent HTTPS connection per thread, so worker threads never pay
+    a fresh TCP/TLS handshake per call).
+    View payloads are normalized and cached per BV id for the whole process.
+    """
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._views = {}  # bvid -> normalized meta, or None for a definitive API error
+        self._tags = {}
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = http.client.HTTPSConnection(API_HOST, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _drop_conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._local.conn = None
+
+    def get_json(self, path, params):
+        """
+        GET https://api.bilibili.com<path>?<params> and decode the JSON body.
+        A stale keep-alive connection is reopened once before giving up.
+        """
+        url = f"{path}?{urlencode(params)}"
+        for attempt in (1, 2):
+            conn = self._conn()
+            try:
+                conn.request('GET', url, headers=API_HEADERS)
+                resp = conn.getresponse()
+                body = resp.read()
+                if resp.will_close:
+                    self._drop_conn()
+                if resp.status != 200:
+                    raise RuntimeError(f"HTTP {resp.status} from {API_HOST}{path}")
+                return json.loads(body.decode('utf-8'))
+            except (http.client.HTTPException, OSError):
+                self._drop_conn()
+                if attempt == 2:
+                    raise
+
+    @staticmethod
+    def _normalize(bvid, data):
+        dim = data.get('dimension') or {}
+        width, height = dim.get('width'), dim.get('height')
+        if dim.get('rotate'):
+            width, height = height, width
+        owner = data.get('owner') or {}
+        pubdate = data.get('pubdate')
+        upload_date = None
+        if pubdate:
+            upload_date = datetime.fromtimestamp(pubdate, timezone.utc).strftime('%Y%m%d')
+        return {
+            'id': data.get('bvid') or bvid,
+            'title': data.get('title') or 'Unknown Title',
+            'uploader': owner.get('name') or 'unknown_uploader',
+            'uploader_id': owner.get('mid'),
+            'duration': data.get('duration') or 0,
+            'width': width,
+            'height': height,
+            'timestamp': pubdate,
+            'upload_date': upload_date,
+            'pages': len(data.get('pages') or []) or 1,
+        }
+
+    def view(self, bvid):
+        """
+        Normalized /x/web-interface/view metadata for a BV id (cached).
+        Returns None if the API refuses the id or the request fails.
+        """
+        with self._lock:
+            if bvid in self._views:
+                return self._views[bvid]
+        try:
+            payload = self.get_json('/x/web-interface/view', {'bvid': bvid})
+        except Exception as e:
+            logger.warning(f"Could not fetch metadata for {bvid} via BiliAPI: {e}")
+            return None  # network problem: not cached, next call retries
+        meta = None
+        if payload.get('code') == 0 and payload.get('data'):
+            meta = self._normalize(bvid, payload['data'])
+        else:
+            logger.warning(f"BiliAPI view refused {bvid}: code {payload.get('code')} {payload.get('message', '')}")
+        with self._lock:
+            self._views[bvid] = meta
+        return meta
+
+    def tags(self, bvid):
+        """
+        Tag names for a BV id (used for the caption file). Empty list on failure.
+        """
+        with self._lock:
+            if bvid in self._tags:
+                return self._tags[bvid]
+        names = []
+        try:
+            payload = self.get_json('/x/tag/archive/tags', {'bvid': bvid})
+            if payload.get('code') == 0:
+                names = [t.get('tag_name') for t in payload.get('data') or [] if t.get('tag_name')]
+        except Exception as e:
+            logger.debug(f"Could not fetch tags for {bvid}: {e}")
+            return names
+        with self._lock:
+            self._tags[bvid] = names
+        return names
+
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+def get_bili_client():
+    """
+    Shared BiliClient (one metadata cache + keep-alive connections per thread).
+    """
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = BiliClient()
+        return _CLIENT
+
+def get_video_meta(video_url):
+    """
+    Cached view metadata (id, title, uploader, duration, width, height,
+    upload_date) for a Bilibili video URL or BV id, or None.
+    """
+    bvid = bvid_from_url(video_url)
+    if not bvid:
+        return None
+    return get_bili_client().view(bvid)
+
+def get_bilibili_channel_videos_fallback(channel_url, known_ids=None):
     """
     Fallback method to fetch Bilibili channel videos using specialized yt-dlp subprocess 
     configured to evade Bilibili's Error 412 server blocks.
+    known_ids: optional set of BV ids from the previous scan. The playlist is then read lazily
+    and the subprocess is stopped at the first known id, so only the newest page(s) are requested.
+    Returns (channel_name, video_urls, hit_known) where hit_known tells whether a known id was reached.
     """
     logger.info(f"Initiating Tactical yt-dlp Fallback Scanner for: {channel_url}")
 
@@ -20,6 +182,7 @@ def get_bilibili_channel_videos_fallback(channel_url):
         channel_name = f"UID_{match.group(1)}"
 
     video_urls = []
+    hit_known = False
     try:
         # We spawn a totally isolated yt-dlp instance with parameters to spoof an android client/slow down requests
         # --extractor-args "bilibili:player_client=android" or simply dumping flat JSON
@@ -30,6 +193,9 @@ def get_bilibili_channel_videos_fallback(channel_url):
             '--extractor-retries', '5',
             '--sleep-requests', '0.5'
         ]
+        if known_ids:
+            # print entries as pages arrive instead of after the whole playlist was fetched
+            cmd.append('--lazy-playlist')
         
         cookie_path = get_cookie_file()
         if cookie_path:
@@ -37,38 +203,54 @@ def get_bilibili_channel_videos_fallback(channel_url):
             
         cmd.append(channel_url)
         
-        result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='ignore')
-        
-        if result.returncode == 0:
-            lines = result.stdout.strip().split('\n')
-            for line in lines:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                text=True, encoding='utf-8', errors='ignore')
+        # stderr is drained in the background so a chatty yt-dlp can never block on a full pipe
+        stderr_lines = []
+        stderr_reader = threading.Thread(target=lambda: stderr_lines.extend(proc.stderr), daemon=True)
+        stderr_reader.start()
+        try:
+            for line in proc.stdout:
                 if not line.strip(): continue
                 try:
                     data = json.loads(line)
-                    url = data.get('url') or data.get('webpage_url')
-                    _id = data.get('id')
-                    
-                    if url:
-                        video_urls.append(url)
-                    elif _id:
-                        video_urls.append(f"https://www.bilibili.com/video/{_id}")
-                        
-                    # Attempt to grab the channel name dynamically from the first video if possible
-                    if channel_name.startswith("UID_") and data.get('uploader'):
-                        channel_name = data.get('uploader')
-                        
                 except json.JSONDecodeError:
                     continue
+                url = data.get('url') or data.get('webpage_url')
+                _id = data.get('id') or bvid_from_url(url)
+                
+                if known_ids and _id in known_ids:
+                    hit_known = True
+                    break
                     
-        else:
-            logger.error(f"Tactical subprocess scanner also failed. Output: {result.stderr[:300]}")
+                if url:
+                    video_urls.append(url)
+                elif _id:
+                    video_urls.append(f"https://www.bilibili.com/video/{_id}")
+                    
+                # Attempt to grab the channel name dynamically from the first video if possible
+                if channel_name.startswith("UID_") and data.get('uploader'):
+                    channel_name = data.get('uploader')
+        finally:
+            if hit_known:
+                proc.terminate()
+            proc.stdout.close()
+            returncode = proc.wait()
+            stderr_reader.join(timeout=5)
+            
+        if returncode != 0 and not hit_known:
+            # a partial listing is not trusted (it would hide the older videos from the next incremental scan)
+            video_urls = []
+            logger.error(f"Tactical subprocess scanner also failed. Output: {''.join(stderr_lines)[:300]}")
             
     except Exception as e:
         logger.error(f"Tactical fallback crashed for {channel_url}: {str(e)}")
         
-    if video_urls:
+    if hit_known:
+        logger.info(f"Tactical scanner stopped at the first known video: Found {len(video_urls)} new videos for {channel_name}.")
+    elif video_urls:
         logger.info(f"Tactical scanner successfully penetrated block: Found {len(video_urls)} videos for {channel_name}.")
     else:
         logger.warning(f"Tactical scanner found no videos (Block intact or channel empty).")
         
-    return channel_name, video_urls
+    return channel_name, video_urls, hit_known
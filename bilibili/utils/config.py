@@ -18,6 +18,7 @@ COOKIES_JSON_FILE = os.path.join(BASE_DIR, 'cookies.json')
 ERROR_VIDEOS_FILE = os.path.join(BASE_DIR, 'video_error_list.txt')
 ARCHIVE_FILE = os.path.join(BASE_DIR, 'downloaded_archive.txt')
 REPORT_FILE = os.path.join(BASE_DIR, 'download_report.txt')
+SEQUENCE_DB = os.path.join(BASE_DIR, 'sequence.db')
 
 # Ensure directories exist
 os.makedirs(SHORTS_DIR, exist_ok=True)
@@ -35,3 +36,7 @@ MAX_DURATION = 60 # Maximum allowed duration in seconds
 # Threading Configurations
 MAX_WORKERS = 5 # Number of concurrent downloads/scans. Keep low (3-5) to avoid Bilibili block.
 COOLDOWN_SECONDS = 2 # Delay between consecutive thread dispatches to prevent spamming server
+
+# Scan Configurations
+INCREMENTAL_SCAN = True # Rescans stop paging at the newest BV id seen by the previous scan (see utils/scheduler.py)
+FULL_RESCAN_DAYS = 7 # Force a full channel listing at least this often (catches anything an incremental scan missed)
@@ -1,5 +1,4 @@
 import os
-import json
 import subprocess
 import glob
 import re
@@ -10,6 +9,9 @@ from .config import (
     EXPECTED_ASPECT_RATIO, ASPECT_RATIO_TOLERANCE, COOKIES_FILE, ARCHIVE_FILE, MAX_DURATION
 )
 from .cookie_parser import get_cookie_file
+from .bili_api import get_video_meta, get_bili_client
+from .archive import get_archive
+from .sequence import next_sequence
 
 def is_vertical_video(width, height):
     """
@@ -74,23 +76,14 @@ def download_with_you_get(video_url, output_dir, file_name):
 
 def is_video_in_archive(video_url):
     """
-    Checks if a video was already downloaded by parsing its BV ID against the central yt-dlp archive.
+    Checks if a video was already downloaded by looking its BV ID up in the central yt-dlp archive
+    (in-memory set kept in sync with downloaded_archive.txt).
     """
-    import os
     match = re.search(r'video/(BV[a-zA-Z0-9]+)', video_url)
     if not match:
         return False
         
-    video_id = match.group(1)
-    if not os.path.exists(ARCHIVE_FILE):
-        return False
-        
-    with open(ARCHIVE_FILE, 'r', encoding='utf-8') as f:
-        content = f.read()
-        if f"bilibili {video_id}" in content:
-            return True
-            
-    return False
+    return get_archive().contains(match.group(1))
 
 def mark_video_in_archive(video_url):
     """
@@ -101,39 +94,50 @@ def mark_video_in_archive(video_url):
     if match:
         video_id = match.group(1)
         try:
-            with open(ARCHIVE_FILE, 'a', encoding='utf-8') as f:
-                f.write(f"bilibili {video_id}\n")
+            get_archive().add(video_id)
         except Exception as e:
             logger.warning(f"Could not append to archive: {e}")
 
 def is_video_too_long(video_url):
     """
-    Directly queries Bilibili's public API to retrieve video duration in seconds.
+    Uses the cached BiliAPI view metadata (keep-alive client) to get the video duration in seconds.
     If it exceeds MAX_DURATION, returns True. Helps rescue scrapers avoid downloading movies.
     """
-    import urllib.request
-    match = re.search(r'video/(BV[a-zA-Z0-9]+)', video_url)
-    if not match:
+    meta = get_video_meta(video_url)
+    if not meta:
         return False
-        
-    bvid = match.group(1)
-    api_url = f"https://api.bilibili.com/x/web-interface/view?bvid={bvid}"
-    
-    try:
-        req = urllib.request.Request(api_url, headers={'User-Agent': 'Mozilla/5.0'})
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = json.loads(response.read().decode('utf-8'))
-            if data.get('code') == 0:
-                duration_seconds = data.get('data', {}).get('duration', 0)
-                if duration_seconds > MAX_DURATION:
-                    logger.warning(f"Video {bvid} duration ({duration_seconds}s) exceeds MAX_DURATION ({MAX_DURATION}s). Blacklisting.")
-                    mark_video_in_archive(video_url)
-                    return True
-    except Exception as e:
-        logger.warning(f"Could not verify length for {bvid} via BiliAPI: {e}")
-        
+
+    duration_seconds = meta.get('duration') or 0
+    if duration_seconds > MAX_DURATION:
+        logger.warning(f"Video {meta['id']} duration ({duration_seconds}s) exceeds MAX_DURATION ({MAX_DURATION}s). Blacklisting.")
+        mark_video_in_archive(video_url)
+        return True
+
     return False
 
+def passes_date_filter(meta, date_after):
+    """
+    True if the video's pubdate (from view metadata) is on/after date_after.
+    date_after accepts the same strings as yt-dlp's --dateafter ("YYYYMMDD", "today-3days").
+    Unknown dates pass, yt-dlp still applies dateafter during the download.
+    """
+    if not date_after or not meta.get('upload_date'):
+        return True
+    try:
+        from yt_dlp.utils import DateRange
+        return meta['upload_date'] in DateRange(date_after, None)
+    except Exception:
+        return True
+
+def expected_height(width, height):
+    """
+    Height yt-dlp will end up with for a vertical video under the 1080x1920 format cap.
+    """
+    if not width or not height:
+        return height
+    scale = min(1.0, 1080 / width, 1920 / height)
+    return int(round(height * scale))
+
 def download_plan_b_rescue(video_url):
     """
     Emergency fallback method using you-get. Disregards normal resolution parsing 
@@ -211,9 +215,30 @@ def download_plan_c_rescue(video_url):
         logger.error(f"Exception during Plan C rescue for {video_url}: {str(e)}")
         return "error"
 
-def process_video(video_url, date_after=None):
+def _info_from_meta(meta):
+    """
+    Maps BiliAPI view metadata to the info fields process_video uses.
+    """
+    width, height = meta.get('width'), meta.get('height')
+    if is_vertical_video(width, height):
+        height = expected_height(width, height)
+    return {
+        'title': meta.get('title', 'Unknown Title'),
+        'width': width,
+        'height': height,
+        'duration': meta.get('duration', 0),
+        'ext': 'mp4',
+        'id': meta.get('id', 'unknown_id'),
+        'uploader': meta.get('uploader', 'unknown_uploader'),
+        'tags': get_bili_client().tags(meta['id']),
+    }
+
+def process_video(video_url, date_after=None, meta=None):
     """
-    Extract video info, check aspect ratio/duration, date filter, and download if criteria met.
+    Check aspect ratio/duration, date filter, and download if criteria met.
+    Duration, orientation and date come from the BiliAPI view metadata (cached,
+    `meta` if the caller already prefetched it); yt-dlp extract_info is only used
+    when that metadata is unavailable or lacks the width/height.
     Returns: 'success', 'error', 'skipped_duration', or 'skipped_date'
     """
     if is_video_in_archive(video_url):
@@ -222,23 +247,35 @@ def process_video(video_url, date_after=None):
         
     logger.info(f"Processing video: {video_url}")
     
-    ydl_opts_info = {
-        'skip_download': True,
-        'quiet': True,
-        'no_warnings': True,
-        'extract_flat': False, # We need full info for width/height
-    }
-    
-    if date_after:
-        ydl_opts_info['dateafter'] = date_after
-    
     cookie_path = get_cookie_file()
-    if cookie_path:
-        ydl_opts_info['cookiefile'] = cookie_path
+
+    if meta is None:
+        meta = get_video_meta(video_url)
 
     try:
-        with yt_dlp.YoutubeDL(ydl_opts_info) as ydl:
-            info = ydl.extract_info(video_url, download=False)
+        if meta and not passes_date_filter(meta, date_after):
+            logger.warning(f"Video {video_url} skipped by date filter (uploaded {meta['upload_date']}).")
+            return "skipped_date"
+        if meta and meta.get('width') and meta.get('height'):
+            info = _info_from_meta(meta)
+        else:
+            if meta:
+                logger.info(f"View metadata for {video_url} has no dimensions, falling back to yt-dlp extract_info.")
+            ydl_opts_info = {
+                'skip_download': True,
+                'quiet': True,
+                'no_warnings': True,
+                'extract_flat': False, # We need full info for width/height
+            }
+            
+            if date_after:
+                ydl_opts_info['dateafter'] = date_after
+            
+            if cookie_path:
+                ydl_opts_info['cookiefile'] = cookie_path
+
+            with yt_dlp.YoutubeDL(ydl_opts_info) as ydl:
+                info = ydl.extract_info(video_url, download=False)
             
             # Check if video was filtered out by date plugin natively before throwing error
             # If so, info dictionary won't have the normal fields appropriately, but usually it raises an exception "Video date is smaller than..."
@@ -246,111 +283,116 @@ def process_video(video_url, date_after=None):
             if info is None:
                 logger.warning(f"Video {video_url} skipped by yt-dlp date filter.")
                 return "skipped_date"
-                
-            title = info.get('title', 'Unknown Title')
-            width = info.get('width')
-            height = info.get('height')
-            duration = info.get('duration', 0)
-            ext = info.get('ext', 'mp4')
-            video_id = info.get('id', 'unknown_id')
-            uploader = info.get('uploader', 'unknown_uploader')
-            
-            # Sanitize filename
-            safe_title = "".join([c for c in title if c.isalpha() or c.isdigit() or c==' ']).rstrip()
-            file_name = f"{uploader}_{video_id}_{safe_title}.{ext}"
-            
-            logger.debug(f"Video Data - ID: {video_id}, Title: {title}, Width: {width}, Height: {height}, Duration: {duration}s")
 
-            if not width or not height:
-                logger.warning(f"Could not determine dimensions for {video_url}. Skipping.")
-                return "error"
-                
-            if duration and duration > MAX_DURATION:
-                logger.warning(f"Video duration ({duration}s) exceeds MAX_DURATION ({MAX_DURATION}s). Blacklisting {video_url}.")
-                mark_video_in_archive(video_url)
-                return "blacklisted_duration"
+        return _download_with_info(video_url, info, date_after, cookie_path)
 
-            if is_vertical_video(width, height):
-                logger.info(f"Vertical video detected (9:16). Dimensions: {width}x{height}")
-                base_dir = SHORTS_DIR
-                is_short = True
-            else:
-                logger.info(f"Horizontal/Long video detected. Dimensions: {width}x{height}")
-                base_dir = LONG_VIDEOS_DIR
-                is_short = False
+    except Exception as e:
+        logger.error(f"Failed to process video {video_url} with yt-dlp: {str(e)}")
+        return "error"
 
-            # Create Resolution Subfolder (e.g., 1080p, 720p)
-            res_folder = f"{height}p" if height else "Unknown"
-            output_dir = os.path.join(base_dir, uploader, res_folder)
+def _download_with_info(video_url, info, date_after, cookie_path):
+    """
+    Classifies the video (duration / orientation / resolution folder) and downloads it.
+    """
+    title = info.get('title', 'Unknown Title')
+    width = info.get('width')
+    height = info.get('height')
+    duration = info.get('duration', 0)
+    ext = info.get('ext', 'mp4')
+    video_id = info.get('id', 'unknown_id')
+    uploader = info.get('uploader', 'unknown_uploader')
+    
+    # Sanitize filename
+    safe_title = "".join([c for c in title if c.isalpha() or c.isdigit() or c==' ']).rstrip()
+    file_name = f"{uploader}_{video_id}_{safe_title}.{ext}"
+    
+    logger.debug(f"Video Data - ID: {video_id}, Title: {title}, Width: {width}, Height: {height}, Duration: {duration}s")
 
-            os.makedirs(output_dir, exist_ok=True)
+    if not width or not height:
+        logger.warning(f"Could not determine dimensions for {video_url}. Skipping.")
+        return "error"
+        
+    if duration and duration > MAX_DURATION:
+        logger.warning(f"Video duration ({duration}s) exceeds MAX_DURATION ({MAX_DURATION}s). Blacklisting {video_url}.")
+        mark_video_in_archive(video_url)
+        return "blacklisted_duration"
 
-            # Determine Sequence Number based on existing files in the directory
-            # Count the existing `.mp4` or `.txt` files to assign the next number
-            existing_files = [f for f in os.listdir(output_dir) if f.endswith('.mp4')]
-            seq_num = len(existing_files) + 1
-            
-            # Format: 001 - Title - Uploader.mp4
-            numbered_title = f"{seq_num:03d} - {safe_title} - {uploader}"
-            
-            # Primary download attempt with yt-dlp
-            output_template = os.path.join(output_dir, f"{numbered_title}.%(ext)s")
-            
-            ydl_opts_download = {
-                'format': 'bestvideo[width<=1080][height<=1920]+bestaudio/best[width<=1080][height<=1920]/best',
-                'outtmpl': output_template,
-                'quiet': False,
-                'no_warnings': True,
-                'download_archive': ARCHIVE_FILE
-            }
-            if date_after:
-                ydl_opts_download['dateafter'] = date_after
-                
-            if cookie_path:
-                ydl_opts_download['cookiefile'] = cookie_path
+    if is_vertical_video(width, height):
+        logger.info(f"Vertical video detected (9:16). Dimensions: {width}x{height}")
+        base_dir = SHORTS_DIR
+        is_short = True
+    else:
+        logger.info(f"Horizontal/Long video detected. Dimensions: {width}x{height}")
+        base_dir = LONG_VIDEOS_DIR
+        is_short = False
 
-            # Create Caption .txt File
-            txt_path = os.path.join(output_dir, f"{numbered_title}.txt")
-            tags = " ".join([f"#{t}" for t in info.get('tags', [])]) if info.get('tags') else ""
-            
-            # Format according to user template
-            caption_content = f"{title}\n\nBilibili: {uploader}\nLink: {video_url}\n\n{tags}\n"
+    # Create Resolution Subfolder (e.g., 1080p, 720p)
+    res_folder = f"{height}p" if height else "Unknown"
+    output_dir = os.path.join(base_dir, uploader, res_folder)
 
-            try:
-                # Write caption file first
-                with open(txt_path, 'w', encoding='utf-8') as f:
-                    f.write(caption_content)
-                logger.info(f"Generated caption file: {txt_path}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Determine Sequence Number from the per-directory allocator (atomic across worker threads,
+    # never reuses a number; repaired once per run from the existing `NNN - ` files)
+    seq_num = next_sequence(output_dir)
+    
+    # Format: 001 - Title - Uploader.mp4
+    numbered_title = f"{seq_num:03d} - {safe_title} - {uploader}"
+    
+    # Primary download attempt with yt-dlp
+    output_template = os.path.join(output_dir, f"{numbered_title}.%(ext)s")
+    
+    ydl_opts_download = {
+        'format': 'bestvideo[width<=1080][height<=1920]+bestaudio/best[width<=1080][height<=1920]/best',
+        'outtmpl': output_template,
+        'quiet': False,
+        'no_warnings': True,
+        'download_archive': ARCHIVE_FILE
+    }
+    if date_after:
+        ydl_opts_download['dateafter'] = date_after
+        
+    if cookie_path:
+        ydl_opts_download['cookiefile'] = cookie_path
+
+    # Create Caption .txt File
+    txt_path = os.path.join(output_dir, f"{numbered_title}.txt")
+    tags = " ".join([f"#{t}" for t in info.get('tags', [])]) if info.get('tags') else ""
+    
+    # Format according to user template
+    caption_content = f"{title}\n\nBilibili: {uploader}\nLink: {video_url}\n\n{tags}\n"
+
+    try:
+        # Write caption file first
+        with open(txt_path, 'w', encoding='utf-8') as f:
+            f.write(caption_content)
+        logger.info(f"Generated caption file: {txt_path}")
+        
+        logger.info(f"Downloading with yt-dlp to {output_dir}")
+        
+        try:
+            with yt_dlp.YoutubeDL(ydl_opts_download) as ydl_dl:
+                ydl_dl.download([video_url])
+        except Exception as dl_e:
+            error_msg = str(dl_e).lower()
+            if "premium member" in error_msg or "format(s)" in error_msg:
+                logger.warning(f"Premium Format Error for {video_url}. Downgrading resolution to highest free available and retrying...")
                 
-                logger.info(f"Downloading with yt-dlp to {output_dir}")
+                # Fallback Format String (Limit to 30fps to avoid 60fps premium locks, or step down to 720p)
+                ydl_opts_download['format'] = 'bestvideo[height<=1080][fps<=30]+bestaudio / bestvideo[height<=720]+bestaudio / best'
                 
-                try:
-                    with yt_dlp.YoutubeDL(ydl_opts_download) as ydl_dl:
-                        ydl_dl.download([video_url])
-                except Exception as dl_e:
-                    error_msg = str(dl_e).lower()
-                    if "premium member" in error_msg or "format(s)" in error_msg:
-                        logger.warning(f"Premium Format Error for {video_url}. Downgrading resolution to highest free available and retrying...")
-                        
-                        # Fallback Format String (Limit to 30fps to avoid 60fps premium locks, or step down to 720p)
-                        ydl_opts_download['format'] = 'bestvideo[height<=1080][fps<=30]+bestaudio / bestvideo[height<=720]+bestaudio / best'
-                        
-                        with yt_dlp.YoutubeDL(ydl_opts_download) as ydl_dl_fallback:
-                            ydl_dl_fallback.download([video_url])
-                    else:
-                        raise dl_e # Re-raise if it's unrelated to premium formats
-                        
-                logger.info(f"Successfully downloaded {video_url} with yt-dlp")
-                cleanup_temp_files(output_dir)
-                return "success"
+                with yt_dlp.YoutubeDL(ydl_opts_download) as ydl_dl_fallback:
+                    ydl_dl_fallback.download([video_url])
+            else:
+                raise dl_e # Re-raise if it's unrelated to premium formats
                 
-            except Exception as e:
-                logger.error(f"yt-dlp download failed for {video_url}: {str(e)}")
-                # Try fallback
-                fallback_success = download_with_you_get(video_url, output_dir, file_name)
-                cleanup_temp_files(output_dir)
-                return "success" if fallback_success else "error"
-
+        logger.info(f"Successfully downloaded {video_url} with yt-dlp")
+        cleanup_temp_files(output_dir)
+        return "success"
+        
     except Exception as e:
-        logger.error(f"Failed to process video {video_url} with yt-dlp: {str(e)}")
-        return "error"
+        logger.error(f"yt-dlp download failed for {video_url}: {str(e)}")
+        # Try fallback
+        fallback_success = download_with_you_get(video_url, output_dir, file_name)
+        cleanup_temp_files(output_dir)
+        return "success" if fallback_success else "error"
@@ -0,0 +1,96 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .logger import logger
+from .config import MAX_WORKERS, COOLDOWN_SECONDS, MAX_DURATION
+from .bili_api import get_video_meta
+from .downloader import is_video_in_archive, mark_video_in_archive, is_vertical_video, passes_date_filter
+
+# Categories returned by classify_scanned
+SHORT = "short"
+LONG = "long"
+TOO_LONG = "too_long"
+ARCHIVED = "archived"
+SKIPPED_DATE = "skipped_date"
+UNKNOWN = "unknown"  # no metadata (API refused/failed): process_video falls back to yt-dlp
+
+ACCEPTED = (SHORT, LONG, UNKNOWN)
+
+class _Pacer:
+    """
+    Spaces API requests at least `interval` seconds apart across all threads.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def classify_meta(meta, date_after=None):
+    """
+    Category for one video from its view metadata (see constants above).
+    """
+    if not meta:
+        return UNKNOWN
+    if (meta.get('duration') or 0) > MAX_DURATION:
+        return TOO_LONG
+    if not passes_date_filter(meta, date_after):
+        return SKIPPED_DATE
+    if not meta.get('width') or not meta.get('height'):
+        return UNKNOWN  # orientation unknown: process_video falls back to yt-dlp for the dimensions
+    return SHORT if is_vertical_video(meta.get('width'), meta.get('height')) else LONG
+
+def classify_scanned(video_urls, date_after_for=None, max_workers=MAX_WORKERS, cooldown=COOLDOWN_SECONDS):
+    """
+    Prefetches lightweight BiliAPI view metadata for every scanned URL before any download starts.
+    - Archived videos are classified without a request.
+    - At most `max_workers` requests run at once. Overall they are paced like the
+      download workers: `max_workers` requests per COOLDOWN_SECONDS.
+    - Videos longer than MAX_DURATION are blacklisted in the archive right away (as process_video does).
+    date_after_for: optional callable url -> yt-dlp dateafter string (or None).
+    Returns {url: (category, meta)} in input order.
+    """
+    results = {}
+    pending = []
+    for url in dict.fromkeys(video_urls):
+        if is_video_in_archive(url):
+            results[url] = (ARCHIVED, None)
+        else:
+            pending.append(url)
+
+    pacer = _Pacer(cooldown / max(1, max_workers))
+
+    def _fetch(url):
+        pacer.wait()
+        return get_video_meta(url)
+
+    if pending:
+        logger.info(f"Prefetching metadata for {len(pending)} videos ({max_workers} parallel, {cooldown}s cooldown per worker)...")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            future_to_url = {executor.submit(_fetch, url): url for url in pending}
+            for future in as_completed(future_to_url):
+                url = future_to_url[future]
+                try:
+                    meta = future.result()
+                except Exception as e:
+                    logger.warning(f"Metadata prefetch failed for {url}: {e}")
+                    meta = None
+                category = classify_meta(meta, date_after_for(url) if date_after_for else None)
+                if category == TOO_LONG:
+                    logger.warning(f"Video {meta['id']} duration ({meta['duration']}s) exceeds MAX_DURATION ({MAX_DURATION}s). Blacklisting.")
+                    mark_video_in_archive(url)
+                results[url] = (category, meta)
+
+    counts = {}
+    for category, _meta in results.values():
+        counts[category] = counts.get(category, 0) + 1
+    logger.info("Prefetch summary: " + ", ".join(f"{k}={v}" for k, v in sorted(counts.items())))
+    return {url: results[url] for url in dict.fromkeys(video_urls)}
@@ -1,11 +1,19 @@
 import os
 import json
+import threading
 from datetime import datetime
 from .logger import logger
 from .config import BASE_DIR
 
 SCHEDULER_FILE = os.path.join(BASE_DIR, 'channel_last_scan.json')
 
+# How many of the newest BV ids are remembered per channel. More than one, so an incremental
+# scan still finds a known id when the newest upload gets deleted.
+KNOWN_IDS_KEEP = 20
+
+# Serializes read-modify-write of SCHEDULER_FILE (scan workers run concurrently)
+_DB_LOCK = threading.Lock()
+
 def load_scheduler_db():
     if not os.path.exists(SCHEDULER_FILE):
         return {}
@@ -17,10 +25,18 @@ def load_scheduler_db():
         return {}
 
 def save_scheduler_db(db):
+    # Write to a temp file and swap it in, so a concurrent load_scheduler_db never sees a
+    # half-written file (which would read as {} and force a full rescan).
+    tmp = f"{SCHEDULER_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
     try:
-        with open(SCHEDULER_FILE, 'w', encoding='utf-8') as f:
+        with open(tmp, 'w', encoding='utf-8') as f:
             json.dump(db, f, indent=4)
+        os.replace(tmp, SCHEDULER_FILE)
     except Exception as e:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
         logger.error(f"Failed to save scheduler DB to {SCHEDULER_FILE}: {e}")
 
 def get_last_scan_date(channel_url):
@@ -37,13 +53,39 @@ def update_last_scan_date(channel_url):
     """
     Updates the channel's last scan date to today's date (YYYYMMDD).
     """
-    db = load_scheduler_db()
     today_str = datetime.now().strftime('%Y%m%d')
-    
-    if channel_url not in db:
-        db[channel_url] = {}
+    with _DB_LOCK:
+        db = load_scheduler_db()
         
-    db[channel_url]["last_scan_date"] = today_str
-    
-    save_scheduler_db(db)
+        if channel_url not in db:
+            db[channel_url] = {}
+            
+        db[channel_url]["last_scan_date"] = today_str
+        
+        save_scheduler_db(db)
     logger.info(f"Updated scheduler DB: {channel_url} -> {today_str}")
+
+def get_known_ids(channel_url):
+    """
+    Returns (newest_ids, last_full_scan) stored for the channel by the previous scan:
+    the newest BV ids seen (newest first) and the YYYYMMDD date of the last full listing.
+    Both are empty/None if the channel was never scanned.
+    """
+    entry = load_scheduler_db().get(channel_url) or {}
+    return entry.get("newest_ids") or [], entry.get("last_full_scan")
+
+def update_known_ids(channel_url, newest_ids, full_scan=False):
+    """
+    Stores the newest BV ids (newest first, trimmed to KNOWN_IDS_KEEP) seen while scanning the channel.
+    full_scan=True also records today as the channel's last full listing.
+    """
+    ids = list(dict.fromkeys(i for i in newest_ids if i))[:KNOWN_IDS_KEEP]
+    if not ids:
+        return
+    with _DB_LOCK:
+        db = load_scheduler_db()
+        entry = db.setdefault(channel_url, {})
+        entry["newest_ids"] = ids
+        if full_scan:
+            entry["last_full_scan"] = datetime.now().strftime('%Y%m%d')
+        save_scheduler_db(db)
@@ -0,0 +1,87 @@
+import os
+import re
+import sqlite3
+import threading
+from .logger import logger
+from .config import SEQUENCE_DB
+
+# "001 - Title - Uploader.mp4" / ".txt"
+_SEQ_PREFIX = re.compile(r'^(\d+) - ')
+
+def scan_max_seq(directory):
+    """
+    Highest "NNN - " prefix among the .mp4/.txt files in a directory (0 if none).
+    The caption .txt is written before the video, so it covers downloads still in flight.
+    """
+    highest = 0
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if not entry.name.endswith(('.mp4', '.txt')):
+                    continue
+                match = _SEQ_PREFIX.match(entry.name)
+                if match:
+                    highest = max(highest, int(match.group(1)))
+    except FileNotFoundError:
+        pass
+    return highest
+
+class SequenceAllocator:
+    """
+    Hands out the "NNN" file numbers per output directory.
+    - Counters live in memory and are persisted to SQLite (SEQUENCE_DB), so numbers are never
+      handed out twice, not even across runs or after a file was deleted.
+    - The first time a directory is used in this process its counter is repaired against a single
+      scan of the directory (files added or renamed by hand); after that no listing is needed.
+    """
+
+    def __init__(self, db_path=SEQUENCE_DB):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._last = {}
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sequences (directory TEXT PRIMARY KEY, last INTEGER NOT NULL)")
+        self._conn.commit()
+
+    def _load(self, key):
+        # caller holds self._lock
+        row = self._conn.execute("SELECT last FROM sequences WHERE directory=?", (key,)).fetchone()
+        stored = row[0] if row else 0
+        on_disk = scan_max_seq(key)
+        if on_disk > stored:
+            logger.debug(f"Sequence for {key} repaired from {stored} to {on_disk} (directory scan)")
+        return max(stored, on_disk)
+
+    def next(self, directory):
+        """
+        Reserves and returns the next sequence number for `directory`.
+        """
+        key = os.path.abspath(directory)
+        with self._lock:
+            last = self._last.get(key)
+            if last is None:
+                last = self._load(key)
+            seq = last + 1
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO sequences(directory, last) VALUES(?, ?) "
+                    "ON CONFLICT(directory) DO UPDATE SET last=excluded.last",
+                    (key, seq))
+            self._last[key] = seq
+            return seq
+
+_ALLOCATOR = None
+_ALLOCATOR_LOCK = threading.Lock()
+
+def get_sequence_allocator():
+    """
+    Shared SequenceAllocator for SEQUENCE_DB.
+    """
+    global _ALLOCATOR
+    with _ALLOCATOR_LOCK:
+        if _ALLOCATOR is None:
+            _ALLOCATOR = SequenceAllocator()
+        return _ALLOCATOR
+
+def next_sequence(directory):
+    return get_sequence_allocator().next(directory)
@@ -0,0 +1,7 @@
+# media_common/__init__.py
+"""
+Modul bersama untuk youtube/ dan tiktok/ (diimpor lewat root repo di sys.path,
+lihat yt_short_downloader/probe.py, tiktok_dl/probe.py dan folder_index.py
+masing-masing).
+"""
+__all__ = ["probe", "folder_index"]
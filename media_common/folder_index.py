@@ -0,0 +1,318 @@
+# media_common/folder_index.py
+"""
+Index isi folder output: satu scan, lalu di-update incremental. Modul bersama
+youtube/ dan tiktok/ (yt_short_downloader.folder_index / tiktok_dl.folder_index
+memanggil configure() dengan pola ID dan folder snapshot masing-masing).
+
+- Menyimpan nama file, prefix index ("NN - ..."), pasangan video/.txt per
+  base name, dan video ID yang terbaca dari nama file
+  ("... - <id>.mp4", "video_<id>", "[<id>]"; pola ID dari id_re/bracket_re).
+- Lookup per video (exists, nama unik, file dengan prefix, max index) jadi
+  O(1) di memori; downloader memanggil add()/discard()/rename() saat file
+  masuk, dihapus, atau diganti nama.
+- sync() hanya stat folder: scan ulang cuma kalau mtime folder berubah
+  sejak scan terakhir. Hasil scan disimpan sebagai snapshot
+  (<snapshot_dir>/<hash>.json) yang dipakai lagi di run berikutnya selama
+  mtime folder sama, jadi start ulang tidak perlu listdir. Snapshot hanya
+  dipercaya kalau mtime folder sudah lebih tua MTIME_SLACK_NS dari saat scan
+  (FAT/exFAT & sebagian network share: resolusi mtime 2 detik, perubahan di
+  detik yang sama tidak menggeser mtime). snapshot=False mematikannya.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Set
+
+__all__ = [
+    "FolderIndex", "get_folder_index", "walk_folder_indexes",
+    "ids_from_name", "configure", "VIDEO_EXTS",
+]
+
+VIDEO_EXTS = (".mp4", ".webm", ".mkv", ".mov", ".m4v", ".3gp", ".flv")
+
+# resolusi mtime terburuk yang ditangani (FAT/exFAT 2 detik) + sedikit selisih jam
+MTIME_SLACK_NS = 3_000_000_000
+
+# default untuk FolderIndex/get_folder_index; diisi package lewat configure()
+SNAPSHOT_DIR = os.path.join(os.getcwd(), "data", "folder_index")
+SNAPSHOT = True
+ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+BRACKET_ID_RE = re.compile(r"\[([A-Za-z0-9_-]{11})\]")
+
+
+def configure(id_re=None, bracket_re=None, snapshot_dir: Optional[str] = None,
+              snapshot: Optional[bool] = None) -> None:
+    """Default pola ID / snapshot untuk proses ini (dipanggil sekali oleh package)."""
+    global ID_RE, BRACKET_ID_RE, SNAPSHOT_DIR, SNAPSHOT
+    if id_re is not None:
+        ID_RE = re.compile(id_re) if isinstance(id_re, str) else id_re
+    if bracket_re is not None:
+        BRACKET_ID_RE = re.compile(bracket_re) if isinstance(bracket_re, str) else bracket_re
+    if snapshot_dir is not None:
+        SNAPSHOT_DIR = os.path.abspath(snapshot_dir)
+    if snapshot is not None:
+        SNAPSHOT = bool(snapshot)
+
+
+def _index_of(name: str) -> Optional[int]:
+    # sama seperti get_existing_index lama: bagian sebelum ' - ' harus angka
+    head = name.split(" - ")[0]
+    return int(head) if head.isdigit() else None
+
+
+def ids_from_name(name: str, id_re=None, bracket_re=None) -> Set[str]:
+    """Video ID yang tertulis di nama file (bisa kosong); pola default dari configure()."""
+    id_re = id_re or ID_RE
+    bracket_re = bracket_re or BRACKET_ID_RE
+    base = os.path.splitext(name)[0]
+    out = set(bracket_re.findall(base))
+    last = base.rsplit(" - ", 1)[-1].strip()
+    if last.startswith("video_"):
+        last = last[len("video_"):]
+    if id_re.match(last):
+        out.add(last)
+    return out
+
+
+class FolderIndex:
+    """
+    Index satu folder (tidak rekursif; sub-folder dicatat di `dirs`).
+    Parameter None -> default modul (configure()).
+    """
+
+    def __init__(self, path: str, snapshot: Optional[bool] = None,
+                 snapshot_dir: Optional[str] = None, id_re=None, bracket_re=None):
+        self.path = os.path.abspath(path)
+        self.snapshot = SNAPSHOT if snapshot is None else snapshot
+        self.snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+        self.id_re = id_re or ID_RE
+        self.bracket_re = bracket_re or BRACKET_ID_RE
+        self._lock = threading.RLock()
+        self._mtime: Optional[int] = None
+        self._names: Set[str] = set()
+        self._dirs: Set[str] = set()
+        self._by_index: Dict[int, Set[str]] = {}
+        self._ids: Dict[str, Set[str]] = {}
+        self.sync()
+
+    # ---------- internal ----------
+    def _dir_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _snapshot_path(self) -> str:
+        key = hashlib.sha1(self.path.encode("utf-8", "replace")).hexdigest()[:16]
+        return os.path.join(self.snapshot_dir, f"{key}.json")
+
+    def _load_snapshot(self, mtime: int) -> bool:
+        try:
+            with open(self._snapshot_path(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("path") != self.path or data.get("mtime_ns") != mtime:
+            return False
+        # mtime folder terlalu dekat dengan saat scan: perubahan sesudah scan
+        # bisa jatuh di tick mtime yang sama -> jangan percaya snapshot
+        if mtime > (data.get("scanned_at_ns") or 0) - MTIME_SLACK_NS:
+            return False
+        self._reset(data.get("names") or [], data.get("dirs") or [])
+        return True
+
+    def _save_snapshot(self, scanned_at_ns: int) -> None:
+        path = self._snapshot_path()
+        try:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"path": self.path, "mtime_ns": self._mtime, "scanned_at_ns": scanned_at_ns,
+                           "names": sorted(self._names), "dirs": sorted(self._dirs)}, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def _reset(self, names, dirs) -> None:
+        self._names, self._dirs = set(), set(dirs)
+        self._by_index, self._ids = {}, {}
+        for n in names:
+            self._add(n)
+
+    def _add(self, name: str) -> None:
+        self._names.add(name)
+        idx = _index_of(name)
+        if idx is not None:
+            self._by_index.setdefault(idx, set()).add(name)
+        for vid in ids_from_name(name, self.id_re, self.bracket_re):
+            self._ids.setdefault(vid, set()).add(name)
+
+    def _discard(self, name: str) -> None:
+        self._names.discard(name)
+        idx = _index_of(name)
+        if idx is not None and idx in self._by_index:
+            self._by_index[idx].discard(name)
+            if not self._by_index[idx]:
+                del self._by_index[idx]
+        for vid in ids_from_name(name, self.id_re, self.bracket_re):
+            if vid in self._ids:
+                self._ids[vid].discard(name)
+                if not self._ids[vid]:
+                    del self._ids[vid]
+
+    # ---------- sinkronisasi ----------
+    def sync(self, force: bool = False) -> bool:
+        """
+        Samakan index dengan disk. Tanpa force cukup satu stat: scan ulang
+        hanya kalau mtime folder berubah. Return True kalau benar-benar scan.
+        """
+        mtime = self._dir_mtime()
+        with self._lock:
+            if mtime is None:
+                self._reset([], [])
+                self._mtime = None
+                return False
+            if not force and mtime == self._mtime:
+                return False
+            if not force and self._mtime is None and self.snapshot and self._load_snapshot(mtime):
+                self._mtime = mtime
+                return False
+            scanned_at = time.time_ns()
+            names, dirs = [], []
+            try:
+                with os.scandir(self.path) as it:
+                    for d in it:
+                        (dirs if d.is_dir() else names).append(d.name)
+            except OSError:
+                pass
+            self._reset(names, dirs)
+            self._mtime = mtime
+            if self.snapshot:
+                self._save_snapshot(scanned_at)
+            return True
+
+    def add(self, name: str) -> None:
+        with self._lock:
+            self._add(os.path.basename(name))
+
+    def discard(self, name: str) -> None:
+        with self._lock:
+            self._discard(os.path.basename(name))
+
+    def rename(self, old: str, new: str) -> None:
+        with self._lock:
+            self._discard(os.path.basename(old))
+            self._add(os.path.basename(new))
+
+    # ---------- lookup ----------
+    @property
+    def mtime(self) -> Optional[int]:
+        """mtime_ns folder saat scan/snapshot terakhir (None kalau folder tidak ada)."""
+        return self._mtime
+
+    @property
+    def dirs(self) -> List[str]:
+        with self._lock:
+            return sorted(self._dirs)
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return sorted(self._names)
+
+    def exists(self, name: str) -> bool:
+        with self._lock:
+            return name in self._names
+
+    def max_index(self) -> int:
+        with self._lock:
+            return max(self._by_index, default=0)
+
+    def with_prefix(self, prefix: str) -> List[str]:
+        with self._lock:
+            idx = _index_of(prefix) if " - " in prefix else None
+            pool = self._by_index.get(idx, ()) if idx is not None else self._names
+            return [n for n in pool if n.startswith(prefix)]
+
+    def unique_name(self, filename: str) -> str:
+        """Sama seperti utils.get_unique_filename, tapi cek nama di memori."""
+        name, ext = os.path.splitext(filename)
+        candidate, counter = filename, 0
+        with self._lock:
+            while True:
+                if candidate not in self._names:
+                    # guard murah: file bisa muncul dari luar proses sejak scan terakhir
+                    if not os.path.exists(os.path.join(self.path, candidate)):
+                        return candidate
+                    self._add(candidate)
+                counter += 1
+                candidate = f"{name}_{counter}{ext}"
+
+    def has_id(self, video_id: str) -> bool:
+        with self._lock:
+            return video_id in self._ids
+
+    def names_for_id(self, video_id: str) -> List[str]:
+        with self._lock:
+            return sorted(self._ids.get(video_id, ()))
+
+    def ids(self, exts=None) -> Set[str]:
+        """Semua video ID; dengan `exts` hanya yang punya file berekstensi itu."""
+        with self._lock:
+            if exts is None:
+                return set(self._ids)
+            exts = tuple(exts)
+            return {vid for vid, names in self._ids.items()
+                    if any(n.lower().endswith(exts) for n in names)}
+
+    def videos(self, exts=VIDEO_EXTS) -> List[str]:
+        with self._lock:
+            return sorted(n for n in self._names if n.lower().endswith(tuple(exts)))
+
+    def pairs(self, exts=VIDEO_EXTS) -> Dict[str, Dict[str, Optional[str]]]:
+        """base name -> {"video": nama | None, "txt": nama | None}."""
+        out: Dict[str, Dict[str, Optional[str]]] = {}
+        exts = tuple(exts)
+        with self._lock:
+            for n in self._names:
+                base, ext = os.path.splitext(n)
+                low = ext.lower()
+                if low == ".txt":
+                    out.setdefault(base, {"video": None, "txt": None})["txt"] = n
+                elif low in exts:
+                    out.setdefault(base, {"video": None, "txt": None})["video"] = n
+        return out
+
+
+_REGISTRY: Dict[str, FolderIndex] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_folder_index(path: str, sync: bool = False) -> FolderIndex:
+    """
+    Satu FolderIndex per folder per proses (default dari configure()).
+    Panggilan pertama men-scan (atau memuat snapshot); sync=True untuk cek
+    ulang mtime di awal batch.
+    """
+    key = os.path.abspath(path)
+    with _REGISTRY_LOCK:
+        idx = _REGISTRY.get(key)
+        if idx is None:
+            idx = _REGISTRY[key] = FolderIndex(key)
+            return idx
+    if sync:
+        idx.sync()
+    return idx
+
+
+def walk_folder_indexes(root: str) -> Iterator[FolderIndex]:
+    """Seperti os.walk, tapi folder yang tidak berubah dibaca dari snapshot."""
+    stack = [os.path.abspath(root)]
+    while stack:
+        idx = get_folder_index(stack.pop(), sync=True)
+        yield idx
+        stack.extend(os.path.join(idx.path, d) for d in reversed(idx.dirs))
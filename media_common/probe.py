@@ -0,0 +1,182 @@
+# media_common/probe.py
+"""
+Probe media satu kali: ``ffprobe -show_streams -show_format -of json`` →
+record ringkas {w, h, fps, duration, vcodec, acodec, pix_fmt, bitrate}.
+
+Hasil di-cache di SQLite dengan key (path, size, mtime_ns); file yang berubah
+(convert/upscale/trim/rename) otomatis miss. Modul bersama youtube/ dan
+tiktok/: masing-masing package memanggil set_cache_path() dengan lokasi cache
+miliknya (yt_short_downloader.probe -> data/probe_cache.db,
+tiktok_dl.probe -> config.PROBE_CACHE_DB).
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import subprocess
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+__all__ = ["probe_media", "parse_ffprobe", "ProbeCache", "get_probe_cache", "set_cache_path"]
+
+# default kalau package pemanggil tidak memanggil set_cache_path()
+CACHE_PATH = os.path.join(os.getcwd(), "data", "probe_cache.db")
+
+
+def _ratio(val: Optional[str]) -> float:
+    # "30000/1001" -> 29.97
+    try:
+        num, _, den = str(val or "0").partition("/")
+        return float(num) / float(den or 1) if float(den or 1) else 0.0
+    except ValueError:
+        return 0.0
+
+
+def _int(val: Any) -> int:
+    try:
+        return int(float(val))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _rotation(stream: Dict[str, Any]) -> int:
+    rot = (stream.get("tags") or {}).get("rotate")
+    for sd in stream.get("side_data_list") or []:
+        if "rotation" in sd:
+            rot = sd["rotation"]
+    return abs(_int(rot)) % 360
+
+
+def parse_ffprobe(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """JSON ffprobe -> record ringkas. None kalau tidak ada stream video."""
+    streams = data.get("streams") or []
+    fmt = data.get("format") or {}
+    v = next((s for s in streams if s.get("codec_type") == "video"
+              and not (s.get("disposition") or {}).get("attached_pic")), None)
+    a = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    if v is None:
+        return None
+    w, h = _int(v.get("width")), _int(v.get("height"))
+    if _rotation(v) in (90, 270):
+        w, h = h, w  # sama seperti dimensi tampilan (cv2 / player)
+    duration = float(fmt.get("duration") or v.get("duration") or 0.0)
+    return {
+        "w": w,
+        "h": h,
+        "fps": round(_ratio(v.get("avg_frame_rate")) or _ratio(v.get("r_frame_rate")), 3),
+        "duration": duration,
+        "vcodec": v.get("codec_name"),
+        "acodec": a.get("codec_name") if a else None,
+        "pix_fmt": v.get("pix_fmt"),
+        # kbps; stream video dulu, fallback container
+        "bitrate": (_int(v.get("bit_rate")) or _int(fmt.get("bit_rate"))) // 1000,
+    }
+
+
+def _run_ffprobe(path: str, timeout: int = 30) -> Optional[Dict[str, Any]]:
+    try:
+        r = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_streams", "-show_format", "-of", "json", path],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, timeout=timeout, encoding="utf-8", errors="replace",
+        )
+        if r.returncode != 0 or not r.stdout.strip():
+            return None
+        return parse_ffprobe(json.loads(r.stdout))
+    except Exception:
+        return None
+
+
+class ProbeCache:
+    """Tabel probe (path, size, mtime_ns) -> record JSON, koneksi per thread/proses."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or CACHE_PATH
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn().execute("""
+            CREATE TABLE IF NOT EXISTS probes (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime_ns INTEGER,
+                record TEXT
+            )
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        # pid ikut dicek: koneksi hasil fork tidak boleh dipakai di proses anak
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, path: str, size: int, mtime_ns: int) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT record FROM probes WHERE path=? AND size=? AND mtime_ns=?",
+            (path, size, mtime_ns)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, path: str, size: int, mtime_ns: int, record: Dict[str, Any]) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO probes(path,size,mtime_ns,record) VALUES(?,?,?,?)",
+            (path, size, mtime_ns, json.dumps(record)))
+
+
+_CACHE: Optional[ProbeCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def set_cache_path(path: str) -> None:
+    """Lokasi cache untuk proses ini; instance lama (path lain) dilepas."""
+    global CACHE_PATH, _CACHE
+    path = os.path.abspath(path)
+    with _CACHE_LOCK:
+        if _CACHE is not None and _CACHE.path != path:
+            _CACHE = None
+        CACHE_PATH = path
+
+
+def get_probe_cache() -> ProbeCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ProbeCache()
+        return _CACHE
+
+
+def _stat_key(path: str) -> Optional[Tuple[str, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+
+def probe_media(path: str, use_cache: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Record media untuk `path` (None kalau file tidak ada / ffprobe gagal).
+    Hasil gagal tidak di-cache.
+    """
+    key = _stat_key(path)
+    if key is None:
+        return None
+    cache = None
+    if use_cache:
+        try:
+            cache = get_probe_cache()
+            hit = cache.get(*key)
+            if hit is not None:
+                return hit
+        except Exception:
+            cache = None
+    rec = _run_ffprobe(path)
+    if rec is not None and cache is not None:
+        try:
+            cache.put(*key, rec)
+        except Exception:
+            pass
+    return rec
@@ -3,6 +3,8 @@ import os
 import re
 from typing import Dict, List
 
+from tiktok_dl.folder_index import get_folder_index
+
 # ==== KONFIGURASI ====
 OUTDIR = "anime_tiktok_downloads_v2"
 VIDEO_EXTS = {".mp4", ".webm", ".mkv", ".mov"}  # tambah kalau perlu
@@ -55,11 +57,9 @@ def collect_groups(outdir: str):
     groups: Dict[int, Dict[str, dict]] = {}
     max_prefix = 0
 
-    # 1) kumpulkan dulu
-    for fname in os.listdir(outdir):
+    # 1) kumpulkan dulu (FolderIndex: satu scan, sub-folder sudah terpisah)
+    for fname in get_folder_index(outdir, sync=True).names():
         full = os.path.join(outdir, fname)
-        if not os.path.isfile(full):
-            continue
 
         parsed = parse_prefixed_name(fname)
         if not parsed:
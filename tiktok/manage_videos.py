@@ -15,6 +15,8 @@ import subprocess
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Optional, Tuple
 
+from tiktok_dl.probe import probe_media
+
 # =========================
 # CONFIG — ubah di sini
 # =========================
@@ -61,37 +63,11 @@ def check_ffprobe() -> bool:
 
 
 def get_video_duration_seconds(filepath: str) -> Optional[int]:
-    """Ambil durasi video (detik) dengan ffprobe. None jika gagal."""
-    if not os.path.exists(filepath):
-        return None
-    cmd = [
-        "ffprobe",
-        "-v",
-        "error",
-        "-show_entries",
-        "format=duration",
-        "-of",
-        "default=noprint_wrappers=1:nokey=1",
-        filepath,
-    ]
-    try:
-        r = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            timeout=60,
-            encoding="utf-8",
-            errors="replace",
-        )
-        if r.returncode != 0:
-            return None
-        s = r.stdout.strip()
-        if not s:
-            return None
-        return int(round(float(s)))
-    except Exception:
+    """Ambil durasi video (detik) via probe_media (ffprobe + cache). None jika gagal."""
+    rec = probe_media(filepath)
+    if not rec or not rec.get("duration"):
         return None
+    return int(round(rec["duration"]))
 
 
 def find_videos(folder: str, exts: List[str], recursive: bool) -> List[str]:
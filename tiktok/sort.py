@@ -1,5 +1,5 @@
 import os
-from moviepy import VideoFileClip  # UPDATED: Import langsung dari root moviepy (v2.0)
+from tiktok_dl.probe import probe_media
 
 def process_videos(folder_path):
     # Konfigurasi
@@ -12,7 +12,7 @@ def process_videos(folder_path):
     
     valid_videos = []
 
-    print(f"--- Memulai Proses (MoviePy v2.0) di: {folder_path} ---")
+    print(f"--- Memulai Proses di: {folder_path} ---")
     print(f"Total video awal: {len(video_files)}")
 
     # 1. TAHAP PENGECEKAN & PENGHAPUSAN
@@ -22,11 +22,11 @@ def process_videos(folder_path):
         txt_path = os.path.join(folder_path, txt_filename)
 
         try:
-            duration = 0
-            # UPDATED: Menggunakan Context Manager (with)
-            # Ini sangat disarankan di Python 3.7+ dan MoviePy v2.0 untuk resource management
-            with VideoFileClip(mp4_path) as clip:
-                duration = clip.duration
+            # Durasi dari probe ffprobe (ter-cache per path/size/mtime)
+            rec = probe_media(mp4_path)
+            if rec is None:
+                raise ValueError("ffprobe gagal membaca file")
+            duration = rec["duration"]
             
             # Logika seleksi
             if duration > MAX_DURATION:
@@ -1 +1 @@
-__all__ = ["config", "utils", "db", "meta", "downloader", "cli"]
+__all__ = ["config", "utils", "db", "meta", "downloader", "cli", "probe", "folder_index"]
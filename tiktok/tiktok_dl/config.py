@@ -3,3 +3,6 @@ THREADS = 4                # jumlah thread paralel
 DEFAULT_OUTDIR = "anime_tiktok_downloads_v2"
 DEFAULT_DB = "tiktok.db"
 METADATA_WORKERS     = 8   # jumlah thread untuk prefilter metadata/hashtag
+PROBE_CACHE_DB       = "probe_cache.db"  # cache ffprobe (path, size, mtime) -> durasi/resolusi/codec
+FOLDER_INDEX_DIR     = "folder_index"     # snapshot FolderIndex per folder output (dipakai ulang selama mtime folder sama)
+FOLDER_INDEX_SNAPSHOT = True               # False: selalu listdir saat start (mis. folder di network share yang mtime-nya tidak bisa dipercaya)
@@ -10,6 +10,7 @@ from .utils import (
     get_existing_index, cleanup_partial_downloads
 )
 from .db import TikTokDB
+from .folder_index import get_folder_index
 from .meta import fetch_full_metadata, tiktok_caption_text
 
 def _guess_handle_from_url(url: str):
@@ -74,6 +75,7 @@ def download_one_video(entry: dict, output_path: str, author_name: str,
     try:
         with open(caption_path, "w", encoding="utf-8") as f:
             f.write(tiktok_caption_text(entry))
+        get_folder_index(output_path).add(caption_name)
     except Exception as e:
         caption_path = None
         with open("download_errors.log", "a", encoding="utf-8") as log:
@@ -116,6 +118,7 @@ def download_one_video(entry: dict, output_path: str, author_name: str,
             if not os.path.exists(filepath) or os.path.getsize(filepath) < 1000:
                 raise Exception("File terlalu kecil / hilang (mungkin korup).")
 
+            get_folder_index(output_path).add(filename)
             db.mark_video_status(video_id, url, entry.get("title") or title,
                                  handle or uploader, "success", filepath, caption_path)
             return True
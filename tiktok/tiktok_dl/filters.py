@@ -1,47 +1,22 @@
 # -*- coding: utf-8 -*-
 import os
 import re
-import subprocess
 from typing import Iterable, List, Dict, Optional, Tuple
 
 from .db import TikTokDB
+from .probe import probe_media
 
 HASHTAG_RE = re.compile(r"(#|＃)([0-9A-Za-z_]+)", re.UNICODE)
 
-def _ffprobe_exists() -> bool:
-    try:
-        subprocess.run(["ffprobe", "-version"],
-                       stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=5)
-        return True
-    except Exception:
-        return False
-
 def get_video_duration_seconds(filepath: str) -> Optional[int]:
     """
-    Ambil durasi (detik) dari file video lokal via ffprobe.
-    Return None jika gagal/ffprobe tidak ada.
+    Ambil durasi (detik) dari file video lokal via probe_media (ffprobe
+    sekali + cache). Return None jika gagal/ffprobe tidak ada.
     """
-    if not os.path.exists(filepath):
-        return None
-    if not _ffprobe_exists():
-        return None
-    try:
-        # Ambil durasi format secara langsung (lebih stabil lintas container)
-        cmd = [
-            "ffprobe", "-v", "error", "-show_entries", "format=duration",
-            "-of", "default=noprint_wrappers=1:nokey=1", filepath
-        ]
-        r = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                           text=True, timeout=30)
-        if r.returncode != 0:
-            return None
-        val = r.stdout.strip()
-        if not val:
-            return None
-        sec = float(val)
-        return int(round(sec))
-    except Exception:
+    rec = probe_media(filepath) if filepath else None
+    if not rec or not rec.get("duration"):
         return None
+    return int(round(rec["duration"]))
 
 def read_caption(path: Optional[str]) -> str:
     if not path or not os.path.exists(path):
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+Re-export media_common.folder_index (satu modul untuk youtube/ dan tiktok/)
+dengan pola ID video TikTok ("video_<id>", "[<id>]") dan snapshot di
+config.FOLDER_INDEX_DIR.
+"""
+import os
+import re
+import sys
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
+
+from media_common.folder_index import (  # noqa: E402
+    VIDEO_EXTS, FolderIndex, configure, get_folder_index, ids_from_name, walk_folder_indexes,
+)
+
+from .config import FOLDER_INDEX_DIR, FOLDER_INDEX_SNAPSHOT  # noqa: E402
+
+__all__ = [
+    "FolderIndex", "get_folder_index", "walk_folder_indexes",
+    "ids_from_name", "VIDEO_EXTS",
+]
+
+# ID video TikTok: angka panjang (biasanya 19 digit)
+ID_RE = re.compile(r"^\d{8,20}$")
+BRACKET_ID_RE = re.compile(r"\[(\d{8,20})\]")
+
+configure(id_re=ID_RE, bracket_re=BRACKET_ID_RE, snapshot_dir=FOLDER_INDEX_DIR, snapshot=FOLDER_INDEX_SNAPSHOT)
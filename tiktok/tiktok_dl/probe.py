@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+Re-export media_common.probe (satu modul untuk youtube/ dan tiktok/) dengan
+cache di config.PROBE_CACHE_DB. Dipakai filters (durasi), manage_videos.py,
+trim.py dan sort.py.
+"""
+import os
+import sys
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
+
+from media_common.probe import (  # noqa: E402
+    ProbeCache, get_probe_cache, parse_ffprobe, probe_media, set_cache_path,
+)
+
+from .config import PROBE_CACHE_DB  # noqa: E402
+
+__all__ = ["probe_media", "parse_ffprobe", "ProbeCache", "get_probe_cache"]
+
+set_cache_path(PROBE_CACHE_DB)
@@ -3,6 +3,8 @@ import re
 import subprocess
 from urllib.parse import urlparse
 
+from .folder_index import get_folder_index
+
 def check_yt_dlp_installation() -> bool:
     try:
         r = subprocess.run(
@@ -47,28 +49,20 @@ def validate_filename(filename: str) -> bool:
     return len(filename) <= 255
 
 def get_unique_filename(base_path: str, filename: str) -> str:
-    path = os.path.join(base_path, filename)
-    if not os.path.exists(path):
-        return filename
-    name, ext = os.path.splitext(filename)
-    i = 1
-    while True:
-        candidate = f"{name}_{i}{ext}"
-        if not os.path.exists(os.path.join(base_path, candidate)):
-            return candidate
-        i += 1
+    return get_folder_index(base_path).unique_name(filename)
 
 def get_existing_index(output_path: str) -> int:
-    files = os.listdir(output_path)
-    idxs = [int(f.split(" - ")[0]) for f in files if f.split(" - ")[0].isdigit()]
-    return max(idxs, default=0)
+    # FolderIndex: cukup stat folder kalau tidak ada yang berubah sejak scan terakhir
+    return get_folder_index(output_path, sync=True).max_index()
 
 def cleanup_partial_downloads(output_path: str, filename_prefix: str):
     try:
-        for f in os.listdir(output_path):
-            if f.startswith(filename_prefix) and f.endswith(".part"):
+        fidx = get_folder_index(output_path)
+        for f in fidx.with_prefix(filename_prefix):
+            if f.endswith(".part"):
                 try:
                     os.remove(os.path.join(output_path, f))
+                    fidx.discard(f)
                 except Exception as e:
                     print(f"Gagal hapus partial {f}: {e}")
     except Exception as e:
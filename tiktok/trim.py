@@ -4,13 +4,13 @@
 # - Multithreading untuk percepat proses
 # - Hapus .txt berpasangan
 # - Rename ulang berurutan 01.ext, 02.ext, ...
-# Kompatibel MoviePy 2.2.1
+# Durasi via tiktok_dl.probe (ffprobe + cache), tanpa MoviePy
 
 import os
 import sys
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from moviepy import VideoFileClip
+from tiktok_dl.probe import probe_media
 
 # ========= KONFIGURASI =========
 FOLDER = Path("tiktok_downloads")                # jalankan script dari dalam folder video
@@ -40,10 +40,11 @@ def remove_with_txt(p: Path) -> None:
 
 
 def get_duration(path: Path) -> float:
-    """Ambil durasi via MoviePy v2.x (pakai context manager)."""
-    with VideoFileClip(str(path)) as clip:
-        # clip.duration bisa None pada file rusak
-        return float(clip.duration or 0.0)
+    """Ambil durasi via probe_media (ffprobe sekali + cache). Raise kalau file tidak terbaca."""
+    rec = probe_media(str(path))
+    if rec is None:
+        raise ValueError("ffprobe gagal membaca file (corrupt?)")
+    return float(rec["duration"] or 0.0)
 
 
 def process_one(path: Path):
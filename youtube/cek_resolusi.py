@@ -1,9 +1,12 @@
-import cv2
 import os
 import shutil
 import subprocess
 import sys
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 
 # Force output to UTF-8
 try:
@@ -11,6 +14,187 @@ try:
 except: pass
 
 import json
+import sqlite3
+
+# Probe ffprobe satu kali + cache (path, size, mtime)
+try:
+    from yt_short_downloader.probe import probe_media
+except ImportError:
+    try:
+        from youtube.yt_short_downloader.probe import probe_media
+    except ImportError:
+        probe_media = None
+
+def get_media_info(file_path):
+    """
+    Record {w, h, fps, duration, vcodec, acodec, pix_fmt, bitrate}.
+    Sumber utama probe_media (ffprobe + cache); fallback cv2 + get_stream_info
+    kalau ffprobe/package tidak tersedia. None jika file tidak bisa dibuka.
+    """
+    if probe_media is not None:
+        rec = probe_media(file_path)
+        if rec:
+            return rec
+
+    # OpenCV di-import lazy: hanya jalur fallback ini yang butuh (import-nya ratusan ms)
+    try:
+        import cv2
+    except ImportError:
+        return None
+    cap = cv2.VideoCapture(file_path)
+    if not cap.isOpened():
+        return None
+    w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    rec = {"w": w, "h": h, "fps": fps, "duration": frames / fps if fps > 0 else 0,
+           "vcodec": None, "acodec": None, "pix_fmt": None, "bitrate": 0}
+    for st in get_stream_info(file_path):
+        if st.get("codec_type") == "video" and not rec["vcodec"]:
+            rec["vcodec"], rec["pix_fmt"] = st.get("codec_name"), st.get("pix_fmt")
+        elif st.get("codec_type") == "audio" and not rec["acodec"]:
+            rec["acodec"] = st.get("codec_name")
+    return rec
+
+COMPLIANCE_INDEX_NAME = ".compliance_index.db"
+_LEGACY_INDEX_NAME = ".compliance_index.json"
+
+class ComplianceIndex:
+    """
+    Index per folder (<folder>/.compliance_index.db, SQLite): nama file ->
+    record probe + status compliant per target_mode. Entry berlaku selama
+    (size, mtime_ns) file sama; file yang cuma di-rename (sort.rename_files)
+    tetap ketemu lewat signature (size, mtime_ns).
+    Lookup/record hanya menyentuh satu baris, jadi aman dipakai bersamaan oleh
+    worker post-process (proses terpisah) dan job batch (thread). Entry file
+    yang sudah hilang dibuang lewat prune() (mode batch saja).
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.path = os.path.join(folder, COMPLIANCE_INDEX_NAME)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                name     TEXT PRIMARY KEY,
+                size     INTEGER,
+                mtime_ns INTEGER,
+                record   TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_sig ON entries(size, mtime_ns)")
+        self._import_legacy()
+
+    def _conn(self):
+        # koneksi per thread; pid ikut dicek (koneksi hasil fork tidak dipakai ulang)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @contextmanager
+    def _write(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _import_legacy(self):
+        """Index JSON lama (.compliance_index.json) dipindah sekali ke tabel."""
+        legacy = os.path.join(self.folder, _LEGACY_INDEX_NAME)
+        try:
+            with open(legacy, "r", encoding="utf-8") as f:
+                old = json.load(f) or {}
+        except (OSError, ValueError):
+            return
+        rows = [(n, e.get("size"), e.get("mtime_ns"), json.dumps(e, ensure_ascii=False))
+                for n, e in old.items() if isinstance(e, dict)]
+        with self._write() as conn:
+            conn.executemany("INSERT OR IGNORE INTO entries(name,size,mtime_ns,record) VALUES(?,?,?,?)", rows)
+        try: os.remove(legacy)
+        except OSError: pass
+
+    @staticmethod
+    def _sig(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def lookup(self, path):
+        """Entry valid untuk file ini, atau None (baru/berubah)."""
+        sig = self._sig(path)
+        if sig is None:
+            return None
+        name = os.path.basename(path)
+        conn = self._conn()
+        row = conn.execute("SELECT record FROM entries WHERE name=? AND size=? AND mtime_ns=?",
+                           (name, *sig)).fetchone()
+        if row:
+            return json.loads(row[0])
+        row = conn.execute("SELECT name, record FROM entries WHERE size=? AND mtime_ns=? LIMIT 1",
+                           sig).fetchone()
+        if row:
+            # file di-rename -> pindahkan entry ke nama baru
+            with self._write() as conn:
+                conn.execute("DELETE FROM entries WHERE name=?", (name,))
+                conn.execute("UPDATE entries SET name=? WHERE name=?", (name, row[0]))
+            return json.loads(row[1])
+        return None
+
+    def record(self, path, info, target_mode, compliant, reason=""):
+        sig = self._sig(path)
+        if sig is None or not info:
+            return
+        name = os.path.basename(path)
+        with self._write() as conn:
+            row = conn.execute("SELECT record FROM entries WHERE name=? AND size=? AND mtime_ns=?",
+                               (name, *sig)).fetchone()
+            modes = dict(json.loads(row[0]).get("modes") or {}) if row else {}
+            modes[target_mode] = bool(compliant)
+            entry = {
+                "size": sig[0], "mtime_ns": sig[1],
+                "w": info.get("w"), "h": info.get("h"), "duration": info.get("duration"),
+                "fps": info.get("fps"),
+                "vcodec": info.get("vcodec"), "acodec": info.get("acodec"), "pix_fmt": info.get("pix_fmt"),
+                "modes": modes, "reason": reason,
+            }
+            conn.execute("INSERT OR REPLACE INTO entries(name,size,mtime_ns,record) VALUES(?,?,?,?)",
+                         (name, sig[0], sig[1], json.dumps(entry, ensure_ascii=False)))
+
+    def prune(self):
+        """Buang entry untuk file yang sudah tidak ada (dipindah/dihapus). Satu scandir; mode batch."""
+        try:
+            present = {d.name for d in os.scandir(self.folder) if d.is_file()}
+        except OSError:
+            return
+        conn = self._conn()
+        names = [r[0] for r in conn.execute("SELECT name FROM entries")]
+        gone = [(n,) for n in names if n not in present]
+        if gone:
+            with self._write() as conn:
+                conn.executemany("DELETE FROM entries WHERE name=?", gone)
+
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+def get_compliance_index(folder):
+    """Satu ComplianceIndex per folder per proses (jalur satu file: downloader/post-process)."""
+    key = os.path.abspath(folder or ".")
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is None:
+            index = _INDEXES[key] = ComplianceIndex(key)
+        return index
 
 def get_stream_info(file_path):
     """Retrieve all streams metadata using ffprobe."""
@@ -31,83 +215,99 @@ def get_stream_info(file_path):
         # print(f"[WARN] FFprobe check failed: {e}")
         return []
 
-def check_and_convert_video(video_path, target_mode='reels', force=False):
-    """
-    Validates and converts video to Meta-compliant format (H.264/AAC/MP4).
-    Uses smart detection to skip if already compliant (unless force=True).
-    """
-    if not os.path.exists(video_path):
-        return video_path, False
+# target_mode -> (width, height, rasio)
+TARGETS = {
+    'reels': (1080, 1920, "9:16"),
+    'feed':  (1080, 1350, "4:5"),
+}
 
-    # Init variables
-    folder = os.path.dirname(video_path)
-    filename = os.path.basename(video_path)
-    base_name, ext = os.path.splitext(filename)
+# Aksi yang menulis file baru, dari yang paling murah
+CONVERT_ACTIONS = ('remux', 'audio', 'transcode')
 
-    # 1. Check Dimensions/Resolution first (Fast Check)
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened(): return video_path, False
-    w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    duration = frames / fps if fps > 0 else 0
-    cap.release()
+# Counter jalur keputusan (+ detik media per jalur) untuk lihat CPU yang dihemat
+_STATS_LOCK = threading.Lock()
+CONVERSION_STATS = {a: 0 for a in ('ok', 'skip') + CONVERT_ACTIONS}
+CONVERSION_MEDIA_SECONDS = {a: 0.0 for a in CONVERT_ACTIONS}
 
-    # Check 0: Duration Validation (Max 180s)
-    if duration > 180 and not force:
-        print(f"  [SKIP] Duration {duration:.1f}s > 180s limit. Skipping conversion.")
-        return video_path, False
+def _count(action, info=None):
+    with _STATS_LOCK:
+        CONVERSION_STATS[action] = CONVERSION_STATS.get(action, 0) + 1
+        if action in CONVERSION_MEDIA_SECONDS and info:
+            CONVERSION_MEDIA_SECONDS[action] += float(info.get("duration") or 0)
 
-    # Config user target
-    if target_mode == 'feed':
-        target_w, target_h = 1080, 1350
-        ratio_str = "4:5"
-    else: # reels
-        target_w, target_h = 1080, 1920
-        ratio_str = "9:16"
+def conversion_stats():
+    """Snapshot counter: {'ok','skip','remux','audio','transcode', 'media_seconds': {...}}."""
+    with _STATS_LOCK:
+        return dict(CONVERSION_STATS, media_seconds=dict(CONVERSION_MEDIA_SECONDS))
 
-    needs_conversion = False
-    reason = ""
+def plan_conversion(video_path, target_mode='reels', force=False, index=None):
+    """
+    Keputusan tanpa encode, pilih operasi termurah yang valid.
+    Return (action, reason, info):
+      'ok'        -> sudah compliant
+      'skip'      -> tidak diproses (tidak terbaca / durasi > 180s)
+      'remux'     -> H.264/yuv420p/AAC & resolusi pas, cuma container (-c copy + faststart)
+      'audio'     -> video sudah pas, audio saja yang di-encode ke AAC
+      'transcode' -> re-encode video penuh (resolusi beda = perlu scale/pad)
+    """
+    target_w, target_h, _ = TARGETS.get(target_mode, TARGETS['reels'])
 
-    # Check 1: Resolution Validation
-    if w != target_w or h != target_h:
-        needs_conversion = True
-        reason = f"Resolution Mismatch ({w}x{h} != {target_w}x{target_h})"
-
-    # Check 2: Codec Validation (Slower Check)
-    if not needs_conversion and not force:
-        streams = get_stream_info(video_path)
-        video_ok = False
-        audio_ok = False
-        
-        for s in streams:
-            if s.get("codec_type") == "video":
-                # Meta loves h264 & yuv420p
-                if s.get("codec_name") == "h264" and s.get("pix_fmt") == "yuv420p":
-                    video_ok = True
-            elif s.get("codec_type") == "audio":
-                # Meta loves aac
-                if s.get("codec_name") == "aac":
-                    audio_ok = True
-        
-        if not video_ok or not audio_ok:
-            needs_conversion = True
-            reason = "Codec Incompatible (Need H.264/AAC/YUV420P)"
+    # 0. Compliance index: file yang sudah tercatat compliant tidak di-probe lagi
+    entry = None if (force or index is None) else index.lookup(video_path)
+    if entry and (entry.get("modes") or {}).get(target_mode):
+        return 'ok', "indexed", entry
 
-    if force:
-        needs_conversion = True
-        reason = "Force Re-encode Active"
+    # 1. Satu probe: dimensi, durasi, codec sekaligus
+    info = entry or get_media_info(video_path)
+    if not info:
+        return 'skip', "unreadable", None
+    w, h = info["w"], info["h"]
 
-    if not needs_conversion:
-        # print(f"  ✅ Skipping (Already Compliant): {filename}")
-        return video_path, False
+    # Check 0: Duration Validation (Max 180s)
+    if info["duration"] > 180 and not force:
+        return 'skip', "duration>180", info
 
-    print(f"  ⚠️  Processing: {filename}")
-    print(f"     Reason: {reason}")
-    print(f"     Target: {ratio_str} Ultimate Standard...")
+    if force:
+        return 'transcode', "Force Re-encode Active", info
 
-    temp_output = os.path.join(folder, f"{base_name}_temp.mp4")
+    # Check 1: Resolution Validation (scale/pad butuh decode+encode)
+    if w != target_w or h != target_h:
+        return 'transcode', f"Resolution Mismatch ({w}x{h} != {target_w}x{target_h})", info
+
+    # Check 2: Codec Validation (dari probe yang sama)
+    # Meta loves h264 & yuv420p + aac
+    video_ok = info["vcodec"] == "h264" and info["pix_fmt"] == "yuv420p"
+    if not video_ok:
+        return 'transcode', "Codec Incompatible (Need H.264/YUV420P)", info
+    if info["acodec"] and info["acodec"] != "aac":
+        return 'audio', f"Audio {info['acodec']} -> AAC (video stream copy)", info
+    if not video_path.lower().endswith(".mp4"):
+        return 'remux', "Container -> MP4 (stream copy)", info
+
+    return 'ok', "", info
+
+def format_action_summary(actions, media_seconds):
+    """Ringkasan jalur keputusan + berapa detik media yang lolos tanpa encode video penuh."""
+    parts = " | ".join(f"{a} {actions.get(a, 0)}" for a in ('ok',) + CONVERT_ACTIONS + ('skip',))
+    saved = sum(v for a, v in media_seconds.items() if a != 'transcode')
+    n_saved = sum(actions.get(a, 0) for a in ('remux', 'audio'))
+    return (f"Jalur: {parts}\n"
+            f"Tanpa re-encode video: {n_saved} file ({saved:.0f} detik media)")
+
+def _build_cmd(action, video_path, temp_output, target_w, target_h, threads=None):
+    if action in ('remux', 'audio'):
+        cmd = [
+            "ffmpeg", "-y", "-v", "error",
+            "-i", video_path,
+            "-map", "0:v:0", "-map", "0:a:0?",
+            "-map_metadata", "-1",
+            "-c:v", "copy",
+        ]
+        if action == 'audio':
+            cmd += ["-c:a", "aac", "-ar", "44100", "-b:a", "128k", "-ac", "2"]
+        else:
+            cmd += ["-c:a", "copy"]
+        return cmd + ["-movflags", "+faststart", temp_output]
 
     # Ultimate FFmpeg Command from User/Docs
     cmd = [
@@ -141,12 +341,74 @@ def check_and_convert_video(video_path, target_mode='reels', force=False):
         "-maxrate", "25M",
         "-bufsize", "35M",
         "-movflags", "+faststart",
-
-        temp_output
     ]
+    if threads:
+        # batch paralel: core dibagi rata antar job ffmpeg
+        cmd += ["-threads", str(int(threads))]
+    return cmd + [temp_output]
+
+def _run_ffmpeg(cmd, on_progress=None):
+    """Jalankan ffmpeg; on_progress(frame) dipanggil dari output -progress."""
+    if on_progress is None:
+        subprocess.run(cmd, check=True)
+        return
+    cmd = cmd[:1] + ["-progress", "pipe:1", "-nostats"] + cmd[1:]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True,
+                            encoding="utf-8", errors="replace")
+    for line in proc.stdout:
+        if line.startswith("frame="):
+            try:
+                on_progress(int(line.split("=", 1)[1]))
+            except ValueError:
+                pass
+    if proc.wait() != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+def check_and_convert_video(video_path, target_mode='reels', force=False, index=None,
+                            threads=None, on_progress=None):
+    """
+    Validates and converts video to Meta-compliant format (H.264/AAC/MP4).
+    Uses smart detection to skip if already compliant (unless force=True).
+    `index`: ComplianceIndex folder (batch); None -> index bersama folder
+    (get_compliance_index), hanya entry file ini yang ditulis.
+    `threads`: batas -threads ffmpeg (mode batch paralel).
+    """
+    if not os.path.exists(video_path):
+        return video_path, False
+
+    if index is None:
+        index = get_compliance_index(os.path.dirname(video_path) or ".")
+    return _check_and_convert(video_path, target_mode, force, index, threads, on_progress)
+
+def _check_and_convert(video_path, target_mode, force, index, threads=None, on_progress=None):
+    # Init variables
+    folder = os.path.dirname(video_path)
+    filename = os.path.basename(video_path)
+    base_name, ext = os.path.splitext(filename)
+
+    action, reason, info = plan_conversion(video_path, target_mode, force, index)
+    _count(action, info)
+    if action == 'skip':
+        if reason == "duration>180":
+            print(f"  [SKIP] Duration {info['duration']:.1f}s > 180s limit. Skipping conversion.")
+            index.record(video_path, info, target_mode, False, reason)
+        return video_path, False
+    if action == 'ok':
+        # print(f"  ✅ Skipping (Already Compliant): {filename}")
+        index.record(video_path, info, target_mode, True)
+        return video_path, False
+
+    target_w, target_h, ratio_str = TARGETS.get(target_mode, TARGETS['reels'])
+
+    print(f"  ⚠️  Processing: {filename}")
+    print(f"     Reason: {reason}")
+    print(f"     Target: {ratio_str} Ultimate Standard ({action})...")
+
+    temp_output = os.path.join(folder, f"{base_name}_temp.mp4")
+    cmd = _build_cmd(action, video_path, temp_output, target_w, target_h, threads)
 
     try:
-        subprocess.run(cmd, check=True)
+        _run_ffmpeg(cmd, on_progress)
         
         # Replace original file logic
         if os.path.exists(temp_output):
@@ -159,7 +421,11 @@ def check_and_convert_video(video_path, target_mode='reels', force=False):
             if os.path.exists(final_path):
                  os.remove(final_path)
             os.replace(temp_output, final_path)
-            
+
+            # hasil encode sudah sesuai target -> langsung tercatat compliant
+            acodec = info.get("acodec") if action == 'remux' else "aac"
+            index.record(final_path, dict(info, w=target_w, h=target_h, vcodec="h264",
+                                          acodec=acodec, pix_fmt="yuv420p"), target_mode, True)
             print(f"  ✅ Converted: {os.path.basename(final_path)}")
             return final_path, True
 
@@ -169,7 +435,139 @@ def check_and_convert_video(video_path, target_mode='reels', force=False):
 
     return video_path, False
 
-def sort_files_by_resolution(folder_path, target_mode='reels', force=False):
+# ---------- batch transcode paralel ----------
+TRANSCODE_STATE_NAME = ".transcode_state.json"
+
+def cpu_budget(jobs=None, cores=None):
+    """
+    (jobs, threads per job). x264 tidak skala linear di 1080x1920, jadi
+    default-nya banyak job kecil (±4 thread/job) daripada 1 job semua core.
+    """
+    cores = cores or os.cpu_count() or 2
+    if not jobs:
+        jobs = max(1, cores // 4)
+    jobs = max(1, min(int(jobs), cores))
+    return jobs, max(1, cores // jobs)
+
+class TranscodeState:
+    """State batch kecil (<folder>/.transcode_state.json) supaya run yang terputus bisa lanjut."""
+
+    def __init__(self, folder, target_mode, force):
+        self.path = os.path.join(folder, TRANSCODE_STATE_NAME)
+        self._lock = threading.Lock()
+        self.data = {"target_mode": target_mode, "force": bool(force), "done": [], "failed": []}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                old = json.load(f)
+            if old.get("target_mode") == target_mode and old.get("force") == bool(force):
+                self.data = old
+        except (OSError, ValueError):
+            pass
+
+    @property
+    def done(self):
+        return set(self.data["done"])
+
+    def mark(self, name, ok, new_name=None):
+        with self._lock:
+            self.data["done" if ok else "failed"].append(new_name or name)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+
+    def finish(self):
+        try: os.remove(self.path)
+        except OSError: pass
+
+def _fmt_eta(sec):
+    sec = int(max(0, sec))
+    return f"{sec // 3600:d}:{sec // 60 % 60:02d}:{sec % 60:02d}"
+
+def batch_convert(folder_path, target_mode='reels', force=False, jobs=None, threads=None,
+                  index=None, quiet=False):
+    """
+    Konversi paralel semua video non-compliant di folder: `jobs` ffmpeg
+    bersamaan, `-threads` dibagi rata (cpu_budget, atau `threads` eksplisit). ETA dari fps encode
+    terukur (frame selesai / detik) terhadap total frame yang tersisa.
+    Progress disimpan di .transcode_state.json; run berikutnya melewati
+    file yang sudah selesai. Return statistik dict.
+    """
+    jobs, auto_threads = cpu_budget(jobs)
+    threads = threads or auto_threads
+    own_index = index is None
+    if own_index:
+        index = get_compliance_index(folder_path)
+    state = TranscodeState(folder_path, target_mode, force)
+    done_before = state.done
+    video_extensions = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+    # 1. Rencana (tanpa encode): hanya file non-compliant yang masuk antrian
+    todo = []
+    actions, media = {}, {}
+    for name in sorted(os.listdir(folder_path)):
+        if not name.lower().endswith(video_extensions) or name in done_before:
+            continue
+        path = os.path.join(folder_path, name)
+        action, _reason, info = plan_conversion(path, target_mode, force, index)
+        actions[action] = actions.get(action, 0) + 1
+        if action in CONVERT_ACTIONS:
+            todo.append((path, info))
+            media[action] = media.get(action, 0.0) + float(info.get("duration") or 0)
+        elif action == 'ok':
+            index.record(path, info, target_mode, True)
+
+    stats = {"jobs": jobs, "threads": threads, "queued": len(todo),
+             "converted": 0, "failed": 0, "resumed": len(done_before), "seconds": 0.0,
+             "actions": actions, "media_seconds": media}
+    if not todo:
+        if own_index: index.prune()
+        state.finish()
+        return stats
+
+    total_frames = sum(max(1, int((i.get("duration") or 0) * (i.get("fps") or 30))) for _, i in todo)
+    progress = {"frames": 0}
+    plock = threading.Lock()
+    t0 = time.monotonic()
+    if not quiet:
+        print(f"[BATCH] {len(todo)} file, {jobs} job x {threads} thread"
+              + (f" (lanjut, {len(done_before)} sudah selesai)" if done_before else ""))
+
+    def _one(path):
+        last = [0]
+        def _cb(frame):
+            with plock:
+                progress["frames"] += max(0, frame - last[0])
+            last[0] = frame
+        return check_and_convert_video(path, target_mode, force, index=index,
+                                       threads=threads, on_progress=_cb)
+
+    with ThreadPoolExecutor(max_workers=jobs) as ex:
+        futs = {ex.submit(_one, p): p for p, _ in todo}
+        for k, fut in enumerate(as_completed(futs), 1):
+            src = futs[fut]
+            try:
+                new_path, converted = fut.result()
+            except Exception as e:
+                new_path, converted = src, False
+                print(f"  ❌ {os.path.basename(src)}: {e}")
+            stats["converted" if converted else "failed"] += 1
+            state.mark(os.path.basename(src), converted, os.path.basename(new_path))
+            if not quiet:
+                el = time.monotonic() - t0
+                with plock:
+                    fr = progress["frames"]
+                fps = fr / el if el > 0 else 0.0
+                eta = (total_frames - fr) / fps if fps > 0 else 0
+                print(f"[BATCH] {k}/{len(todo)} | {fps:6.1f} fps | ETA {_fmt_eta(eta)}")
+
+    stats["seconds"] = time.monotonic() - t0
+    if own_index: index.prune()
+    if not stats["failed"]:
+        state.finish()
+    return stats
+
+def sort_files_by_resolution(folder_path, target_mode='reels', force=False, jobs=None):
     if not os.path.exists(folder_path):
         print(f"Error: Folder '{folder_path}' tidak ditemukan.")
         return
@@ -209,6 +607,15 @@ def sort_files_by_resolution(folder_path, target_mode='reels', force=False):
     all_files = os.listdir(folder_path)
     # Sort agar urutan file yang dipindah konsisten (misal berdasarkan nama)
     all_files.sort() 
+
+    # Satu index untuk seluruh folder: file yang sudah compliant tidak di-probe/convert ulang
+    index = get_compliance_index(folder_path)
+
+    # Konversi paralel dulu (N job ffmpeg, -threads dibagi); loop di bawah
+    # tinggal memindahkan file yang sudah compliant.
+    batch = batch_convert(folder_path, target_mode, force, jobs=jobs, index=index)
+    force = False  # sudah di-encode ulang di batch; jangan encode dua kali
+    all_files = sorted(os.listdir(folder_path))
     
     for original_filename in all_files:
         # Hanya proses jika itu adalah VIDEO
@@ -218,7 +625,7 @@ def sort_files_by_resolution(folder_path, target_mode='reels', force=False):
             # --- AUTO CONVERT LOGIC ---
             # Cek dan ubah jika perlu SEBELUM di-sort
             # Catch updated path (if extension changed from .webm to .mp4)
-            video_full_path, converted = check_and_convert_video(video_full_path, target_mode, force)
+            video_full_path, converted = check_and_convert_video(video_full_path, target_mode, force, index=index)
             
             # Update filename variable because it is used below for destination path logic
             current_filename = os.path.basename(video_full_path)
@@ -227,15 +634,12 @@ def sort_files_by_resolution(folder_path, target_mode='reels', force=False):
                 converted_count += 1
             # -------------------------------
             
-            # Cek ulang resolusi (mungkin sudah berubah setelah convert)
-            cap = cv2.VideoCapture(video_full_path)
-            if cap.isOpened():
-                w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                fps = cap.get(cv2.CAP_PROP_FPS)
-                frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                duration = frames / fps if fps > 0 else 0
-                cap.release() # Tutup video
+            # Resolusi/durasi dari compliance index (baru saja dicatat oleh
+            # check_and_convert_video); probe hanya kalau belum ada
+            info = index.lookup(video_full_path) or get_media_info(video_full_path)
+            if info:
+                w, h = info["w"], info["h"]
+                duration = info["duration"]
                 
                 # Nama folder tujuan
                 if duration > 180:
@@ -308,12 +712,14 @@ def sort_files_by_resolution(folder_path, target_mode='reels', force=False):
                 
                 moved_count += 1
             else:
-                cap.release()
                 print(f"[SKIP] Video rusak/tidak terbaca: {original_filename}")
 
+    index.prune()
+
     print("-" * 50)
     print(f"Selesai! Total {moved_count} pasang file dikelompokkan.")
-    print(f"Total berhasil dikonversi otomatis: {converted_count}")
+    print(f"Total berhasil dikonversi otomatis: {converted_count + batch['converted']}")
+    print(format_action_summary(batch["actions"], batch["media_seconds"]))
 
 # --- PENGGUNAAN ---
 if __name__ == "__main__":
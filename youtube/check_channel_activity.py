@@ -38,6 +38,9 @@ FETCH_PER_CHANNEL: int = 20
 # Angka = hanya proses N channel pertama (berguna untuk test cepat)
 CHANNEL_LIMIT = None   # contoh: CHANNEL_LIMIT = 10
 
+# Jumlah fetch upload_date paralel per channel (Phase 2)
+ENRICH_WORKERS: int = 4
+
 # Path file sumber URL (relatif dari lokasi script ini)
 INPUT_FILE: str = "short_link.txt"
 
@@ -180,6 +183,27 @@ def _get_single_video_date(video_id: str) -> tuple:
         return None, "Unknown"
 
 
+def _enrich_dates_parallel(entries: list, max_fetch: int, cutoff: date) -> bool:
+    """
+    Isi upload_date entri flat lewat service enrichment main4
+    (cache DB data/ytshorts.db + fetch paralel + early-stop).
+    Return False kalau package yt_short_downloader tidak bisa dipakai
+    → pemanggil jatuh ke loop sekuensial lama.
+    """
+    try:
+        from yt_short_downloader.enrich import UploadDateEnricher
+        from yt_short_downloader.db_sqlite import SqliteStore
+    except Exception:
+        return False
+    try:
+        store = SqliteStore()
+    except Exception:
+        store = None
+    UploadDateEnricher(store=store, max_workers=ENRICH_WORKERS).enrich(
+        entries, max_tasks=max_fetch, cutoff=datetime.combine(cutoff, datetime.min.time()))
+    return True
+
+
 def fetch_ytdlp(channel_url: str, max_fetch: int) -> dict | None:
     """
     2-Phase fetch (terinspirasi main4.py):
@@ -193,6 +217,8 @@ def fetch_ytdlp(channel_url: str, max_fetch: int) -> dict | None:
         Untuk setiap video ID, fetch info lengkap (termasuk upload_date).
         Playlist sudah diurutkan terbaru → terlama, jadi begitu ketemu video
         yang lebih tua dari cutoff → BERHENTI (tidak perlu scan sisa).
+        Fetch jalan paralel (ENRICH_WORKERS) dan tanggal yang sudah ada di
+        DB main4 dipakai langsung tanpa network.
 
         Efeknya:
           - Channel inactive : 1–2 individual call → selesai sangat cepat
@@ -235,15 +261,18 @@ def fetch_ytdlp(channel_url: str, max_fetch: int) -> dict | None:
     videos      = []
     skipped_old = 0
 
+    # Prefetch paralel; entri yang berhasil terisi upload_date 'YYYY-MM-DD'
+    enriched = _enrich_dates_parallel(entries, max_fetch, cutoff)
+
     for e in entries[:max_fetch]:
         vid_id = e.get("id", "")
 
-        # Cek apakah flat extraction sudah menyediakan upload_date (kadang ada)
-        upload_d = _parse_raw_date(e.get("upload_date") or "")
+        # Cek apakah flat extraction / enrichment sudah menyediakan upload_date
+        upload_d = _parse_raw_date((e.get("upload_date") or "").replace("-", ""))
         title    = (e.get("title") or "Unknown")[:120]
 
         # Jika tidak ada dari flat → enrichment individual (main4.py style)
-        if upload_d is None:
+        if upload_d is None and not enriched:
             upload_d, title_fetched = _get_single_video_date(vid_id)
             if title == "Unknown" or not title:
                 title = title_fetched
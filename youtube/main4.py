@@ -2,7 +2,6 @@ import os
 import re
 import time
 import random
-import subprocess
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Tuple
 
@@ -20,12 +19,16 @@ LINK_FILE: str = "short_link.txt"
 # import cek_resolusi
 # import add_costume_hastag
 
-from yt_short_downloader.config import DEFAULT_OUTPUT_DIR, DEFAULT_FILE_FORMAT
+from yt_short_downloader.config import (
+    DEFAULT_OUTPUT_DIR, DEFAULT_FILE_FORMAT, LISTING_WORKERS, LISTING_RATE, ENRICH_WORKERS,
+)
 from yt_short_downloader.ytdlp_tools import check_yt_dlp_installation
 from yt_short_downloader.fetch import get_short_links
 from yt_short_downloader.orchestrator import download_videos_with_db
+from yt_short_downloader.discovery import ChannelDiscovery, HostRateLimiter
+from yt_short_downloader.enrich import UploadDateEnricher
+from yt_short_downloader.postprocess import drain_postprocess
 from yt_short_downloader.utils import normalize_upload_date, parse_upload_date
-import subprocess
 
 # Store: pakai SQLite yang stabil. Fallback TinyDB jika modul tidak ada.
 try:
@@ -34,12 +37,13 @@ except Exception:
     from yt_short_downloader.db import TinyStore as Store
 
 
-def enrich_missing_upload_dates(entries: List[Dict], max_tasks: int = 25, days: Optional[int] = None) -> int:
+def enrich_missing_upload_dates(entries: List[Dict], max_tasks: int = 25, days: Optional[int] = None,
+                                store: Optional[Store] = None, channel_key: Optional[str] = None) -> int:
     """
-    Ambil upload_date untuk sebagian entri yang kosong (yt-dlp extract_flat sering kali null di shorts),
-    dengan memanggil yt-dlp --dump-single-json per video.
+    Ambil upload_date untuk sebagian entri yang kosong (yt-dlp extract_flat sering kali null di shorts).
+    ID yang tanggalnya sudah ada di DB (videos.upload_date) tidak kena network; sisanya
+    di-fetch paralel dengan early-stop begitu ketemu video lebih tua dari cutoff.
     """
-    filled = 0
     targets = [e for e in entries if not normalize_upload_date(e.get("upload_date"))][:max_tasks]
     if not targets:
         return 0
@@ -49,36 +53,13 @@ def enrich_missing_upload_dates(entries: List[Dict], max_tasks: int = 25, days:
         cutoff = datetime.utcnow() - timedelta(days=days)
 
     print(f"[DEBUG] Enrichment: mencoba melengkapi tanggal untuk {len(targets)} video (maks {max_tasks})...")
-    for e in targets:
-        vid = e.get("id")
-        url = f"https://www.youtube.com/shorts/{vid}"
-        try:
-            res = subprocess.run(
-                ["yt-dlp", url, "--skip-download", "--dump-single-json", "--no-check-certificate",
-                 "--restrict-filenames", "--ignore-no-formats-error"],
-                capture_output=True, text=True, timeout=45, encoding="utf-8", errors="replace"
-            )
-            if res.returncode == 0 and res.stdout:
-                import json
-                data = json.loads(res.stdout)
-                up = data.get("upload_date")
-                norm = normalize_upload_date(up)
-                if norm:
-                    e["upload_date"] = norm
-                    filled += 1
-                    # print(f"  [+] {vid} -> upload_date={norm}")
-
-                    # Optimization: Stop if we found a video older than cutoff
-                    if cutoff:
-                        dt = parse_upload_date(norm)
-                        if dt and dt < cutoff:
-                            print(f"  [Info] Found video older than {days} days ({norm}). Stopping enrichment.")
-                            break
-                else:
-                    pass # print(f"  [-] {vid} -> upload_date tidak valid: {up!r}")
-        except Exception as ex:
-            print(f"  [!] Exception saat enrichment {vid}: {ex}")
-    print(f"[DEBUG] Enrichment selesai. Berhasil isi tanggal: {filled}")
+    enricher = UploadDateEnricher(store=store, max_workers=ENRICH_WORKERS, channel_key=channel_key)
+    res = enricher.enrich(entries, max_tasks=max_tasks, cutoff=cutoff)
+    if res["stopped_at"] >= 0:
+        print(f"  [Info] Found video older than {days} days. Stopping enrichment.")
+    filled = res["cached"] + res["fetched"]
+    print(f"[DEBUG] Enrichment selesai. Berhasil isi tanggal: {filled} "
+          f"(DB: {res['cached']}, network: {res['fetched']}, gagal: {res['failed']})")
     return filled
 
 
@@ -181,19 +162,26 @@ def ask_quality() -> str:
     return "best"
 
 
-def process_channel(channel_url: str, days: Optional[int], quality: str, file_format: str, store: Store, output_directory: str) -> Tuple[int, int, int]:
-    print(f"\nProcessing Channel: {channel_url}")
-    print("-" * 50)
-    
+def discover_channel(channel_url: str, days: Optional[int], limiter: Optional[HostRateLimiter] = None,
+                     store: Optional[Store] = None) -> Optional[Dict]:
+    """
+    Tahap discovery: listing + filter tanggal (+ enrichment). Aman dijalankan
+    paralel untuk banyak channel. Return {"url", "channel_name", "entries"}
+    atau None kalau tidak ada kandidat.
+    """
     try:
-        all_entries, channel_name = get_short_links(channel_url)
+        all_entries, channel_name = get_short_links(channel_url, limiter=limiter)
     except Exception as e:
-        print(f"Error fetching channel: {e}")
-        return 0, 0, 0
+        print(f"[DISCOVER] Error fetching channel {channel_url}: {e}")
+        return None
 
     if not all_entries:
-        print(f"Skipping {channel_url}: No videos found or failed to fetch.")
-        return 0, 0, 0
+        print(f"[DISCOVER] Skipping {channel_url}: No videos found or failed to fetch.")
+        return None
+
+    # Tanggal yang sudah diketahui dari run sebelumnya (DB, tanpa network)
+    if store is not None:
+        UploadDateEnricher(store=store).fill_cached(all_entries)
 
     # Filter by date
     candidate_entries = filter_entries_by_days(all_entries, days)
@@ -204,28 +192,37 @@ def process_channel(channel_url: str, days: Optional[int], quality: str, file_fo
         missing_total = sum(1 for e in all_entries if not parse_upload_date(e.get("upload_date")))
         if missing_total:
             # Kita coba enrich lebih banyak jika mode batch (misal 50)
-            print(f"\n[INFO] {missing_total} entries missing date. Auto-enriching top 50 to find recent videos...")
-            enrich_missing_upload_dates(all_entries, max_tasks=50, days=days)
+            print(f"[DISCOVER] {channel_name}: {missing_total} entries missing date. Auto-enriching top 50 to find recent videos...")
+            enrich_missing_upload_dates(all_entries, max_tasks=50, days=days, store=store,
+                                        channel_key=channel_url.split("/about")[0])
             # Re-filter setelah enrichment
             candidate_entries = filter_entries_by_days(all_entries, days)
 
     if days is not None and not candidate_entries:
-        print(f"Tidak ada video dalam {days} hari terakhir untuk channel ini.")
-        return 0, 0, 0
+        print(f"[DISCOVER] {channel_name}: Tidak ada video dalam {days} hari terakhir.")
+        return None
+
+    print(f"[DISCOVER] {channel_name}: {len(candidate_entries)} candidate videos")
+    return {"url": channel_url, "channel_name": channel_name, "entries": candidate_entries}
+
+
+def download_channel(discovered: Dict, quality: str, file_format: str, store: Store, output_directory: str) -> Tuple[int, int, int]:
+    """Tahap download: DB upsert, dedupe, lalu download entri baru."""
+    channel_url = discovered["url"]
+    channel_name = discovered["channel_name"]
+    candidate_entries = discovered["entries"]
 
     # DB & Dedupe
     channel_key = channel_url.split("/about")[0]
     store.upsert_channel(channel_key=channel_key, name=channel_name, url=channel_key)
 
-    kept_entries: List[Dict] = []
-    for e in candidate_entries:
-        vid = e.get("id")
-        title = e.get("title", "Unknown Title")
-        up = normalize_upload_date(e.get("upload_date"))
-        store.upsert_video(channel_key=channel_key, video_id=vid, title=title, upload_date=up)
-        
-        if not store.is_downloaded(channel_key, vid):
-            kept_entries.append(e)
+    # Satu transaksi upsert + satu query dedupe per channel (bukan 2N round trip)
+    store.upsert_videos_bulk(channel_key, [
+        (e.get("id"), e.get("title", "Unknown Title"), normalize_upload_date(e.get("upload_date")))
+        for e in candidate_entries
+    ])
+    pending = set(store.filter_not_downloaded(channel_key, [e.get("id") for e in candidate_entries]))
+    kept_entries: List[Dict] = [e for e in candidate_entries if e.get("id") in pending]
 
     skipped_dupe = len(candidate_entries) - len(kept_entries)
     found_filtered = len(candidate_entries)
@@ -253,6 +250,16 @@ def process_channel(channel_url: str, days: Optional[int], quality: str, file_fo
     return found_filtered, skipped_dupe, queued_count
 
 
+def process_channel(channel_url: str, days: Optional[int], quality: str, file_format: str, store: Store, output_directory: str) -> Tuple[int, int, int]:
+    """Discovery + download satu channel secara berurutan."""
+    print(f"\nProcessing Channel: {channel_url}")
+    print("-" * 50)
+    discovered = discover_channel(channel_url, days, store=store)
+    if not discovered:
+        return 0, 0, 0
+    return download_channel(discovered, quality, file_format, store, output_directory)
+
+
 def count_files(directory: str) -> int:
     """Recursively counting files to track new downloads accurately."""
     total = 0
@@ -316,18 +323,34 @@ def main():
         
         start_time = time.time()
 
-        for i, link in enumerate(links, 1):
-            print(f"\n[{i}/{len(links)}] processing...")
+        # Discovery paralel (pool + rate limit per host); channel yang sudah
+        # selesai di-listing langsung masuk tahap download.
+        limiter = HostRateLimiter(rate=LISTING_RATE)
+        discovery = ChannelDiscovery(lambda link: discover_channel(link, days, limiter, store),
+                                     max_workers=LISTING_WORKERS)
+        print(f"Discovery: {LISTING_WORKERS} channels in parallel, max {LISTING_RATE} listing req/s per host")
+
+        for i, (link, discovered, err) in enumerate(discovery.run(links), 1):
+            print(f"\n[{i}/{len(links)}] processing {link}")
+            print("-" * 50)
+            if err is not None:
+                print(f"Error processing {link}: {err}")
+                if isinstance(err, KeyboardInterrupt):
+                    raise err
+                continue
+            stats["channels_processed"] += 1
+            if not discovered:
+                continue
             try:
-                found, skipped, queued = process_channel(link, days, quality, file_format, store, output_directory)
-                stats["channels_processed"] += 1
+                found, skipped, queued = download_channel(discovered, quality, file_format, store, output_directory)
                 stats["total_found"] += found
                 stats["total_skipped"] += skipped
                 stats["total_queued"] += queued
                 
                 # Jeda antar channel untuk menghindari rate-limit/ban YouTube
-                # "terlalu banyak error" bisa jadi karena terlalu agresif
-                if i < len(links):
+                # "terlalu banyak error" bisa jadi karena terlalu agresif.
+                # Hanya setelah channel yang benar-benar men-download sesuatu.
+                if queued and i < len(links):
                     sleep_sec = random.randint(10, 20)
                     print(f"Sleeping for {sleep_sec} seconds before next channel...")
                     time.sleep(sleep_sec)
@@ -337,6 +360,9 @@ def main():
                 import traceback
                 traceback.print_exc()
 
+        # Tunggu upscale/convert yang masih jalan di tahap post-process
+        drain_postprocess()
+
         final_file_count = count_files(output_directory)
         
         # Approximate new files (videos + txts + artifacts)
@@ -2,6 +2,9 @@ import os
 import sqlite3
 import glob
 
+from yt_short_downloader.folder_index import walk_folder_indexes
+from yt_short_downloader.video_files import get_video_file_index
+
 def repair_database():
     print("YouTube Shorts DB Repair Tool")
     print("==============================\n")
@@ -29,20 +32,17 @@ def repair_database():
     print(f"[INFO] Scanning Files in : {default_dir}")
     print("Sedang memindai file fisik... (mohon tunggu)")
 
-    # 3. Index Semua File Fisik (Recursive)
-    # Kita cari semua file .mp4 untuk perbandingan
-    physical_files = set()
-    for root, dirs, files in os.walk(default_dir):
-        for file in files:
-            if file.lower().endswith(".mp4"):
-                physical_files.add(file)
-    
-    # Gabungkan semua nama file jadi satu string panjang untuk pencarian substring (ID)
-    # Ini trik cepat karena nama file kita formatnya "INDEX - JUDUL - ID.mp4" atau sejenisnya
-    # Tapi lebih aman kita simpan set untuk checking exact match jika memungkinkan, 
-    # namun karena format nama file dinamis, kita lebih baik cari ID di dalam nama file.
+    # 3. Index Semua File Fisik (Recursive) lewat reverse index video_files:
+    # video_id dari baris 'Link:' di .txt pasangan + ID di nama file. Hanya
+    # folder yang berubah sejak refresh terakhir yang dibaca ulang.
+    physical_files = 0
+    for fidx in walk_folder_indexes(default_dir):
+        physical_files += sum(1 for n in fidx.names() if n.lower().endswith(".mp4"))
+    file_index = get_video_file_index()
+    file_index.refresh(default_dir)
+    physical_ids = file_index.present_ids(default_dir)
     
-    print(f"[INFO] Ditemukan {len(physical_files)} file video .mp4 di disk.")
+    print(f"[INFO] Ditemukan {physical_files} file video .mp4 di disk.")
 
     # 4. Buka Database
     try:
@@ -61,13 +61,7 @@ def repair_database():
         
         for video_id, title in rows:
             # Logic Check: Apakah video_id ada di salah satu nama file fisik?
-            # Kita loop simple search. (Bisa lambat jika ribuan file, tapi ok untuk tool repair)
-            
-            found = False
-            for fname in physical_files:
-                if video_id in fname:
-                    found = True
-                    break
+            found = video_id in physical_ids
             
             if not found:
                 # Video ID ini tidak ada di folder -> Phantom Entry!
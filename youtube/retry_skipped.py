@@ -2,12 +2,14 @@ import os
 import sys
 import sqlite3
 from collections import defaultdict
-from typing import List, Dict, Set
+from typing import List, Dict, Set, Tuple
 import json
 import urllib.request
 import urllib.error
 import time
 import subprocess
+import argparse
+from datetime import datetime
 
 # Ensure we can import modules from parent/current dir
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -19,8 +21,14 @@ if parent_dir not in sys.path:
 try:
     from youtube.yt_short_downloader.db_sqlite import SqliteStore
     from youtube.yt_short_downloader.orchestrator import download_videos_with_db
-    from youtube.yt_short_downloader.config import DEFAULT_OUTPUT_DIR
-    from youtube.yt_short_downloader.utils import create_safe_filename
+    from youtube.yt_short_downloader.config import DEFAULT_OUTPUT_DIR, RETRY_WORKERS_MAX, RETRY_ROUNDS, RETRY_BACKOFF
+    from youtube.yt_short_downloader.utils import create_safe_filename, get_existing_index
+    from youtube.yt_short_downloader.downloader import download_video, last_failure_reason, session_signals
+    from youtube.yt_short_downloader.scheduler import AIMDLimit, AdaptiveScheduler
+    from youtube.yt_short_downloader.postprocess import drain_postprocess
+    from youtube.yt_short_downloader.folder_index import ids_from_name, walk_folder_indexes
+    from youtube.yt_short_downloader.video_files import get_video_file_index
+    from youtube.yt_short_downloader.failures import get_failure_ledger
     from youtube.utility.cleanup import cleanup_incomplete_downloads
     from youtube.yt_short_downloader.pytube_downloader import download_pytube
     from youtube.sort import sort_videos_by_channel
@@ -29,8 +37,14 @@ except ImportError:
     # Fallback if run from root
     from yt_short_downloader.db_sqlite import SqliteStore
     from yt_short_downloader.orchestrator import download_videos_with_db
-    from yt_short_downloader.config import DEFAULT_OUTPUT_DIR
-    from yt_short_downloader.utils import create_safe_filename
+    from yt_short_downloader.config import DEFAULT_OUTPUT_DIR, RETRY_WORKERS_MAX, RETRY_ROUNDS, RETRY_BACKOFF
+    from yt_short_downloader.utils import create_safe_filename, get_existing_index
+    from yt_short_downloader.downloader import download_video, last_failure_reason, session_signals
+    from yt_short_downloader.scheduler import AIMDLimit, AdaptiveScheduler
+    from yt_short_downloader.postprocess import drain_postprocess
+    from yt_short_downloader.folder_index import ids_from_name, walk_folder_indexes
+    from yt_short_downloader.video_files import get_video_file_index
+    from yt_short_downloader.failures import get_failure_ledger
     # Assuming relative path for these if generic import fails
     try:
         from utility.cleanup import cleanup_incomplete_downloads
@@ -97,23 +111,25 @@ def get_channel_info(store: SqliteStore, video_id: str):
     return None, None
 
 def get_all_downloaded_ids(output_dir: str) -> Set[str]:
-    existing_ids = set()
+    """
+    Video ID yang punya .mp4 di output_dir (rekursif), dari reverse index
+    video_files (baris 'Link:' di .txt + ID di nama file). Hanya folder yang
+    berubah sejak refresh terakhir yang dibaca ulang.
+    """
     if not os.path.exists(output_dir):
-        return existing_ids
-    
-    # Check all mp4 files
-    all_files = []
-    for root, dirs, files in os.walk(output_dir):
-        for f in files:
-             if f.lower().endswith(".mp4"):
-                 all_files.append(f)
-    return set(all_files)
-
-def id_exists_in_files(vid_id: str, file_list: Set[str]) -> bool:
-    for fname in file_list:
-        if vid_id in fname:
-            return True
-    return False
+        return set()
+    index = get_video_file_index()
+    index.refresh(output_dir)
+    return index.present_ids(output_dir)
+
+def id_exists_in_files(vid_id: str, existing_ids: Set[str]) -> bool:
+    return vid_id in existing_ids
+
+def _find_video_paths(folder: str, vid: str) -> List[str]:
+    folder = os.path.abspath(folder)
+    return [r["mp4"] for r in get_video_file_index().lookup(vid)
+            if r["mp4"] and os.path.dirname(r["mp4"]) == folder
+            and r["mp4"].lower().endswith(('.mp4', '.webm', '.mkv')) and os.path.exists(r["mp4"])]
 
 def normalize_and_reconstruct_filenames(output_path: str):
     """
@@ -123,8 +139,9 @@ def normalize_and_reconstruct_filenames(output_path: str):
     """
     print("  [NORMALIZE] 1. Stripping 'Retry -' prefix...")
     count_strip = 0
-    for root, dirs, files in os.walk(output_path):
-        for f in files:
+    for fidx in walk_folder_indexes(output_path):
+        root = fidx.path
+        for f in fidx.names():
             if f.startswith("Retry - "):
                 old_path = os.path.join(root, f)
                 new_name = f.replace("Retry - ", "", 1)
@@ -143,69 +160,26 @@ def normalize_and_reconstruct_filenames(output_path: str):
     # Build Map: VideoID -> BaseFilename (from .txt)
     # .txt format: "Index - Title - Channel.txt" or "Title - ID.txt"
     # We trust the .txt filename is the desired target.
-    id_to_base = {}
-    
-    # 1. Scan all txt files
-    txt_files = []
-    for root, dirs, files in os.walk(output_path):
-        for f in files:
-            if f.lower().endswith(".txt") and "skipped" not in f:
-                txt_files.append(os.path.join(root, f))
-    
-    for txt_path in txt_files:
-        try:
-            with open(txt_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-                # Find Link: ... v=VIDEO_ID
-                match = None
-                # Method A: Regex for youtube link
-                # Link: https://www.youtube.com/watch?v=4zBZTAI34ts
-                import re
-                id_match = re.search(r'v=([a-zA-Z0-9_-]{11})', content)
-                if id_match:
-                    vid_id = id_match.group(1)
-                    # Base name without ext
-                    base_name = os.path.splitext(os.path.basename(txt_path))[0]
-                    id_to_base[vid_id] = base_name
-        except: pass
+    index = get_video_file_index()
+    index.refresh(output_path)
+    id_to_base = {vid: os.path.splitext(os.path.basename(txt))[0]
+                  for vid, txt in index.captions_under(output_path).items()}
         
     print(f"  [METADATA] Mapped {len(id_to_base)} IDs from text files.")
     
     # 2. Scan mp4 files and rename if possible
     mp4_files = []
-    for root, dirs, files in os.walk(output_path):
-        for f in files:
-             if f.lower().endswith(".mp4"):
-                 mp4_files.append(os.path.join(root, f))
+    for fidx in walk_folder_indexes(output_path):
+        mp4_files.extend(os.path.join(fidx.path, f) for f in fidx.names() if f.lower().endswith(".mp4"))
                  
     count_recon = 0
     for mp4_path in mp4_files:
         filename = os.path.basename(mp4_path)
         
-        # Check if this file contains an ID we know
-        # Strategy: check if any ID in our map is a substring of this filename
-        # This is expensive O(N*M), but N (mp4) and M (ids) are small (~100).
-        
-        matched_id = None
-        matched_base = None
-        
-        # Heuristic: Extract ID from filename end? "Title - ID.mp4"
-        # Split by ' - ' and take last part?
-        base_no_ext = os.path.splitext(filename)[0]
-        parts = base_no_ext.split(' - ')
-        if parts:
-            potential_id = parts[-1].strip()
-            if len(potential_id) == 11 and potential_id in id_to_base:
-                matched_id = potential_id
-                matched_base = id_to_base[potential_id]
-        
-        # Fallback: substring search
-        if not matched_id:
-            for vid_id, base in id_to_base.items():
-                if vid_id in filename:
-                    matched_id = vid_id
-                    matched_base = base
-                    break
+        # ID dibaca dari nama file ("Title - ID", "video_ID", "[ID]") lalu
+        # dicocokkan ke map (lookup dict, bukan substring scan semua ID)
+        matched_id = next((v for v in sorted(ids_from_name(filename)) if v in id_to_base), None)
+        matched_base = id_to_base.get(matched_id) if matched_id else None
         
         if matched_id and matched_base:
             # Check if rename needed
@@ -264,6 +238,200 @@ def run_cookie_retry(video_url: str, output_path: str, browser: str) -> bool:
         print("    [ERR] yt-dlp not found in PATH.")
         return False
 
+# --- BULK RETRY ---
+
+def _skip_time(line: str) -> float:
+    # "[YYYY-mm-dd HH:MM:SS] SKIP ..." -> timestamp (0 kalau format lain)
+    try:
+        return datetime.strptime(line[1:20], "%Y-%m-%d %H:%M:%S").timestamp()
+    except ValueError:
+        return 0.0
+
+def _under(path: str, root: str) -> bool:
+    path, root = os.path.abspath(path), os.path.abspath(root)
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+def collect_skipped(root_dir: str, ledger=None) -> Dict[str, Dict]:
+    """
+    Skip yang belum resolved di bawah root_dir -> {video_id: entry}, satu
+    entry per ID (skip terbaru menang). Sumber utama ledger failures.db;
+    skipped.txt tetap dibaca untuk skip lama sebelum ledger ada.
+    entry["files"] = skipped.txt yang memuat ID itu.
+    """
+    merged: Dict[str, Dict] = {}
+    for r in (ledger.pending() if ledger else []):
+        folder = r.get("output_path")
+        if not folder or not _under(folder, root_dir):
+            continue
+        vid = r["video_id"]
+        merged[vid] = {
+            "line": None, "id": vid, "title": r.get("title") or "Unknown Title",
+            "url": f"https://www.youtube.com/watch?v={vid}", "ts": r["ts"] or 0.0,
+            "folder": folder, "files": set(), "ledger_channel": r.get("channel"),
+            "reason": r.get("error_class"),
+        }
+    for path in find_skipped_files(root_dir):
+        for e in parse_skipped_file(path):
+            ts = _skip_time(e["line"])
+            cur = merged.get(e["id"])
+            if cur is None:
+                merged[e["id"]] = dict(e, ts=ts, folder=os.path.dirname(path), files={path})
+                continue
+            cur["files"].add(path)
+            if ts > cur["ts"]:
+                cur.update(e, ts=ts, folder=os.path.dirname(path))
+    return merged
+
+def plan_bulk_retry(root_dir: str, store, ledger=None) -> Tuple[List[Dict], Set[str], Dict[str, Dict]]:
+    """
+    Dedupe lintas folder, buang yang sudah ada di disk, kelompokkan per
+    channel lalu urutkan: channel dengan skip terbaru dulu, di dalamnya skip
+    terbaru dulu. Return (jobs, resolved_ids, merged).
+    """
+    merged = collect_skipped(root_dir, ledger)
+    on_disk = get_all_downloaded_ids(root_dir) if merged else set()
+    # DB bilang downloaded tapi file tidak ada -> tetap di-retry (sama seperti mode biasa)
+    resolved = {vid for vid in merged if vid in on_disk}
+
+    groups: Dict[Tuple[str, str], List[Dict]] = defaultdict(list)
+    for vid, e in merged.items():
+        if vid in resolved:
+            continue
+        ckey, cname = get_channel_info(store, vid) if store else (None, None)
+        ckey = ckey or e.get("ledger_channel")
+        out = os.path.join(e["folder"], create_safe_filename(cname, 50)) if cname else e["folder"]
+        groups[(ckey or "mb_retry_key", out)].append(
+            dict(e, channel_key=ckey or "mb_retry_key", channel=cname or "Unknown Channel",
+                 output=out))
+
+    jobs: List[Dict] = []
+    for (_ckey, out), items in sorted(groups.items(), key=lambda kv: -max(i["ts"] for i in kv[1])):
+        items.sort(key=lambda i: -i["ts"])
+        os.makedirs(out, exist_ok=True)
+        try:
+            idxs = store.reserve_indices(out, len(items), get_existing_index(out)) if store else None
+        except Exception:
+            idxs = None
+        if not idxs:
+            start = get_existing_index(out) + 1
+            idxs = list(range(start, start + len(items)))
+        for item, idx in zip(items, idxs):
+            item["index"] = idx
+            jobs.append(item)
+    return jobs, resolved, merged
+
+def run_bulk_retry(jobs: List[Dict], store, max_workers: int = RETRY_WORKERS_MAX) -> Tuple[Set[str], Dict[str, str]]:
+    """
+    Jalankan retry lewat AdaptiveScheduler yang sama dengan downloader, tapi
+    dengan budget concurrency sendiri (max RETRY_WORKERS_MAX, mulai dari 1).
+    Gagal karena 403/network di-antre ke putaran berikutnya setelah jeda
+    RETRY_BACKOFF[alasan]; unavailable / lowres tidak diulang.
+    Return (id sukses, {id: alasan gagal terakhir}).
+    """
+    ok_ids: Set[str] = set()
+    reasons: Dict[str, str] = {}
+    sig0 = session_signals()
+    t0 = time.monotonic()
+    attempts = 0
+    pending = [(rank, job) for rank, job in enumerate(jobs)]
+
+    def _task(job: Dict) -> bool:
+        return download_video(
+            job["id"], job.get("title") or "Unknown Title", job["output"], job["channel"],
+            "best", "mp4", job["index"], channel_key=job["channel_key"],
+        )
+
+    for rnd in range(1, RETRY_ROUNDS + 1):
+        if not pending:
+            break
+        print(f"\n[BULK] Putaran {rnd}/{RETRY_ROUNDS}: {len(pending)} video (max {max_workers} paralel)")
+        limit = AIMDLimit(initial=1, min_limit=1, max_limit=max(1, max_workers))
+        sched = AdaptiveScheduler(limit, session_signals,
+                                  on_change=lambda n: print(f"  [SCHED] concurrency -> {n}"))
+        again = []
+        for job, ok, err in sched.run(pending, _task):
+            attempts += 1
+            vid = job["id"]
+            if ok and err is None:
+                ok_ids.add(vid)
+                reasons.pop(vid, None)
+                if store:
+                    try: store.mark_downloaded(job["channel_key"], vid)
+                    except Exception: pass
+                print(f"  [OK] {vid} -> {job['output']}")
+                continue
+            reason = "other" if err is not None else (last_failure_reason(vid) or "other")
+            reasons[vid] = reason
+            print(f"  [FAIL:{reason}] {vid}")
+            if reason in RETRY_BACKOFF:
+                again.append(job)
+        pending = [(rank, job) for rank, job in enumerate(again)]
+        if pending and rnd < RETRY_ROUNDS:
+            wait = max(RETRY_BACKOFF[reasons[j["id"]]] for _, j in pending)
+            print(f"[BULK] {len(pending)} video diulang setelah {wait}s (backoff)")
+            time.sleep(wait)
+
+    elapsed = max(time.monotonic() - t0, 1e-6)
+    sig1 = session_signals()
+    mb = (sig1.get("bytes", 0) - sig0.get("bytes", 0)) / (1024 * 1024)
+    by_reason: Dict[str, int] = defaultdict(int)
+    for r in reasons.values():
+        by_reason[r] += 1
+    print("\n[BULK] ===== Throughput Retry =====")
+    print(f"  Sukses    : {len(ok_ids)}/{len(jobs)} video ({attempts} percobaan)")
+    print(f"  Waktu     : {elapsed:.0f}s | {len(ok_ids) * 60 / elapsed:.2f} video/menit | {mb / elapsed:.2f} MB/s")
+    if by_reason:
+        print("  Gagal     : " + ", ".join(f"{k} {v}" for k, v in sorted(by_reason.items())))
+    return ok_ids, reasons
+
+def _rewrite_skipped_files(merged: Dict[str, Dict], done: Set[str]) -> None:
+    for path in sorted({p for e in merged.values() for p in e["files"]}):
+        try:
+            entries = parse_skipped_file(path)
+            keep = list(dict.fromkeys(e["line"] for e in entries if e["id"] not in done))
+            with open(path, "w", encoding="utf-8") as f:
+                for line in keep:
+                    f.write(line + "\n")
+            print(f"[DONE] {path}: {len(entries) - len(keep)} baris dihapus")
+        except Exception as e:
+            print(f"Failed to save {path}: {e}")
+
+def bulk_main(root_dir: str, max_workers: int = RETRY_WORKERS_MAX) -> None:
+    print("Retry Skipped Videos Tool - Bulk Mode")
+    print("=====================================")
+    try:
+        store = SqliteStore()
+    except Exception as e:
+        print(f"DB Error: {e}. Proceeding without DB.")
+        store = None
+
+    try:
+        ledger = get_failure_ledger()
+    except Exception as e:
+        print(f"Ledger Error: {e}. Falling back to {SKIPPED_FILE_NAME} only.")
+        ledger = None
+
+    jobs, resolved, merged = plan_bulk_retry(root_dir, store, ledger)
+    if not merged:
+        print(f"No pending skips under {root_dir}.")
+        return
+    n_channels = len({j["channel_key"] for j in jobs})
+    n_ledger = sum(1 for e in merged.values() if "reason" in e)
+    print(f"  [QUEUE] {len(merged)} ID unik ({n_ledger} dari ledger, "
+          f"{len({p for e in merged.values() for p in e['files']})} file skipped.txt)")
+    print(f"  [QUEUE] {len(resolved)} sudah ada di disk, {len(jobs)} di-retry ({n_channels} channel)")
+
+    ok_ids: Set[str] = set()
+    if jobs:
+        ok_ids, _reasons = run_bulk_retry(jobs, store, max_workers)
+    if ledger and (ok_ids or resolved):
+        ledger.mark_resolved(ok_ids | resolved)
+    _rewrite_skipped_files(merged, ok_ids | resolved)
+
+    drain_postprocess()
+    for folder in sorted({e["folder"] for e in merged.values()}):
+        finalize_folder(folder)
+
 # --- MAIN ---
 
 def main():
@@ -456,18 +624,8 @@ def main():
                 # --- POST-DOWNLOAD QUALITY CHECK (SHORTS ENFORCEMENT) ---
                 # Check Duration & Ratio immediately
                 # Find the actual file path
-                found_paths = []
-                # Check subfolder first
-                if os.path.exists(target_out_path):
-                    for f in os.listdir(target_out_path):
-                        if vid in f and f.lower().endswith(('.mp4', '.webm', '.mkv')):
-                            found_paths.append(os.path.join(target_out_path, f))
-                
-                # Also check root if not in sub
-                if not found_paths and os.path.exists(output_dir):
-                    for f in os.listdir(output_dir):
-                        if vid in f and f.lower().endswith(('.mp4', '.webm', '.mkv')):
-                            found_paths.append(os.path.join(output_dir, f))
+                # Check subfolder first, then root
+                found_paths = _find_video_paths(target_out_path, vid) or _find_video_paths(output_dir, vid)
 
                 if found_paths:
                     try:
@@ -527,6 +685,11 @@ def main():
     else:
         print("\n[DONE] No new videos downloaded / No changes.")
         
+    # Upscale/convert dari tahap post-process harus selesai sebelum rename/sort
+    drain_postprocess()
+    finalize_folder(output_dir)
+
+def finalize_folder(output_dir: str) -> None:
     # POST-PROCESSING: Normalize, Cleanup, Sort
     print("\n[POST-PROCESSING] Cleaning up folder...")
     
@@ -550,4 +713,13 @@ def main():
         print(f"[WARN] Sort failed: {e}")
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser(description="Retry video di skipped.txt")
+    ap.add_argument("--bulk", action="store_true",
+                    help="retry semua skipped.txt di bawah --root sekaligus lewat scheduler paralel")
+    ap.add_argument("--root", default=os.getcwd())
+    ap.add_argument("--workers", type=int, default=RETRY_WORKERS_MAX)
+    args = ap.parse_args()
+    if args.bulk:
+        bulk_main(args.root, args.workers)
+    else:
+        main()
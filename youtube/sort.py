@@ -16,6 +16,8 @@ except ImportError:
 # DB Imports
 import sqlite3
 from yt_short_downloader.utils import create_safe_filename, parse_upload_date
+from yt_short_downloader.folder_index import get_folder_index
+from yt_short_downloader.video_files import get_video_file_index
 
 # --- KONFIGURASI FILTER ---
 BLACKLIST_KEYWORDS = ["Nimi", "Promosi", "Iklan"] 
@@ -50,26 +52,12 @@ def _get_video_id_from_txt(video_path: str) -> str | None:
       YouTube: Channel Name
       Link: https://www.youtube.com/watch?v=VIDEO_ID
     """
-    txt_path = os.path.splitext(video_path)[0] + ".txt"
-    if not os.path.exists(txt_path):
-        return None
+    # lewat reverse index video_files: .txt yang (size, mtime)-nya sudah
+    # tercatat tidak dibaca ulang
     try:
-        with open(txt_path, encoding="utf-8", errors="replace") as f:
-            for line in f:
-                line = line.strip()
-                if line.lower().startswith("link:"):
-                    url = line.split(":", 1)[-1].strip()
-                    # Format: ?v=VIDEO_ID
-                    m = re.search(r'[?&]v=([A-Za-z0-9_-]{11})', url)
-                    if m:
-                        return m.group(1)
-                    # Format: youtu.be/VIDEO_ID
-                    m2 = re.search(r'youtu\.be/([A-Za-z0-9_-]{11})', url)
-                    if m2:
-                        return m2.group(1)
+        return get_video_file_index().video_id_for(video_path)
     except Exception:
-        pass
-    return None
+        return None
 
 def get_video_date_score(file_path, db_map):
     """
@@ -107,13 +95,13 @@ def clean_orphans(directory):
     """
     print("--- [1/4] Cleaning Orphans (File Tanpa Pasangan) ---")
     
-    # Kumpulkan semua nama base file (tanpa ekstensi)
-    video_extensions = ["*.mp4", "*.MP4", "*.webm", "*.WEBM", "*.mkv", "*.MKV"]
-    video_files = []
-    for ext in video_extensions:
-        video_files.extend(glob.glob(os.path.join(directory, ext)))
-    
-    txt_files = glob.glob(os.path.join(directory, "*.txt"))
+    # Kumpulkan semua nama base file (tanpa ekstensi) dari FolderIndex (satu scan,
+    # atau snapshot kalau folder tidak berubah sejak run sebelumnya)
+    fidx = get_folder_index(directory, sync=True)
+    names = [n for n in fidx.names() if not n.startswith(".")]
+    video_files = [os.path.join(directory, n) for n in names
+                   if n.lower().endswith((".mp4", ".webm", ".mkv"))]
+    txt_files = [os.path.join(directory, n) for n in names if n.endswith(".txt")]
     
     # Buat set base name untuk pencarian cepat
     # Normalisasi path agar tidak error beda slash
@@ -128,6 +116,7 @@ def clean_orphans(directory):
         if base not in video_bases:
             try:
                 os.remove(txt_path)
+                fidx.discard(txt_path)
                 print(f"[ORPHAN] Menghapus TXT sisa: {os.path.basename(txt_path)}")
                 deleted_count += 1
             except OSError as e:
@@ -139,6 +128,7 @@ def clean_orphans(directory):
         if base not in txt_bases:
             try:
                 os.remove(vid_path)
+                fidx.discard(vid_path)
                 print(f"[ORPHAN] Menghapus Video tanpa TXT: {os.path.basename(vid_path)}")
                 deleted_count += 1
             except OSError as e:
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark download engine: in-process (YoutubeDL hangat) vs subprocess.
+
+Usage:
+    python utility/bench_engine.py VIDEO_ID [VIDEO_ID ...] [--engines inproc,subprocess]
+
+Untuk tiap engine, semua video di-download ke folder temp terpisah lalu
+dilaporkan wall time & CPU seconds per video. CPU dihitung dari os.times()
+(proses ini + child process), jadi biaya start yt-dlp di mode subprocess
+ikut terhitung. Catatan: di Windows os.times() tidak mengisi waktu child,
+jadi angka CPU subprocess di sana terlalu kecil — pakai Linux/macOS.
+
+Post-process (upscale/konversi) berjalan async di process pool terpisah:
+wall/CPU per video TIDAK termasuk post-process. Sebelum folder temp
+dihapus, bench menunggu pool selesai (drain_postprocess) dan melaporkan
+wall time drain itu terpisah. CPU worker pool tidak terhitung sama sekali
+(worker hidup terus, jadi tidak pernah masuk os.times().children_*).
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from yt_short_downloader.downloader import download_video  # noqa: E402
+from yt_short_downloader.postprocess import drain_postprocess  # noqa: E402
+
+
+def _cpu_seconds() -> float:
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def bench_engine(engine: str, video_ids: list[str]) -> tuple[list[tuple[str, bool, float, float]], float]:
+    """Return (rows per video, wall time menunggu post-process selesai)."""
+    out_dir = tempfile.mkdtemp(prefix=f"bench_{engine}_")
+    rows = []
+    drain_s = 0.0
+    try:
+        for i, vid in enumerate(video_ids, 1):
+            w0, c0 = time.perf_counter(), _cpu_seconds()
+            ok = download_video(vid, f"bench {vid}", out_dir, "bench", "best", "mp4", i, engine=engine)
+            rows.append((vid, ok, time.perf_counter() - w0, _cpu_seconds() - c0))
+    finally:
+        # job upscale/konversi masih bisa antre/jalan: tunggu dulu, supaya file tidak
+        # dihapus di tengah job dan tidak ada baris 'pending' tersisa di postprocess_queue.db
+        d0 = time.perf_counter()
+        drain_postprocess()
+        drain_s = time.perf_counter() - d0
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return rows, drain_s
+
+
+def _report(engine: str, rows: list[tuple[str, bool, float, float]], drain_s: float = 0.0) -> None:
+    print(f"\n== {engine} ==")
+    print(f"{'video_id':<14}{'ok':<6}{'wall_s':>10}{'cpu_s':>10}")
+    for vid, ok, wall, cpu in rows:
+        print(f"{vid:<14}{str(ok):<6}{wall:>10.2f}{cpu:>10.2f}")
+    walls = [r[2] for r in rows]
+    cpus = [r[3] for r in rows]
+    if walls:
+        print(f"{'mean':<20}{statistics.mean(walls):>10.2f}{statistics.mean(cpus):>10.2f}")
+        print(f"{'median':<20}{statistics.median(walls):>10.2f}{statistics.median(cpus):>10.2f}")
+    if len(rows) > 1:
+        # video pertama mode inproc menanggung biaya import + init instance
+        print(f"{'mean (warm, #2..)':<20}{statistics.mean(walls[1:]):>10.2f}{statistics.mean(cpus[1:]):>10.2f}")
+    # post-process async: tidak masuk angka per video di atas; CPU pool tidak terukur
+    print(f"{'post-process drain':<20}{drain_s:>10.2f}{'n/a':>10}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("video_ids", nargs="+")
+    ap.add_argument("--engines", default="inproc,subprocess")
+    args = ap.parse_args()
+
+    for engine in [e.strip() for e in args.engines.split(",") if e.strip()]:
+        rows, drain_s = bench_engine(engine, args.video_ids)
+        _report(engine, rows, drain_s)
+
+
+if __name__ == "__main__":
+    main()
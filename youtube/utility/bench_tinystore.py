@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark TinyStore: upsert_video lama (Query scan + rewrite file penuh per
+insert/update) vs TinyStore sekarang (index dict + journal write-behind).
+
+Usage:
+    python utility/bench_tinystore.py [--n 10000] [--legacy-n 10000]
+
+Hasil dilaporkan sebagai detik per 10k upsert. Jalur lama O(N²), jadi
+--legacy-n boleh dikecilkan; angkanya lalu diskalakan kuadratik ke 10k
+(ditandai "est").
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tinydb import TinyDB, Query  # noqa: E402
+from yt_short_downloader.db import TinyStore, Utf8JSONStorage  # noqa: E402
+
+
+def _legacy_upsert(videos, channel_key: str, video_id: str, title: str, upload_date) -> None:
+    # Salinan TinyStore.upsert_video sebelum index in-memory
+    Video = Query()
+    now = datetime.utcnow().isoformat() + "Z"
+    key = f"{channel_key}::{video_id}"
+    payload = {"key": key, "channel_key": channel_key, "video_id": video_id,
+               "title": title, "upload_date": upload_date, "updated_at": now}
+    if videos.get(Video.key == key):
+        videos.update(payload, Video.key == key)
+    else:
+        payload.update({"created_at": now, "downloaded": False, "downloaded_at": None})
+        videos.insert(payload)
+
+
+def bench_legacy(n: int, tmp: str) -> float:
+    db = TinyDB(os.path.join(tmp, "legacy.json"), storage=Utf8JSONStorage)
+    videos = db.table("videos")
+    t0 = time.perf_counter()
+    for i in range(n):
+        _legacy_upsert(videos, "bench", f"vid{i:07d}", f"title {i}", None)
+    dt = time.perf_counter() - t0
+    db.close()
+    return dt
+
+
+def bench_current(n: int, tmp: str) -> float:
+    store = TinyStore(os.path.join(tmp, "current.json"))
+    t0 = time.perf_counter()
+    for i in range(n):
+        store.upsert_video("bench", f"vid{i:07d}", f"title {i}", None)
+    store.close()  # termasuk checkpoint terakhir
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--n", type=int, default=10000)
+    ap.add_argument("--legacy-n", type=int, default=10000)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_tinystore_")
+    try:
+        cur = bench_current(args.n, tmp)
+        print(f"current : {cur:8.2f}s for {args.n} upserts -> {cur * 10000 / args.n:8.2f}s per 10k")
+        leg = bench_legacy(args.legacy_n, tmp)
+        per10k = leg * (10000 / args.legacy_n) ** 2
+        tag = "" if args.legacy_n == 10000 else " (est)"
+        print(f"legacy  : {leg:8.2f}s for {args.legacy_n} upserts -> {per10k:8.2f}s per 10k{tag}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark batch transcode cek_resolusi: files/menit untuk beberapa
+pembagian (jobs x threads) dari core yang sama.
+
+Usage:
+    python utility/bench_transcode.py SAMPLE_DIR [--splits 1x16,2x8,4x4,8x2] [--mode reels]
+
+SAMPLE_DIR berisi beberapa video contoh. Tiap split menyalin sampel ke
+folder temp lalu menjalankan cek_resolusi.batch_convert(force=True), jadi
+semua file benar-benar di-encode. Default split diturunkan dari
+os.cpu_count() (1 job semua core, lalu job digandakan sampai 2 thread/job).
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cek_resolusi  # noqa: E402
+
+VIDEO_EXTS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+
+def default_splits(cores: int) -> list[tuple[int, int]]:
+    out, jobs = [], 1
+    while jobs <= cores and cores // jobs >= 2:
+        out.append((jobs, cores // jobs))
+        jobs *= 2
+    return out or [(1, cores)]
+
+
+def parse_splits(text: str) -> list[tuple[int, int]]:
+    out = []
+    for part in text.split(","):
+        j, _, t = part.strip().lower().partition("x")
+        out.append((int(j), int(t)))
+    return out
+
+
+def bench_split(samples: list[str], jobs: int, threads: int, mode: str) -> tuple[int, float]:
+    tmp = tempfile.mkdtemp(prefix=f"bench_tc_{jobs}x{threads}_")
+    try:
+        for src in samples:
+            shutil.copy2(src, tmp)
+        st = cek_resolusi.batch_convert(tmp, mode, force=True, jobs=jobs, threads=threads, quiet=True)
+        return st["converted"], st["seconds"]
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("sample_dir")
+    ap.add_argument("--splits", default=None, help="mis. 1x16,2x8,4x4,8x2")
+    ap.add_argument("--mode", default="reels", choices=sorted(cek_resolusi.TARGETS))
+    args = ap.parse_args()
+
+    samples = [os.path.join(args.sample_dir, f) for f in sorted(os.listdir(args.sample_dir))
+               if f.lower().endswith(VIDEO_EXTS)]
+    if not samples:
+        sys.exit(f"Tidak ada video di {args.sample_dir}")
+
+    cores = os.cpu_count() or 2
+    splits = parse_splits(args.splits) if args.splits else default_splits(cores)
+    print(f"{len(samples)} sampel, {cores} core, mode={args.mode}")
+    print(f"{'split':>8} | {'ok':>3} | {'detik':>8} | {'files/menit':>11}")
+    for jobs, threads in splits:
+        n, sec = bench_split(samples, jobs, threads, args.mode)
+        rate = n * 60.0 / sec if sec > 0 else 0.0
+        print(f"{jobs:>3}x{threads:<4} | {n:>3} | {sec:8.1f} | {rate:11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,20 @@
 # Konfigurasi global
 MAX_RETRIES = 3  # Jumlah maksimum percobaan ulang jika gagal
 DEFAULT_OUTPUT_DIR = "new_week"
-DEFAULT_FILE_FORMAT = "mp4"  # "mp4" atau "webm"
\ No newline at end of file
+DEFAULT_FILE_FORMAT = "mp4"  # "mp4" atau "webm"
+DOWNLOAD_ENGINE = "inproc"  # "inproc" (YoutubeDL hangat di proses ini) atau "subprocess" (1 proses per strategi)
+USE_PLANNER = True  # probe format per player_client dulu, lalu 1 download dengan client pemenang
+LISTING_WORKERS = 4  # main4: jumlah channel yang di-listing paralel
+LISTING_RATE = 0.5  # main4: maks request listing per detik per host
+ENRICH_WORKERS = 4  # fetch upload_date paralel per channel (enrichment)
+DOWNLOAD_WORKERS_MIN = 1  # scheduler adaptif: batas bawah download paralel
+DOWNLOAD_WORKERS_MAX = 6  # ... dan batas atas (naik pelan selama tidak ada 403)
+POSTPROCESS_WORKERS = None  # process pool upscale/convert; None -> cpu_count // 2
+RETRY_WORKERS_MAX = 2  # retry_skipped --bulk: budget concurrency terpisah, lebih kecil dari download biasa
+RETRY_ROUNDS = 3  # retry_skipped --bulk: jumlah putaran maksimum per video
+RETRY_BACKOFF = {"403": 90, "network": 20, "other": 20}  # detik jeda sebelum putaran berikutnya per alasan gagal (alasan lain tidak diulang)
+LOG_LEVEL = "INFO"  # level minimum log downloader (DEBUG/INFO/WARNING/ERROR); level dibaca dari tag "[TAG]" pesan
+LOG_JSON = False  # True -> download_errors.log berisi JSON lines (ts, level, tag, msg, output_path)
+LISTING_CACHE = True  # get_short_links: incremental listing (berhenti di ID yang sudah dikenal) pakai data/listing_cache.db
+LISTING_FULL_REFRESH_DAYS = 7  # ... tapi listing penuh tetap diulang tiap N hari
+FOLDER_INDEX_SNAPSHOT = True  # FolderIndex: pakai ulang listing folder dari data/folder_index/ antar run; False kalau mtime folder tidak bisa dipercaya (network share)
@@ -1,14 +1,18 @@
 from __future__ import annotations
 import os
 import json
+import atexit
+import threading
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Dict, Any
 
-from tinydb import TinyDB, Query
 from tinydb.storages import JSONStorage
 
 DB_PATH = os.path.join(os.getcwd(), "data/ytshorts_db.json")
 
+FLUSH_EVERY = 500        # checkpoint setelah N operasi tulis
+FLUSH_INTERVAL = 5.0     # ... atau paling lambat N detik setelah tulis pertama
+
 
 class Utf8JSONStorage(JSONStorage):
     def __init__(self, path, create_dirs=False, encoding="utf-8", **kwargs):
@@ -16,27 +20,140 @@ class Utf8JSONStorage(JSONStorage):
         super().__init__(path, create_dirs=create_dirs, encoding=encoding, **kwargs)
 
 
+class _Table:
+    """Tabel in-memory berformat TinyDB ({doc_id: doc}) + index key -> doc_id."""
+
+    def __init__(self, docs: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.docs: Dict[str, Dict[str, Any]] = dict(docs or {})
+        self.by_key: Dict[str, str] = {d.get("key"): i for i, d in self.docs.items() if d.get("key")}
+        self.next_id = max((int(i) for i in self.docs if str(i).isdigit()), default=0) + 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        i = self.by_key.get(key)
+        return self.docs.get(i) if i is not None else None
+
+    def put(self, doc: Dict[str, Any], doc_id: Optional[str] = None) -> str:
+        if doc_id is None:
+            doc_id = self.by_key.get(doc["key"])
+        if doc_id is None:
+            doc_id = str(self.next_id)
+        if str(doc_id).isdigit():
+            self.next_id = max(self.next_id, int(doc_id) + 1)
+        self.docs[doc_id] = doc
+        self.by_key[doc["key"]] = doc_id
+        return doc_id
+
+
 class TinyStore:
+    """
+    Store JSON (format file tetap kompatibel TinyDB) dengan index dict O(1)
+    per key dan write-behind:
+    - setiap tulis langsung masuk memori + di-append ke journal
+      (`<db>.journal`, JSON lines) -> aman kalau proses mati mendadak;
+    - snapshot penuh ditulis ulang secara atomik (tmp + os.replace) tiap
+      FLUSH_EVERY operasi / FLUSH_INTERVAL detik / saat close();
+    - saat start, journal yang tersisa di-replay ke snapshot.
+    """
+
+    TABLES = ("channels", "videos", "counters")
+
     def __init__(self, path: Optional[str] = None):
         self.path = path or DB_PATH
-        self.db = TinyDB(self.path, storage=Utf8JSONStorage)
-        self.channels = self.db.table("channels")
-        self.videos = self.db.table("videos")
-        self.counters = self.db.table("counters")
+        self.journal_path = self.path + ".journal"
+        self._lock = threading.RLock()
+        self._pending = 0
+        self._timer: Optional[threading.Timer] = None
+        self._journal = None
+
+        storage = Utf8JSONStorage(self.path, create_dirs=True)
+        try:
+            data = storage.read() or {}
+        finally:
+            storage.close()
+        self._tables: Dict[str, _Table] = {t: _Table(data.get(t)) for t in self.TABLES}
+        # tabel lain di file (mis. "_default" TinyDB) tidak dipakai di sini, tapi ikut ditulis ulang apa adanya
+        self._other: Dict[str, Any] = {t: v for t, v in data.items() if t not in self.TABLES}
+        self.channels = self._tables["channels"]
+        self.videos = self._tables["videos"]
+        self.counters = self._tables["counters"]
+
+        if self._replay_journal():
+            self.flush()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        atexit.register(self.close)
+
+    # ---------- write-behind ----------
+    def _replay_journal(self) -> int:
+        if not os.path.exists(self.journal_path):
+            return 0
+        n = 0
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    break  # baris terakhir terpotong saat crash
+                self._tables[op["t"]].put(op["doc"], op["id"])
+                n += 1
+        return n
+
+    def _write(self, table: str, doc: Dict[str, Any]) -> None:
+        # dipanggil dengan self._lock dipegang
+        doc_id = self._tables[table].put(doc)
+        self._journal.write(json.dumps({"t": table, "id": doc_id, "doc": doc}, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        self._pending += 1
+        if self._pending >= FLUSH_EVERY:
+            self.flush()
+        elif self._timer is None:
+            self._timer = threading.Timer(FLUSH_INTERVAL, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        """Checkpoint: tulis snapshot atomik lalu kosongkan journal."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            data = dict(self._other)
+            data.update((t, tbl.docs) for t, tbl in self._tables.items())
+            tmp = self.path + ".tmp"
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            if self._journal is not None:
+                self._journal.truncate(0)
+                self._journal.seek(0)
+            elif os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self._pending = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._journal is None:
+                return
+            if self._pending:
+                self.flush()
+            self._journal.close()
+            self._journal = None
 
     # ---------- channel ----------
     def upsert_channel(self, channel_key: str, name: str, url: str) -> None:
-        Channel = Query()
         now = datetime.utcnow().isoformat() + "Z"
-        existing = self.channels.get(Channel.key == channel_key)
-        if existing:
-            self.channels.update({"name": name, "url": url, "updated_at": now}, Channel.key == channel_key)
-        else:
-            self.channels.insert({"key": channel_key, "name": name, "url": url, "created_at": now, "updated_at": now})
+        with self._lock:
+            existing = self.channels.get(channel_key)
+            if existing:
+                doc = dict(existing, name=name, url=url, updated_at=now)
+            else:
+                doc = {"key": channel_key, "name": name, "url": url, "created_at": now, "updated_at": now}
+            self._write("channels", doc)
 
     # ---------- video ----------
     def upsert_video(self, channel_key: str, video_id: str, title: str, upload_date: Optional[str]) -> None:
-        Video = Query()
         now = datetime.utcnow().isoformat() + "Z"
         key = f"{channel_key}::{video_id}"
         payload = {
@@ -47,54 +164,157 @@ class TinyStore:
             "upload_date": upload_date,
             "updated_at": now,
         }
-        if self.videos.get(Video.key == key):
-            self.videos.update(payload, Video.key == key)
-        else:
-            payload.update({"created_at": now, "downloaded": False, "downloaded_at": None})
-            self.videos.insert(payload)
+        with self._lock:
+            existing = self.videos.get(key)
+            if existing:
+                if upload_date is None:
+                    payload["upload_date"] = existing.get("upload_date")
+                doc = dict(existing, **payload)
+            else:
+                doc = dict(payload, created_at=now, downloaded=False, downloaded_at=None)
+            self._write("videos", doc)
+
+    def upsert_videos_bulk(self, channel_key: str, rows) -> int:
+        """Padanan SqliteStore.upsert_videos_bulk; rows = (video_id, title, upload_date)."""
+        n = 0
+        for vid, title, up in rows:
+            if vid:
+                self.upsert_video(channel_key, vid, title, up)
+                n += 1
+        return n
 
     def mark_downloaded(self, channel_key: str, video_id: str) -> None:
-        Video = Query()
         key = f"{channel_key}::{video_id}"
         now = datetime.utcnow().isoformat() + "Z"
-        self.videos.update({"downloaded": True, "downloaded_at": now, "updated_at": now}, Video.key == key)
+        with self._lock:
+            existing = self.videos.get(key)
+            if existing:
+                self._write("videos", dict(existing, downloaded=True, state="done",
+                                           downloaded_at=now, updated_at=now))
 
     def is_downloaded(self, channel_key: str, video_id: str) -> bool:
-        Video = Query()
         key = f"{channel_key}::{video_id}"
-        doc = self.videos.get(Video.key == key)
+        with self._lock:
+            doc = self.videos.get(key)
         return bool(doc and doc.get("downloaded"))
 
+    def filter_not_downloaded(self, channel_key: str, video_ids) -> list[str]:
+        """Padanan SqliteStore.filter_not_downloaded (urutan input dipertahankan)."""
+        return [v for v in dict.fromkeys(video_ids) if v and not self.is_downloaded(channel_key, v)]
+
+    # ---------- state machine per video (resume) ----------
+    _HELD_STATES = ("queued", "fetching", "downloaded", "postprocessed")
+
+    def set_video_state(self, channel_key: str, video_id: str, state: str,
+                        file_path: Optional[str] = None) -> None:
+        """Padanan SqliteStore.set_video_state."""
+        if state == "done":
+            self.mark_downloaded(channel_key, video_id)
+            return
+        key = f"{channel_key}::{video_id}"
+        now = datetime.utcnow().isoformat() + "Z"
+        with self._lock:
+            existing = self.videos.get(key)
+            if existing:
+                doc = dict(existing, state=state, updated_at=now)
+                if file_path:
+                    doc["file_path"] = os.path.abspath(file_path)
+                self._write("videos", doc)
+
+    def get_video_states(self, channel_key: str, video_ids) -> Dict[str, Dict]:
+        """Padanan SqliteStore.get_video_states."""
+        out: Dict[str, Dict] = {}
+        with self._lock:
+            for vid in dict.fromkeys(video_ids):
+                doc = self.videos.get(f"{channel_key}::{vid}") if vid else None
+                if doc and doc.get("state") and not doc.get("downloaded"):
+                    out[vid] = {"state": doc["state"], "index": doc.get("file_index"),
+                                "output_path": doc.get("output_path"), "file_path": doc.get("file_path")}
+        return out
+
+    def reserve_for_videos(self, channel_key: str, folder_path: str, video_ids, fallback_probe: int = 0) -> Dict[str, int]:
+        """Padanan SqliteStore.reserve_for_videos (atomik lewat lock in-process)."""
+        ids = [v for v in dict.fromkeys(video_ids) if v]
+        if not ids:
+            return {}
+        now = datetime.utcnow().isoformat() + "Z"
+        with self._lock:
+            start = self.reserve_indices(folder_path, len(ids), fallback_probe)[0]
+            assigned = {vid: start + i for i, vid in enumerate(ids)}
+            for vid, idx in assigned.items():
+                key = f"{channel_key}::{vid}"
+                existing = self.videos.get(key) or {
+                    "key": key, "channel_key": channel_key, "video_id": vid, "title": None,
+                    "upload_date": None, "created_at": now, "downloaded": False, "downloaded_at": None,
+                }
+                self._write("videos", dict(existing, state="queued", file_index=idx, file_path=None,
+                                           output_path=os.path.abspath(folder_path), updated_at=now))
+        return assigned
+
+    def active_indices(self, folder_path: str, states=_HELD_STATES) -> Dict[int, str]:
+        """Padanan SqliteStore.active_indices."""
+        out_path, states = os.path.abspath(folder_path), set(states)
+        with self._lock:
+            return {int(d["file_index"]): d["video_id"] for d in self.videos.docs.values()
+                    if d.get("output_path") == out_path and not d.get("downloaded")
+                    and d.get("file_index") is not None and d.get("state") in states}
+
+    def release_unused_indices(self, folder_path: str, on_disk_max: int) -> int:
+        """Padanan SqliteStore.release_unused_indices."""
+        with self._lock:
+            last = self.get_last_index(folder_path)
+            floor = max(int(on_disk_max), max(self.active_indices(folder_path), default=0))
+            if last <= floor:
+                return 0
+            self.set_last_index(folder_path, floor)
+        return last - floor
+
+    # ---------- upload_date cache (enrichment) ----------
+    def get_upload_dates(self, video_ids) -> Dict[str, str]:
+        """Padanan SqliteStore.get_upload_dates."""
+        want = set(v for v in video_ids if v)
+        with self._lock:
+            return {d["video_id"]: d["upload_date"] for d in self.videos.docs.values()
+                    if d.get("video_id") in want and d.get("upload_date")}
+
+    def set_upload_dates(self, dates: Dict[str, str]) -> None:
+        """Padanan SqliteStore.set_upload_dates."""
+        if not dates:
+            return
+        now = datetime.utcnow().isoformat() + "Z"
+        with self._lock:
+            for d in list(self.videos.docs.values()):
+                up = dates.get(d.get("video_id"))
+                if up:
+                    self._write("videos", dict(d, upload_date=up, updated_at=now))
+
     # ---------- folder counters ----------
     def _folder_key(self, folder_path: str) -> str:
         return f"folder::{os.path.abspath(folder_path)}"
 
     def get_last_index(self, folder_path: str) -> int:
-        C = Query()
         key = self._folder_key(folder_path)
-        doc = self.counters.get(C.key == key)
+        with self._lock:
+            doc = self.counters.get(key)
         return int(doc.get("last_index", 0)) if doc else 0
 
     def set_last_index(self, folder_path: str, last_index: int) -> None:
-        C = Query()
         key = self._folder_key(folder_path)
         now = datetime.utcnow().isoformat() + "Z"
-        payload = {"key": key, "last_index": int(last_index), "updated_at": now}
-        if self.counters.get(C.key == key):
-            self.counters.update(payload, C.key == key)
-        else:
-            self.counters.insert(payload)
+        with self._lock:
+            self._write("counters", {"key": key, "last_index": int(last_index), "updated_at": now})
 
     def reserve_indices(self, folder_path: str, count: int, fallback_probe: int = 0) -> list[int]:
         """
-        Pre-allocate 'count' indices secara atomik sederhana:
+        Pre-allocate 'count' indices secara atomik (lock in-process):
         - Ambil last_index dari DB
         - Ambil juga probe dari isi folder (opsional) untuk sinkron ulang jika ada file tambahan
         - Pakai maksimum dari keduanya
         - Simpan kembali last_index baru
         """
-        base = max(self.get_last_index(folder_path), int(fallback_probe))
-        start = base + 1
-        end = base + count
-        self.set_last_index(folder_path, end)
+        with self._lock:
+            base = max(self.get_last_index(folder_path), int(fallback_probe))
+            start = base + 1
+            end = base + count
+            self.set_last_index(folder_path, end)
         return list(range(start, end + 1))
@@ -2,20 +2,83 @@
 import os
 import sqlite3
 import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Iterable, Tuple, Dict
+
+# Di atas batas ini filter_not_downloaded pakai temp table, bukan IN (...)
+# (SQLite lama membatasi 999 parameter per statement).
+_IN_LIMIT = 900
+
+# Fase per video (kolom videos.state). Run yang terputus dilanjutkan dari
+# fase terakhir yang selesai; "done" == downloaded=1.
+VIDEO_STATES = ("queued", "fetching", "downloaded", "postprocessed", "done")
+_HELD_STATES = ("queued", "fetching", "downloaded", "postprocessed")
+
+# SQL konstan -> statement cache sqlite3 (cached_statements) dipakai ulang
+_UPSERT_VIDEO_SQL = """
+    INSERT INTO videos(key,channel_key,video_id,title,upload_date,downloaded,created_at,updated_at,downloaded_at)
+    VALUES(?,?,?,?,?,0,?,?,NULL)
+    ON CONFLICT(key) DO UPDATE SET title=excluded.title,
+        upload_date=COALESCE(excluded.upload_date, videos.upload_date),
+        updated_at=excluded.updated_at
+"""
 
-_DB_LOCK = threading.Lock()
 
 class SqliteStore:
+    """
+    Store SQLite dengan satu koneksi long-lived per thread (WAL,
+    synchronous=NORMAL). Koneksi autocommit; transaksi eksplisit lewat _tx().
+    """
+
     def __init__(self, path: Optional[str] = None):
         base = path or os.path.join(os.getcwd(), "data", "ytshorts.db")
         os.makedirs(os.path.dirname(base), exist_ok=True)
         self.db_path = base
+        self._local = threading.local()
+        self._all_conns: List[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
         self._init_db()
 
+    # ---------- connection pool ----------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None,
+                                   cached_statements=256)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            with self._conns_lock:
+                self._all_conns.append(conn)
+        return conn
+
+    @contextmanager
+    def _tx(self):
+        """BEGIN IMMEDIATE ... COMMIT (rollback kalau error)."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self) -> None:
+        """Tutup semua koneksi yang pernah dibuka store ini (semua thread)."""
+        with self._conns_lock:
+            conns, self._all_conns = self._all_conns, []
+        for c in conns:
+            try:
+                c.close()
+            except Exception:
+                pass
+        self._local = threading.local()
+
     def _init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
+        with self._tx() as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS channels (
                     key TEXT PRIMARY KEY,
@@ -38,6 +101,16 @@ class SqliteStore:
                     downloaded_at TEXT
                 )
             """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_videos_video_id ON videos(video_id)")
+            # migrasi: kolom state machine per video (DB lama tidak punya)
+            cols = {r[1] for r in conn.execute("PRAGMA table_info(videos)")}
+            for col, typ in (("state", "TEXT"), ("file_index", "INTEGER"),
+                             ("output_path", "TEXT"), ("file_path", "TEXT")):
+                if col not in cols:
+                    conn.execute(f"ALTER TABLE videos ADD COLUMN {col} {typ}")
+            if "state" not in cols:
+                conn.execute("UPDATE videos SET state='done' WHERE downloaded=1")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_videos_output_state ON videos(output_path, state)")
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS counters (
                     key TEXT PRIMARY KEY,
@@ -49,39 +122,192 @@ class SqliteStore:
     # ---------- channel ----------
     def upsert_channel(self, channel_key: str, name: str, url: str) -> None:
         now = datetime.utcnow().isoformat() + "Z"
-        with _DB_LOCK, sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                INSERT INTO channels(key,name,url,created_at,updated_at)
-                VALUES(?,?,?,?,?)
-                ON CONFLICT(key) DO UPDATE SET name=excluded.name,
-                    url=excluded.url, updated_at=excluded.updated_at
-            """, (channel_key, name, url, now, now))
+        self._conn().execute("""
+            INSERT INTO channels(key,name,url,created_at,updated_at)
+            VALUES(?,?,?,?,?)
+            ON CONFLICT(key) DO UPDATE SET name=excluded.name,
+                url=excluded.url, updated_at=excluded.updated_at
+        """, (channel_key, name, url, now, now))
 
     # ---------- video ----------
     def upsert_video(self, channel_key: str, video_id: str, title: str, upload_date: Optional[str]) -> None:
         now = datetime.utcnow().isoformat() + "Z"
         key = f"{channel_key}::{video_id}"
-        with _DB_LOCK, sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                INSERT INTO videos(key,channel_key,video_id,title,upload_date,downloaded,created_at,updated_at,downloaded_at)
-                VALUES(?,?,?,?,?,0,?,?,NULL)
-                ON CONFLICT(key) DO UPDATE SET title=excluded.title,
-                    upload_date=excluded.upload_date, updated_at=excluded.updated_at
-            """, (key, channel_key, video_id, title, upload_date, now, now))
+        self._conn().execute(_UPSERT_VIDEO_SQL, (key, channel_key, video_id, title, upload_date, now, now))
+
+    def upsert_videos_bulk(self, channel_key: str, rows: Iterable[Tuple[str, str, Optional[str]]]) -> int:
+        """
+        Upsert banyak video sekaligus dalam satu transaksi.
+        rows: iterable (video_id, title, upload_date).
+        """
+        now = datetime.utcnow().isoformat() + "Z"
+        params = [(f"{channel_key}::{vid}", channel_key, vid, title, up, now, now)
+                  for vid, title, up in rows if vid]
+        if not params:
+            return 0
+        with self._tx() as conn:
+            conn.executemany(_UPSERT_VIDEO_SQL, params)
+        return len(params)
 
     def mark_downloaded(self, channel_key: str, video_id: str) -> None:
         key = f"{channel_key}::{video_id}"
         now = datetime.utcnow().isoformat() + "Z"
-        with _DB_LOCK, sqlite3.connect(self.db_path) as conn:
-            conn.execute("UPDATE videos SET downloaded=1, downloaded_at=?, updated_at=? WHERE key=?",
-                         (now, now, key))
+        self._conn().execute("UPDATE videos SET downloaded=1, state='done', downloaded_at=?, updated_at=? "
+                             "WHERE key=?", (now, now, key))
 
     def is_downloaded(self, channel_key: str, video_id: str) -> bool:
         key = f"{channel_key}::{video_id}"
-        with sqlite3.connect(self.db_path) as conn:
-            cur = conn.execute("SELECT downloaded FROM videos WHERE key=?", (key,))
-            row = cur.fetchone()
-            return bool(row and row[0])
+        row = self._conn().execute("SELECT downloaded FROM videos WHERE key=?", (key,)).fetchone()
+        return bool(row and row[0])
+
+    def filter_not_downloaded(self, channel_key: str, video_ids: Iterable[str]) -> List[str]:
+        """
+        Subset video_ids yang BELUM downloaded (urutan input dipertahankan).
+        Satu query: IN (...) untuk daftar kecil, temp table join untuk daftar besar.
+        """
+        ids = [v for v in dict.fromkeys(video_ids) if v]
+        if not ids:
+            return []
+        keys = [f"{channel_key}::{v}" for v in ids]
+        conn = self._conn()
+        if len(keys) <= _IN_LIMIT:
+            marks = ",".join("?" * len(keys))
+            cur = conn.execute(
+                f"SELECT video_id FROM videos WHERE downloaded=1 AND key IN ({marks})", keys)
+            done = {r[0] for r in cur}
+        else:
+            with self._tx():
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS _q_keys(key TEXT PRIMARY KEY)")
+                conn.execute("DELETE FROM _q_keys")
+                conn.executemany("INSERT OR IGNORE INTO _q_keys(key) VALUES(?)", [(k,) for k in keys])
+                cur = conn.execute("""
+                    SELECT v.video_id FROM videos v JOIN _q_keys q ON q.key = v.key
+                    WHERE v.downloaded=1
+                """)
+                done = {r[0] for r in cur}
+        return [v for v in ids if v not in done]
+
+    # ---------- state machine per video (resume) ----------
+    def set_video_state(self, channel_key: str, video_id: str, state: str,
+                        file_path: Optional[str] = None) -> None:
+        """Catat fase video; file_path (caption / video / hasil post-process) disimpan kalau diberikan."""
+        if state not in VIDEO_STATES:
+            raise ValueError(f"unknown video state: {state}")
+        if state == "done":
+            self.mark_downloaded(channel_key, video_id)
+        key = f"{channel_key}::{video_id}"
+        now = datetime.utcnow().isoformat() + "Z"
+        self._conn().execute(
+            "UPDATE videos SET state=?, file_path=COALESCE(?, file_path), updated_at=? WHERE key=?",
+            (state, os.path.abspath(file_path) if file_path else None, now, key))
+
+    def get_video_states(self, channel_key: str, video_ids: Iterable[str]) -> Dict[str, Dict]:
+        """
+        {video_id: {"state", "index", "output_path", "file_path"}} untuk video
+        yang belum done (fase sebelumnya sempat tercatat).
+        """
+        ids = [v for v in dict.fromkeys(video_ids) if v]
+        out: Dict[str, Dict] = {}
+        conn = self._conn()
+        for i in range(0, len(ids), _IN_LIMIT):
+            keys = [f"{channel_key}::{v}" for v in ids[i:i + _IN_LIMIT]]
+            marks = ",".join("?" * len(keys))
+            for vid, state, idx, out_path, fpath in conn.execute(
+                    f"SELECT video_id, state, file_index, output_path, file_path FROM videos "
+                    f"WHERE downloaded=0 AND state IS NOT NULL AND key IN ({marks})", keys):
+                out[vid] = {"state": state, "index": idx, "output_path": out_path, "file_path": fpath}
+        return out
+
+    def reserve_for_videos(self, channel_key: str, folder_path: str, video_ids: List[str],
+                           fallback_probe: int = 0) -> Dict[str, int]:
+        """
+        reserve_indices + state='queued' dalam SATU transaksi: index yang
+        dipegang video antre selalu tercatat, jadi release_unused_indices
+        tidak pernah melepas index milik run lain. Video yang belum punya
+        baris (mis. retry_skipped dengan channel_key sintetis) dibuatkan
+        barisnya di transaksi yang sama.
+        """
+        ids = [v for v in dict.fromkeys(video_ids) if v]
+        if not ids:
+            return {}
+        ckey = self._folder_key(folder_path)
+        out_path = os.path.abspath(folder_path)
+        now = datetime.utcnow().isoformat() + "Z"
+        with self._tx() as conn:
+            row = conn.execute("SELECT last_index FROM counters WHERE key=?", (ckey,)).fetchone()
+            base = max(int(row[0]) if row and row[0] is not None else 0, int(fallback_probe))
+            end = base + len(ids)
+            conn.execute("""
+                INSERT INTO counters(key,last_index,updated_at)
+                VALUES(?,?,?)
+                ON CONFLICT(key) DO UPDATE SET last_index=?, updated_at=?
+            """, (ckey, end, now, end, now))
+            assigned = {vid: base + 1 + i for i, vid in enumerate(ids)}
+            conn.executemany("""
+                INSERT INTO videos(key,channel_key,video_id,downloaded,created_at,updated_at,
+                                   state,file_index,output_path,file_path)
+                VALUES(?,?,?,0,?,?,'queued',?,?,NULL)
+                ON CONFLICT(key) DO UPDATE SET state='queued', file_index=excluded.file_index,
+                    output_path=excluded.output_path, file_path=NULL, updated_at=excluded.updated_at
+            """, [(f"{channel_key}::{vid}", channel_key, vid, now, now, idx, out_path)
+                  for vid, idx in assigned.items()])
+        return assigned
+
+    def active_indices(self, folder_path: str, states: Iterable[str] = _HELD_STATES) -> Dict[int, str]:
+        """{index: video_id} milik video belum-done di folder ini (fase `states`)."""
+        states = list(states)
+        marks = ",".join("?" * len(states))
+        rows = self._conn().execute(
+            f"SELECT file_index, video_id FROM videos WHERE output_path=? AND downloaded=0 "
+            f"AND file_index IS NOT NULL AND state IN ({marks})",
+            [os.path.abspath(folder_path)] + states)
+        return {int(idx): vid for idx, vid in rows}
+
+    def release_unused_indices(self, folder_path: str, on_disk_max: int) -> int:
+        """
+        Turunkan counters.last_index ke max(index file di disk, index yang
+        masih dipegang video belum-done). Index yang di-reserve run yang mati
+        tanpa pernah dipakai jadi bisa dipakai lagi. Return jumlah index dilepas.
+        """
+        ckey = self._folder_key(folder_path)
+        marks = ",".join("?" * len(_HELD_STATES))
+        with self._tx() as conn:
+            row = conn.execute("SELECT last_index FROM counters WHERE key=?", (ckey,)).fetchone()
+            if not row or row[0] is None:
+                return 0
+            held = conn.execute(
+                f"SELECT MAX(file_index) FROM videos WHERE output_path=? AND downloaded=0 "
+                f"AND state IN ({marks})", [os.path.abspath(folder_path)] + list(_HELD_STATES)).fetchone()
+            floor = max(int(on_disk_max), int(held[0] or 0))
+            if int(row[0]) <= floor:
+                return 0
+            conn.execute("UPDATE counters SET last_index=?, updated_at=? WHERE key=?",
+                         (floor, datetime.utcnow().isoformat() + "Z", ckey))
+        return int(row[0]) - floor
+
+    # ---------- upload_date cache (enrichment) ----------
+    def get_upload_dates(self, video_ids: Iterable[str]) -> Dict[str, str]:
+        """{video_id: upload_date} untuk id yang tanggalnya sudah diketahui (lintas channel)."""
+        ids = [v for v in dict.fromkeys(video_ids) if v]
+        out: Dict[str, str] = {}
+        conn = self._conn()
+        for i in range(0, len(ids), _IN_LIMIT):
+            chunk = ids[i:i + _IN_LIMIT]
+            marks = ",".join("?" * len(chunk))
+            for vid, up in conn.execute(
+                    f"SELECT video_id, upload_date FROM videos WHERE upload_date IS NOT NULL "
+                    f"AND video_id IN ({marks})", chunk):
+                out[vid] = up
+        return out
+
+    def set_upload_dates(self, dates: Dict[str, str]) -> None:
+        """Simpan hasil enrichment ke semua baris video_id tsb. yang sudah ada."""
+        if not dates:
+            return
+        now = datetime.utcnow().isoformat() + "Z"
+        with self._tx() as conn:
+            conn.executemany("UPDATE videos SET upload_date=?, updated_at=? WHERE video_id=?",
+                             [(up, now, vid) for vid, up in dates.items()])
 
     # ---------- folder counters (atomic reserve) ----------
     def _folder_key(self, folder_path: str) -> str:
@@ -89,29 +315,25 @@ class SqliteStore:
 
     def get_last_index(self, folder_path: str) -> int:
         key = self._folder_key(folder_path)
-        with sqlite3.connect(self.db_path) as conn:
-            cur = conn.execute("SELECT last_index FROM counters WHERE key=?", (key,))
-            row = cur.fetchone()
-            return int(row[0]) if row and row[0] is not None else 0
+        row = self._conn().execute("SELECT last_index FROM counters WHERE key=?", (key,)).fetchone()
+        return int(row[0]) if row and row[0] is not None else 0
 
     def set_last_index(self, folder_path: str, last_index: int) -> None:
         key = self._folder_key(folder_path)
         now = datetime.utcnow().isoformat() + "Z"
-        with _DB_LOCK, sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                INSERT INTO counters(key,last_index,updated_at)
-                VALUES(?,?,?)
-                ON CONFLICT(key) DO UPDATE SET last_index=excluded.last_index,
-                    updated_at=excluded.updated_at
-            """, (key, int(last_index), now))
+        self._conn().execute("""
+            INSERT INTO counters(key,last_index,updated_at)
+            VALUES(?,?,?)
+            ON CONFLICT(key) DO UPDATE SET last_index=excluded.last_index,
+                updated_at=excluded.updated_at
+        """, (key, int(last_index), now))
 
     def reserve_indices(self, folder_path: str, count: int, fallback_probe: int = 0) -> list[int]:
         """
-        Atomic: BEGIN IMMEDIATE agar tidak ada race antar thread.
+        Atomic: BEGIN IMMEDIATE agar tidak ada race antar thread/proses.
         """
         key = self._folder_key(folder_path)
-        with _DB_LOCK, sqlite3.connect(self.db_path, isolation_level=None) as conn:
-            conn.execute("BEGIN IMMEDIATE")
+        with self._tx() as conn:
             cur = conn.execute("SELECT last_index FROM counters WHERE key=?", (key,))
             row = cur.fetchone()
             base = max(int(row[0]) if row and row[0] is not None else 0, int(fallback_probe))
@@ -123,5 +345,4 @@ class SqliteStore:
                 VALUES(?,?,?)
                 ON CONFLICT(key) DO UPDATE SET last_index=?, updated_at=?
             """, (key, end, now, end, now))
-            conn.execute("COMMIT")
         return list(range(start, end + 1))
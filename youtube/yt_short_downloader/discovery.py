@@ -0,0 +1,78 @@
+# yt_short_downloader/discovery.py
+"""
+Tahap discovery terpisah untuk batch mode: listing banyak channel secara
+paralel (pool terbatas + rate limit per host), hasilnya di-stream ke
+konsumen (download) begitu satu channel selesai — download tidak perlu
+menunggu semua listing selesai.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+__all__ = ["HostRateLimiter", "ChannelDiscovery"]
+
+
+class HostRateLimiter:
+    """
+    Token bucket per host: rata-rata `rate` request/detik, burst `burst`.
+    acquire() memblok thread pemanggil sampai token tersedia.
+    """
+
+    def __init__(self, rate: float = 0.5, burst: int = 2):
+        self.rate = max(rate, 0.01)
+        self.burst = max(burst, 1)
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # host -> (tokens, last_ts)
+
+    def acquire(self, url: str) -> None:
+        host = urlparse(url).netloc.lower() or url
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(host, (float(self.burst), now))
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                if tokens >= 1.0:
+                    self._buckets[host] = (tokens - 1.0, now)
+                    return
+                self._buckets[host] = (tokens, now)
+                wait = (1.0 - tokens) / self.rate
+            time.sleep(wait)
+
+
+class ChannelDiscovery:
+    """
+    Jalankan `discover(link)` untuk tiap link di pool berukuran max_workers
+    dan yield (link, hasil, error) sesuai urutan SELESAI.
+
+        for link, result, err in ChannelDiscovery(fn, 4).run(links):
+            ...  # download channel ini sementara listing lain jalan terus
+    """
+
+    def __init__(self, discover: Callable[[str], Any], max_workers: int = 4):
+        self.discover = discover
+        self.max_workers = max(1, max_workers)
+
+    def run(self, links: Iterable[str]) -> Iterator[Tuple[str, Any, Optional[BaseException]]]:
+        links = list(links)
+        out: "queue.Queue" = queue.Queue()
+
+        def _task(link: str) -> None:
+            try:
+                out.put((link, self.discover(link), None))
+            except BaseException as e:  # diteruskan ke konsumen
+                out.put((link, None, e))
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="discover")
+        try:
+            for link in links:
+                pool.submit(_task, link)
+            for _ in range(len(links)):
+                yield out.get()
+        finally:
+            # konsumen berhenti lebih awal (Ctrl+C/break) -> batalkan yang belum jalan
+            pool.shutdown(wait=False, cancel_futures=True)
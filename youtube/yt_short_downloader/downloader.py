@@ -1,4 +1,5 @@
 import os
+import json
 import shutil
 import subprocess
 import threading
@@ -7,46 +8,47 @@ import random
 from typing import List, Dict, Optional, Callable, Tuple
 
 from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor
 
-from .config import MAX_RETRIES
-from .utils import create_safe_filename, validate_filename, get_unique_filename, get_existing_index
-from .ytdlp_tools import (
-    detect_best_hd_selector, probe_resolution_bitrate,
-    upscale_video_if_needed, enhance_video,
+from .config import MAX_RETRIES, DOWNLOAD_ENGINE, USE_PLANNER, DOWNLOAD_WORKERS_MIN, DOWNLOAD_WORKERS_MAX
+from .utils import (
+    create_safe_filename, validate_filename, get_unique_filename, get_existing_index,
+    normalize_upload_date,
 )
+from .ytdlp_tools import probe_resolution_bitrate
+from .ytdlp_engine import (
+    EngineDownloadError, get_engine, strategy_cli_args,
+)
+from .planner import client_args, plan_download, record_outcome
+from .format_cache import get_format_cache
 from .pytube_downloader import download_pytube
+from .scheduler import AIMDLimit, AdaptiveScheduler
+from .postprocess import get_postprocess_stage, postprocess_file
+from .folder_index import VIDEO_EXTS, get_folder_index
+from .video_files import get_video_file_index, record_replaced
+from .failures import get_failure_ledger
+from .logsink import get_log_sink
 
-__all__ = ["download_video", "download_videos"]
+__all__ = ["download_video", "download_videos", "last_failure_reason", "session_signals"]
 
 # ---------- logging ----------
-_LOG_LOCK = threading.Lock()
-def _log_error(msg: str, output_path: Optional[str]=None) -> None:
-    safe = (msg or "").rstrip() + "\n"
-    with _LOG_LOCK:
-        try:
-            with open("download_errors.log","a",encoding="utf-8",errors="replace") as f:
-                f.write(safe)
-        except Exception:
-            pass
-        if output_path:
-            try:
-                os.makedirs(output_path, exist_ok=True)
-                with open(os.path.join(output_path,"download_errors.log"),"a",encoding="utf-8",errors="replace") as f2:
-                    f2.write(safe)
-            except Exception:
-                pass
-    print(safe, end="")
+# Tulis file + print lewat writer thread tunggal (logsink): worker tidak
+# pernah menunggu lock / open file untuk logging.
+def _log_error(msg: str, output_path: Optional[str]=None, level: Optional[str]=None) -> None:
+    get_log_sink().emit(msg, output_path, level)
 
 # ---------- helpers ----------
 def cleanup_partial_downloads(output_path: str, filename_pattern: str) -> None:
     try:
-        # Pindai file yang cocok dengan nama video, lalu hapus .part / .ytdl
-        for file in os.listdir(output_path):
-            if file.startswith(filename_pattern) and (file.endswith(".part") or file.endswith(".ytdl")):
+        # Cari file dengan prefix nama video di FolderIndex, lalu hapus .part / .ytdl
+        fidx = get_folder_index(output_path)
+        for file in fidx.with_prefix(filename_pattern):
+            if file.endswith(".part") or file.endswith(".ytdl"):
                 try:
                     full_p = os.path.join(output_path,file)
                     os.remove(full_p)
+                    fidx.discard(file)
+                except FileNotFoundError:
+                    fidx.discard(file)
                 except Exception as e:
                     _log_error(f"[CLEANUP] {file} -> {e}", output_path)
     except Exception as e:
@@ -95,22 +97,147 @@ def _base_args() -> List[str]:
         '--user-agent','Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
     ]
 
+# ---------------------------------------------------------
+# MAJOR STRATEGY OVERHAUL (Anti-403 & 1080p Enforcement)
+# ---------------------------------------------------------
+
+# Format Strings (Prioritize 1080p > 720p, AVC > VP9)
+# Chain: 1080p AVC -> 1080p Any -> 720p AVC -> 720p Any
+# STRICT: Never accept < 720p
+FMT_CHAIN = (
+    "bv*[height>=1080][vcodec^=avc]+ba[ext=m4a]/"  # 1. 1080p AVC
+    "bv*[height>=1080]+ba/"                        # 2. 1080p Any
+    "bv*[height>=720][vcodec^=avc]+ba[ext=m4a]/"   # 3. 720p AVC
+    "bv*[height>=720]+ba"                          # 4. 720p Any
+)
+
+# Strategi dideklarasikan sebagai data supaya bisa dijalankan lewat
+# subprocess (strategy_cli_args) maupun engine in-process (ytdlp_engine).
+_STRATEGIES: List[Dict] = [
+    # STRATEGY 1: "The Clean Android" (Default)
+    {"name": "Android Mobile API (HD Only)", "format": FMT_CHAIN, "player_client": "android"},
+    # STRATEGY 2: "Android Creator"
+    {"name": "Android Creator API (HD Only)", "format": FMT_CHAIN, "player_client": "android_creator"},
+    # STRATEGY 3: "Web Client"
+    {"name": "Web Client (HD Only)", "format": FMT_CHAIN, "player_client": "web,-ios"},
+    # STRATEGY 4: "TV Client"
+    {"name": "TV Client API (HD Only)", "format": FMT_CHAIN, "player_client": "tv"},
+    # STRATEGY 5: "Force IPv4"
+    {"name": "IPv4 + Single Thread", "format": FMT_CHAIN, "force_ipv4": True, "concurrent_fragments": 1},
+    # STRATEGY 6: "Cookie Injection"
+    {"name": "Chrome Cookies (Authenticated)", "format": FMT_CHAIN,
+     "cookies_from_browser": "chrome", "force_ipv4": True},
+    # STRATEGY 7: "The Tank"
+    {"name": "Pre-merged Legacy (HD Only)", "format": "b[height>=1080]/b[height>=720]",  # STRICT NO 'b' fallback
+     "rm_cache": True, "force_ipv4": True},
+    # STRATEGY 8: "IOS Client"
+    {"name": "IOS Client (HD Only)", "format": FMT_CHAIN, "player_client": "ios"},
+]
+
+# ---------- engine dispatch ----------
+def _run_strategy(strat: Dict, video_url: str, file_path: str, tmp_dir: str,
+                  timeout: int, output_path: Optional[str], engine: str) -> None:
+    """
+    Jalankan satu strategi. Gagal -> raise EngineDownloadError (in-process;
+    EngineTimeout kalau lewat `timeout`, sama seperti batas subprocess)
+    atau subprocess.CalledProcessError (subprocess).
+    Mode "inproc" jatuh ke subprocess kalau yt_dlp tidak bisa di-import
+    atau engine crash di luar DownloadError.
+    """
+    if engine == "inproc":
+        eng = get_engine()
+        if eng.available:
+            try:
+                eng.download(strat, video_url, file_path, tmp_dir, timeout=timeout)
+                return
+            except EngineDownloadError:
+                raise
+            except Exception as e:
+                eng.evict(strat)
+                _log_error(f"[ENGINE] in-process crash ({e}) — retrying '{strat['name']}' via subprocess", output_path)
+
+    target = ['--output', file_path, video_url]
+    if strat.get("info"):
+        # info ter-cache -> --load-info-json, tanpa extract ulang
+        info_path = os.path.join(tmp_dir, "info.json")
+        with open(info_path, "w", encoding="utf-8") as f:
+            json.dump(strat["info"], f, ensure_ascii=False)
+        target = ['--output', file_path, '--load-info-json', info_path]
+
+    args = (
+        _base_args()
+        + ['--paths', f'temp:{tmp_dir}']
+        + strategy_cli_args(strat)
+        + target
+    )
+    _run_yt_dlp(args, timeout=timeout, output_path=output_path)
+
 def _find_final_output(output_dir: str, out_template: str) -> Optional[str]:
     if "%(ext)s" not in out_template:
         return out_template if os.path.exists(out_template) else None
-    prefix = os.path.basename(out_template.replace("%(ext)s",""))
-    cand = [os.path.join(output_dir,f) for f in os.listdir(output_dir)
-            if f.startswith(prefix) and not f.endswith(".part")]
+    # part temp ada di tmp_dir, jadi cukup stat ekstensi video yang mungkin
+    # dihasilkan yt-dlp (tanpa listdir folder output per video)
+    base = out_template.replace("%(ext)s","")
+    cand = [base + ext[1:] for ext in VIDEO_EXTS if os.path.exists(base + ext[1:])]
     if not cand: return None
     cand.sort(key=lambda p: os.path.getsize(p), reverse=True)
+    fidx = get_folder_index(output_dir)
+    for p in cand:
+        fidx.add(p)
     return cand[0]
 
+def _file_size(path: Optional[str]) -> int:
+    try:
+        return os.path.getsize(path) if path else 0
+    except OSError:
+        return 0
+
 def _rm_tree(path: str) -> None:
     try:
         if os.path.isdir(path): shutil.rmtree(path, ignore_errors=True)
     except Exception:
         pass
 
+def _record_video_file(video_id: str, txt: Optional[str], mp4: Optional[str], channel: str) -> None:
+    # reverse index video_id -> file (video_files); gagal di sini tidak boleh menggagalkan download
+    try:
+        get_video_file_index().record(video_id, txt=txt, mp4=mp4, channel=channel)
+    except Exception:
+        pass
+
+def _submit_postprocess(path: str, output_path: str, w: int, h: int,
+                        on_done: Optional[Callable[[str], None]] = None) -> None:
+    try:
+        get_postprocess_stage(log=_log_error).submit(path, output_path, w, h, on_done=on_done)
+    except Exception as e:
+        # stage tidak tersedia (mis. pool gagal start) -> jalankan inline
+        _log_error(f"[POST] {e}; post-process inline", output_path)
+        final, logs = postprocess_file(path, w, h)
+        for line in logs:
+            _log_error(line, output_path)
+        if on_done:
+            on_done(final)
+
+def _on_postprocessed(on_phase: Optional[Callable[[str, Optional[str]], None]], src: str,
+                      final: Optional[str], output_path: str) -> None:
+    # post-process bisa mengganti file (upscale/convert, file asli dihapus):
+    # reverse index & FolderIndex ikut pindah ke path final
+    try:
+        record_replaced(src, final)
+    except Exception as e:
+        _log_error(f"[INDEX] {e}", output_path)
+    _phase(on_phase, "postprocessed", final, output_path)
+
+def _phase(on_phase: Optional[Callable[[str, Optional[str]], None]], phase: str,
+           path: Optional[str], output_path: str) -> None:
+    # state machine per video (store); gagal catat tidak boleh menggagalkan download
+    if on_phase is None:
+        return
+    try:
+        on_phase(phase, path)
+    except Exception as e:
+        _log_error(f"[STATE] {phase}: {e}", output_path)
+
 # ---------- adaptive session state ----------
 class _SessionState:
     def __init__(self):
@@ -118,16 +245,27 @@ class _SessionState:
         self.consec_403 = 0
         self.jitter_base = (0.15, 0.5)  # detik
         self.is_strict = False  # New: adaptive strict mode
+        # counter kumulatif -> sinyal scheduler (AIMD)
+        self.n_403 = 0
+        self.n_success = 0
+        self.bytes_ok = 0
 
     def note_403(self):
         with self.lock:
             self.consec_403 += 1
+            self.n_403 += 1
             if self.consec_403 >= 3:
                 self.is_strict = True  # Activate strict mode quickly
 
-    def note_success(self):
+    def note_success(self, nbytes: int = 0):
         with self.lock:
             self.consec_403 = 0
+            self.n_success += 1
+            self.bytes_ok += max(0, int(nbytes))
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return {"n_403": self.n_403, "success": self.n_success, "bytes": self.bytes_ok}
 
     def maybe_pause(self, output_path: Optional[str]):
         with self.lock:
@@ -138,15 +276,57 @@ class _SessionState:
 
 _SESSION = _SessionState()
 
+def session_signals() -> Dict[str, int]:
+    """Counter kumulatif sesi (403, sukses, byte) untuk AdaptiveScheduler di luar modul ini."""
+    return _SESSION.snapshot()
+
+# ---------- alasan gagal per video ----------
+# Urutan prioritas kalau satu video gagal dengan beberapa alasan (antar strategi)
+_REASON_RANK = {"unavailable": 4, "403": 3, "lowres": 2, "network": 1, "other": 0}
+_FAIL_REASONS: Dict[str, str] = {}
+_FAIL_LOCK = threading.Lock()
+
+def _classify_error(msg: str) -> str:
+    m = (msg or "").lower()
+    if "http error 403" in m or "403: forbidden" in m:
+        return "403"
+    if any(k in m for k in ("video unavailable", "private video", "has been removed",
+                            "members-only", "not available", "account associated", "copyright")):
+        return "unavailable"
+    if any(k in m for k in ("timed out", "timeout", "connection", "temporary failure",
+                            "http error 5", "network is unreachable")):
+        return "network"
+    return "other"
+
+def _worse(cur: Optional[str], new: str) -> str:
+    return new if cur is None or _REASON_RANK[new] > _REASON_RANK[cur] else cur
+
+def _record_failure(video_id: str, error_class: str, **kw) -> None:
+    # ledger SQLite (failures.py): hanya antre ke writer thread, tidak blocking
+    try:
+        get_failure_ledger().record(video_id, error_class, **kw)
+    except Exception:
+        pass
+
+def last_failure_reason(video_id: str) -> Optional[str]:
+    """Alasan gagal terakhir download_video(video_id): 403/unavailable/lowres/network/other."""
+    with _FAIL_LOCK:
+        return _FAIL_REASONS.pop(video_id, None)
+
 # ---------- main ----------
 def download_video(
     video_id: str, video_title: str, output_path: str,
     channel_name: str, quality: str, file_format: str, index: int,
     force_min_height: int = 1080,  # FORCE 1080P STRICT
     enhance_mode: str = "quality",
-    quality_floor: int = 1080      # ANTI 360P, only accept 1080p+
+    quality_floor: int = 1080,     # ANTI 360P, only accept 1080p+
+    engine: Optional[str] = None,  # "inproc" / "subprocess"; None -> config.DOWNLOAD_ENGINE
+    channel_key: Optional[str] = None,  # kunci statistik planner (default: channel_name)
+    on_phase: Optional[Callable[[str, Optional[str]], None]] = None,  # (fase, path): fetching/downloaded/postprocessed
 ) -> bool:
 
+    engine = engine or DOWNLOAD_ENGINE
+
     # jitter kecil per-job untuk kurangi spike request
     time.sleep(random.uniform(*_SESSION.jitter_base))
 
@@ -165,13 +345,18 @@ def download_video(
     cleanup_partial_downloads(output_path, f"{index:02d} - {safe_title}")
 
     # caption
+    cap_path = None
     try:
         capfile = get_unique_filename(output_path, f"{index:02d} - {safe_title} - {safe_channel}.txt")
         with open(os.path.join(output_path, capfile), "w", encoding="utf-8", errors="replace") as f:
             # ADDED: Link to video
             f.write(f"{video_title} #shorts\n\nYouTube: {channel_name}\nLink: {video_url}")
+        get_folder_index(output_path).add(capfile)
+        cap_path = os.path.join(output_path, capfile)
+        _record_video_file(video_id, cap_path, None, channel_name)
     except Exception as e:
         _log_error(f"[CAPTION] {e}", output_path)
+    _phase(on_phase, "fetching", cap_path, output_path)
 
     timeout  = 1200 # Increased timeout
     
@@ -181,97 +366,6 @@ def download_video(
     tmp_dir  = os.path.join(tmp_root, f"{index:06d}")
     os.makedirs(tmp_dir, exist_ok=True)
 
-    # ---------------------------------------------------------
-    # MAJOR STRATEGY OVERHAUL (Anti-403 & 1080p Enforcement)
-    # ---------------------------------------------------------
-    
-    # Format Strings (Prioritize 1080p > 720p, AVC > VP9)
-    # Chain: 1080p AVC -> 1080p Any -> 720p AVC -> 720p Any
-    # STRICT: Never accept < 720p
-    FMT_CHAIN = (
-        "bv*[height>=1080][vcodec^=avc]+ba[ext=m4a]/"  # 1. 1080p AVC
-        "bv*[height>=1080]+ba/"                        # 2. 1080p Any
-        "bv*[height>=720][vcodec^=avc]+ba[ext=m4a]/"   # 3. 720p AVC
-        "bv*[height>=720]+ba"                          # 4. 720p Any
-    )
-
-    strategies = [
-        # STRATEGY 1: "The Clean Android" (Default)
-        {
-            "name": "Android Mobile API (HD Only)",
-            "args": [
-                '-f', FMT_CHAIN,
-                '--extractor-args', 'youtube:player_client=android'
-            ]
-        },
-
-        # STRATEGY 2: "Android Creator"
-        {
-            "name": "Android Creator API (HD Only)",
-            "args": [
-                '-f', FMT_CHAIN,
-                '--extractor-args', 'youtube:player_client=android_creator'
-            ]
-        },
-        
-        # STRATEGY 3: "Web Client"
-        {
-            "name": "Web Client (HD Only)", 
-            "args": [
-                '-f', FMT_CHAIN,
-                '--extractor-args', 'youtube:player_client=web,-ios' 
-            ]
-        },
-
-        # STRATEGY 4: "TV Client"
-        {
-            "name": "TV Client API (HD Only)",
-            "args": [
-                '-f', FMT_CHAIN,
-                '--extractor-args', 'youtube:player_client=tv'
-            ]
-        },
-        
-        # STRATEGY 5: "Force IPv4"
-        {
-            "name": "IPv4 + Single Thread",
-            "args": [
-                '-f', FMT_CHAIN,
-                '--force-ipv4',
-                '-N', '1' 
-            ]
-        },
-
-        # STRATEGY 6: "Cookie Injection"
-        {
-            "name": "Chrome Cookies (Authenticated)",
-            "args": [
-                '-f', FMT_CHAIN,
-                '--cookies-from-browser', 'chrome',
-                '--force-ipv4'
-            ]
-        },
-        
-        # STRATEGY 7: "The Tank"
-        {
-            "name": "Pre-merged Legacy (HD Only)",
-            "args": [
-                '-f', "b[height>=1080]/b[height>=720]", # STRICT NO 'b' fallback
-                '--rm-cache-dir',
-                '--force-ipv4'
-            ]
-        },
-
-        # STRATEGY 8: "IOS Client"
-        {
-            "name": "IOS Client (HD Only)",
-            "args": [
-                '-f', FMT_CHAIN,
-                '--extractor-args', 'youtube:player_client=ios'
-            ]
-        }
-    ]
-
     # Helper cleaning
     def _purge_tmp_parts():
         try:
@@ -281,33 +375,55 @@ def download_video(
                     except: pass
         except: pass
 
+    # PLANNER: resolve format per client sekali (metadata-only), lalu
+    # SATU download dengan client pemenang + format_id exact. Rantai
+    # strategi lama tetap jadi fallback, minus client yang sudah terbukti
+    # tidak punya format HD.
+    strategies = list(_STRATEGIES)
+    plan = None
+    stats_key = channel_key or channel_name
+    if USE_PLANNER:
+        try:
+            plan = plan_download(video_url, stats_key, target_height=force_min_height,
+                                 floor_height=720, engine=engine)
+        except Exception as e:
+            _log_error(f"[PLAN] {e}", output_path)
+        if plan:
+            dead = set(plan["dead"])
+            strategies = [s for s in strategies
+                          if (s.get("player_client") or "").split(",")[0] not in dead]
+            if plan["client"]:
+                strategies.insert(0, {
+                    "name": f"Planned {plan['client']} [{plan['selector']}]",
+                    "format": plan["selector"],
+                    "player_client": plan["client"],
+                    "info": plan.get("info"),
+                    "planned": True,
+                })
+
     success = False
     last_file_path = None
+    planned_ok = False
+    fail_reason: Optional[str] = None
+    post_job = None  # (path, w, h) untuk tahap post-process
     
     try:
         # GLOBAL RETRY LOOP
-        for strat in strategies:
+        for attempt, strat in enumerate(strategies, 1):
             if success: break
             
             s_name = strat["name"]
-            s_args = strat["args"]
-            
-            args = (
-                _base_args()
-                + ['--paths', f'temp:{tmp_dir}']
-                + s_args
-                + ['--output', file_path, video_url]
-            )
             
             try:
                 # 1. EXECUTE
-                _run_yt_dlp(args, timeout=timeout, output_path=output_path)
+                _run_strategy(strat, video_url, file_path, tmp_dir, timeout, output_path, engine)
                 
                 # 2. VERIFY OUTPUT
                 final_file = _find_final_output(output_path, file_path)
                 
                 if not final_file or os.path.getsize(final_file) < 1000:
                     _purge_tmp_parts()
+                    fail_reason = _worse(fail_reason, "other")
                     continue # Silent fail, next strategy
 
                 last_file_path = final_file
@@ -328,50 +444,32 @@ def download_video(
                         _log_error(f"[REJECT] Got {w}x{h} (< 720p). Trash. Strategy {s_name} failed.", output_path)
                         try: os.remove(final_file)
                         except: pass
+                        get_folder_index(output_path).discard(final_file)
                         _purge_tmp_parts()
+                        fail_reason = _worse(fail_reason, "lowres")
+                        _record_failure(video_id, "lowres", channel=stats_key, strategy=s_name,
+                                        message=f"{w}x{h}", attempt=attempt, output_path=output_path)
                         time.sleep(1)
                         continue # Try next strategy
                     
-                    elif short_dim < 1000: # 720p - 999p range
-                        # UPSCALE ALLOWED (720 -> 1080)
-                        _log_error(f"[INFO] Got {w}x{h} (720p). Upscaling to 1080p...", output_path)
-                        try:
-                            up_path = upscale_video_if_needed(final_file, 1080)
-                            if up_path and os.path.exists(up_path):
-                                if up_path != final_file:
-                                    try: os.remove(final_file)
-                                    except: pass
-                                final_file = up_path
-                                last_file_path = final_file
-                        except Exception as e:
-                            _log_error(f"[UPSCALE FAIL] {e}. Keeping 720p original.", output_path)
-                    
-                    # 4. CONVERT VP9 -> H.264 IF NEEDED (Same logic as before)
-                    try:
-                        import sys
-                        current_dir = os.path.dirname(os.path.abspath(__file__)) 
-                        parent_dir = os.path.dirname(current_dir)
-                        if parent_dir not in sys.path: sys.path.append(parent_dir)
-                        import cek_resolusi
-                        
-                        new_path, converted = cek_resolusi.check_and_convert_video(
-                            final_file, target_mode='reels', force=False
-                        )
-                        
-                        if converted and os.path.exists(new_path):
-                            final_file = new_path
-                            last_file_path = final_file
-                            
-                    except Exception as e:
-                        pass
+                    # 4. UPSCALE (720p) + CONVERT VP9 -> H.264: tahap post-process
+                    # terpisah (process pool), di-submit setelah safety check.
+                    post_job = (final_file, w, h)
 
                 success = True
-                _SESSION.note_success()
+                planned_ok = bool(strat.get("planned"))
+                _SESSION.note_success(_file_size(final_file))
                 
-            except subprocess.CalledProcessError as e:
-                err_msg = (e.stderr or "") + (e.stdout or "")
+            except (subprocess.CalledProcessError, EngineDownloadError) as e:
+                if isinstance(e, subprocess.CalledProcessError):
+                    err_msg = (e.stderr or "") + (e.stdout or "")
+                else:
+                    err_msg = str(e)
                 if "HTTP Error 403" in err_msg:
                     _SESSION.note_403()
+                fail_reason = _worse(fail_reason, _classify_error(err_msg))
+                _record_failure(video_id, _classify_error(err_msg), channel=stats_key, strategy=s_name,
+                                message=err_msg, attempt=attempt, output_path=output_path)
                 
                 _purge_tmp_parts()
                 time.sleep(random.uniform(2, 4))
@@ -379,11 +477,22 @@ def download_video(
                 
             except Exception as e:
                 _purge_tmp_parts()
+                fail_reason = _worse(fail_reason, _classify_error(str(e)))
+                _record_failure(video_id, _classify_error(str(e)), channel=stats_key, strategy=s_name,
+                                message=str(e), attempt=attempt, output_path=output_path)
                 continue
                 
     finally:
         _rm_tree(tmp_dir)
         cleanup_partial_downloads(output_path, f"{index:02d} - {safe_title}")
+        if plan:
+            record_outcome(stats_key, plan, planned_ok)
+            if plan["client"] and not planned_ok:
+                # info ter-cache mungkin basi (URL 403/expired) -> jangan dipakai lagi
+                try:
+                    get_format_cache().invalidate(video_id, client_args(plan["client"]))
+                except Exception:
+                    pass
 
     # --- PYTUBE FALLBACK (Last Resort) ---
     if not success:
@@ -413,44 +522,21 @@ def download_video(
                             _log_error(f"[REJECT-PYTUBE] Got {w}x{h} (< 720p). Trash.", output_path)
                             try: os.remove(final_file)
                             except: pass
+                            get_folder_index(output_path).discard(final_file)
                             pytube_success = False
+                            fail_reason = _worse(fail_reason, "lowres")
+                            _record_failure(video_id, "lowres", channel=stats_key, strategy="pytube",
+                                            message=f"{w}x{h}", output_path=output_path)
                         
-                        # 2. Upscale (720 -> 1080)
-                        elif short_dim < 1000:
-                            _log_error(f"[INFO-PYTUBE] Got {w}x{h} (720p). Upscaling...", output_path)
-                            try:
-                                up_path = upscale_video_if_needed(final_file, 1080)
-                                if up_path and os.path.exists(up_path):
-                                    if up_path != final_file:
-                                        try: os.remove(final_file)
-                                        except: pass
-                                    final_file = up_path
-                            except Exception as e:
-                                _log_error(f"[UPSCALE FAIL] {e}. Keeping original.", output_path)
-
-                        # 3. Ratio Check (9:16 Enforcement)
-                        if pytube_success:
-                             try:
-                                import sys
-                                current_dir = os.path.dirname(os.path.abspath(__file__)) 
-                                parent_dir = os.path.dirname(current_dir)
-                                if parent_dir not in sys.path: sys.path.append(parent_dir)
-                                import cek_resolusi
-                                
-                                new_path, converted = cek_resolusi.check_and_convert_video(
-                                    final_file, target_mode='reels', force=False
-                                )
-                                if converted and os.path.exists(new_path):
-                                    final_file = new_path
-                             except ImportError:
-                                pass # cek_resolusi might not be available
-                             except Exception as e:
-                                _log_error(f"[RATIO CHECK FAIL] {e}", output_path)
+                        # 2. Upscale (720 -> 1080) + 3. Ratio Check (9:16) -> post-process stage
+                        else:
+                            post_job = (final_file, w, h)
 
                      if pytube_success:
                          success = True
                          last_file_path = final_file
-                         _SESSION.note_success()
+                         get_folder_index(output_path).add(final_file)
+                         _SESSION.note_success(_file_size(final_file))
                          _log_error(f"[SUCCESS] Pytube Saved & Validated: {last_file_path}", output_path)
                      else:
                          _log_error(f"[FAIL] Pytube validation failed.", output_path)
@@ -465,25 +551,54 @@ def download_video(
         if not (last_file_path and os.path.exists(last_file_path) and os.path.getsize(last_file_path) > 1000):
             success = False
             _log_error(f"[FATAL] Phantom Success detected. File missing: {last_file_path}", output_path)
+        else:
+            _record_video_file(video_id, cap_path, last_file_path, channel_name)
+            try: get_failure_ledger().resolve(video_id)
+            except Exception: pass
+            _phase(on_phase, "downloaded", last_file_path, output_path)
+            if post_job and post_job[0] == last_file_path:
+                # slot download langsung lepas; encode jalan di process pool
+                _submit_postprocess(post_job[0], output_path, post_job[1], post_job[2],
+                                    on_done=lambda final, src=post_job[0]: _on_postprocessed(
+                                        on_phase, src, final, output_path))
+            else:
+                _phase(on_phase, "postprocessed", last_file_path, output_path)
 
     if not success:
+        with _FAIL_LOCK:
+            _FAIL_REASONS[video_id] = fail_reason or "other"
+        _record_failure(video_id, fail_reason or "other", channel=stats_key, title=video_title,
+                        output_path=output_path, final=True,
+                        http_status=403 if fail_reason == "403" else None)
         # LOG SKIP
         try:
             with open(os.path.join(output_path, "skipped.txt"), "a", encoding="utf-8") as fs:
                 fs.write(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] SKIP {video_id} - {video_title} - {video_url}\n")
+            get_folder_index(output_path).add("skipped.txt")
         except: pass
 
     return success
 
 
+def _entry_priority(entry: Dict) -> int:
+    """Upload terbaru dulu; entri tanpa tanggal di belakang (urutan listing dipertahankan)."""
+    iso = normalize_upload_date(entry.get("upload_date"))
+    return -int(iso.replace("-", "")) if iso else 0
+
+
 def download_videos(
     video_entries: List[Dict], output_path: str, channel_name: str,
     quality: str, file_format: str,
     preassigned_indices: Optional[List[int]]=None,
     on_success: Optional[Callable[[Dict,int],None]]=None,
     max_workers: int = 3,
+    engine: Optional[str] = None,
+    channel_key: Optional[str] = None,
+    on_phase: Optional[Callable[[Dict,int,str,Optional[str]],None]]=None,
 ) -> None:
     os.makedirs(output_path, exist_ok=True)
+    # satu stat (scan ulang hanya kalau folder berubah); lookup per video setelah ini di memori
+    get_folder_index(output_path, sync=True)
 
     if preassigned_indices is not None:
         if len(preassigned_indices) != len(video_entries):
@@ -493,30 +608,45 @@ def download_videos(
         start_index = get_existing_index(output_path) + 1
         indices = [start_index + i for i in range(len(video_entries))]
 
+    # stage post-process dibuat di awal: job tertunda dari run sebelumnya langsung lanjut
+    try:
+        get_postprocess_stage(log=_log_error)
+    except Exception as e:
+        _log_error(f"[POST] {e}", output_path)
+
     total = len(video_entries)
     pbar = tqdm(total=total, desc="Downloading", unit="video", ascii=True)
 
-    def _task(entry: Dict, idx: int) -> bool:
+    def _task(job: Tuple[Dict, int]) -> bool:
+        entry, idx = job
         # jitter awal antar-task
         time.sleep(random.uniform(0.15, 0.5))
         ok = download_video(
             entry['id'], entry.get('title','Unknown Title'),
             output_path, channel_name, quality, file_format, idx,
-            force_min_height=1080, enhance_mode="quality", quality_floor=1080
+            force_min_height=1080, enhance_mode="quality", quality_floor=1080,
+            engine=engine, channel_key=channel_key,
+            on_phase=(lambda phase, path: on_phase(entry, idx, phase, path)) if on_phase else None,
         )
         if ok and on_success:
             try: on_success(entry, idx)
             except Exception as e: _log_error(f"[CALLBACK] {e}", output_path)
         return ok
 
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        futures = [ex.submit(_task, e, idx) for e, idx in zip(video_entries, indices)]
-        for fut in futures:
-            try:
-                fut.result()
-            except Exception as e:
-                _log_error(f"[THREAD] {e}", output_path)
-            finally:
-                pbar.update(1)
+    # Concurrency adaptif (AIMD): mulai dari max_workers, turun saat 403 /
+    # success rate jeblok, naik pelan selama lancar. Index file tetap
+    # mengikuti preassigned_indices, hanya urutan eksekusi yang berubah.
+    limit = AIMDLimit(initial=max_workers, min_limit=DOWNLOAD_WORKERS_MIN,
+                      max_limit=max(max_workers, DOWNLOAD_WORKERS_MAX))
+    sched = AdaptiveScheduler(
+        limit, _SESSION.snapshot,
+        on_change=lambda n: _log_error(f"[SCHED] concurrency -> {n}", output_path),
+    )
+    jobs = [(_entry_priority(e), (e, idx)) for e, idx in zip(video_entries, indices)]
+    for _job, _ok, err in sched.run(jobs, _task):
+        if err is not None:
+            _log_error(f"[THREAD] {err}", output_path)
+        pbar.update(1)
+        pbar.set_postfix(workers=limit.slots, refresh=False)
 
     pbar.close()
@@ -0,0 +1,168 @@
+# yt_short_downloader/enrich.py
+"""
+Service enrichment upload_date (extract_flat shorts hampir selalu null).
+
+- Cache persisten: kolom ``videos.upload_date`` di store (SqliteStore /
+  TinyStore). ID yang tanggalnya sudah ada di DB tidak pernah kena network.
+- Sisanya di-fetch paralel dengan pool terbatas (info lewat engine
+  in-process + format_cache, fallback subprocess ``yt-dlp -J``).
+- Early-stop newest-first tetap berlaku: entri diasumsikan urut terbaru ->
+  terlama; begitu posisi p terbukti lebih tua dari cutoff, posisi > p tidak
+  di-submit lagi (yang sudah jalan dibiarkan selesai, hasilnya tetap valid).
+"""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .format_cache import SHAPE_PROCESSED, SHAPE_RAW
+from .utils import normalize_upload_date, parse_upload_date
+from .ytdlp_engine import EngineDownloadError, get_engine
+from .ytdlp_tools import get_video_info
+
+__all__ = ["fetch_video_meta", "UploadDateEnricher"]
+
+
+def fetch_video_meta(video_id: str) -> Tuple[Optional[str], Optional[str]]:
+    """(upload_date 'YYYY-MM-DD' | None, title | None) untuk satu video."""
+    url = f"https://www.youtube.com/shorts/{video_id}"
+    fetch, shape = None, SHAPE_PROCESSED
+    eng = get_engine()
+    if eng.available:
+        def fetch():
+            try:
+                return eng.extract_info("", url)
+            except EngineDownloadError:
+                return None
+        shape = SHAPE_RAW
+    try:
+        info = get_video_info(url, fetch=fetch, shape=shape) or {}
+    except Exception:
+        info = {}
+    return normalize_upload_date(info.get("upload_date")), info.get("title")
+
+
+# Pool bersama & persisten: thread-nya hidup terus supaya instance YoutubeDL
+# (thread-local di engine) tetap hangat antar channel. Batas per panggilan
+# enrich() tetap max_workers milik enricher.
+_POOL: Optional[ThreadPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+def _shared_pool(min_workers: int) -> ThreadPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(max_workers=max(8, min_workers), thread_name_prefix="enrich")
+        return _POOL
+
+
+class UploadDateEnricher:
+    def __init__(
+        self,
+        store: Any = None,
+        max_workers: int = 4,
+        fetch: Optional[Callable[[str], Tuple[Optional[str], Optional[str]]]] = None,
+        channel_key: Optional[str] = None,
+    ):
+        self.store = store
+        self.channel_key = channel_key
+        self.max_workers = max(1, max_workers)
+        self.fetch = fetch or fetch_video_meta
+
+    def _cached_dates(self, ids: List[str]) -> Dict[str, str]:
+        if self.store is None or not hasattr(self.store, "get_upload_dates"):
+            return {}
+        try:
+            return self.store.get_upload_dates(ids)
+        except Exception:
+            return {}
+
+    def _persist(self, rows: List[Tuple[str, str, str]]) -> None:
+        # rows = (video_id, title, upload_date). Dengan channel_key baris baru
+        # ikut dibuat (video yang belum pernah masuk DB); tanpa itu hanya
+        # baris yang sudah ada yang di-update.
+        if not rows or self.store is None:
+            return
+        try:
+            if self.channel_key and hasattr(self.store, "upsert_videos_bulk"):
+                self.store.upsert_videos_bulk(self.channel_key, rows)
+            elif hasattr(self.store, "set_upload_dates"):
+                self.store.set_upload_dates({vid: up for vid, _, up in rows})
+        except Exception:
+            pass
+
+    def fill_cached(self, entries: List[Dict]) -> int:
+        """Isi upload_date yang kosong dari DB saja (tanpa network)."""
+        targets = [e for e in entries if e.get("id") and not normalize_upload_date(e.get("upload_date"))]
+        cached = self._cached_dates([e["id"] for e in targets])
+        n = 0
+        for e in targets:
+            iso = normalize_upload_date(cached.get(e["id"]))
+            if iso:
+                e["upload_date"] = iso
+                n += 1
+        return n
+
+    def enrich(self, entries: List[Dict], max_tasks: int = 25, cutoff: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Isi e["upload_date"] (format 'YYYY-MM-DD') untuk maksimal max_tasks
+        entri yang kosong. Return statistik {"cached", "fetched", "failed", "stopped_at"}.
+        """
+        targets = [e for e in entries if e.get("id") and not normalize_upload_date(e.get("upload_date"))][:max_tasks]
+        stats = {"cached": 0, "fetched": 0, "failed": 0, "stopped_at": -1}
+        if not targets:
+            return stats
+
+        def older(iso: Optional[str]) -> bool:
+            dt = parse_upload_date(iso) if (cutoff and iso) else None
+            return bool(dt and dt < cutoff)
+
+        # 1) Cache DB dulu (satu query)
+        cached = self._cached_dates([e["id"] for e in targets])
+        stop = len(targets)
+        for pos, e in enumerate(targets):
+            iso = normalize_upload_date(cached.get(e["id"]))
+            if iso:
+                e["upload_date"] = iso
+                stats["cached"] += 1
+                if older(iso):
+                    stop = pos
+                    break
+
+        # 2) Network paralel untuk sisanya, dengan early-stop berbasis posisi
+        todo = [(pos, e) for pos, e in enumerate(targets) if pos < stop and not e.get("upload_date")]
+        fetched: List[Tuple[str, str, str]] = []
+        ex = _shared_pool(self.max_workers)
+        running: Dict[Any, Tuple[int, Dict]] = {}
+        it = iter(todo)
+        while True:
+            while len(running) < self.max_workers:
+                nxt = next(it, None)
+                if nxt is None or nxt[0] > stop:
+                    break
+                running[ex.submit(self.fetch, nxt[1]["id"])] = nxt
+            if not running:
+                break
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in done:
+                pos, e = running.pop(fut)
+                try:
+                    iso, title = fut.result()
+                except Exception:
+                    iso, title = None, None
+                if title and not e.get("title"):
+                    e["title"] = title
+                if not iso:
+                    stats["failed"] += 1
+                    continue
+                e["upload_date"] = iso
+                fetched.append((e["id"], e.get("title") or "Unknown Title", iso))
+                stats["fetched"] += 1
+                if older(iso) and pos < stop:
+                    stop = pos
+
+        self._persist(fetched)
+        stats["stopped_at"] = stop if stop < len(targets) else -1
+        return stats
@@ -0,0 +1,260 @@
+# yt_short_downloader/failures.py
+"""
+Ledger gagal/skip terstruktur di SQLite (data/failures.db).
+
+- Satu baris per percobaan strategi yang gagal (final=0) plus satu baris
+  ringkasan saat video akhirnya di-skip (final=1, error_class = alasan
+  akhir: 403/unavailable/lowres/network/other).
+- Thread download hanya memanggil record() -> masuk queue; satu writer
+  thread menulis per batch (executemany), jadi worker tidak pernah menunggu
+  file/DB.
+- Helper query untuk tool retry (pending, failed_ids, counts_by_class,
+  mark_resolved) menggantikan parsing skipped.txt / download_errors.log.
+"""
+from __future__ import annotations
+
+import atexit
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+__all__ = ["FailureLedger", "get_failure_ledger", "http_status_of"]
+
+LEDGER_PATH = os.path.join(os.getcwd(), "data", "failures.db")
+
+WRITE_RETRIES = 3          # percobaan tulis per batch sebelum dibawa ke putaran berikutnya
+WRITE_RETRY_DELAY = 1.0    # detik; jeda antar percobaan (linear backoff)
+MAX_CARRY_ROWS = 10000     # batas baris tertunda di memori bila DB terus terkunci
+
+_HTTP_RE = re.compile(r"HTTP Error (\d{3})")
+
+_COLUMNS = ("video_id", "channel", "title", "strategy", "error_class", "http_status",
+            "attempt", "message", "output_path", "final", "ts")
+
+
+class _Resolve:
+    __slots__ = ("video_id",)
+
+    def __init__(self, video_id: str):
+        self.video_id = video_id
+
+
+def http_status_of(message: Optional[str]) -> Optional[int]:
+    m = _HTTP_RE.search(message or "")
+    return int(m.group(1)) if m else None
+
+
+class FailureLedger:
+    def __init__(self, path: Optional[str] = None, batch_size: int = 200, flush_interval: float = 0.5):
+        self.path = path or LEDGER_PATH
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._q: "queue.Queue" = queue.Queue()
+        self._local = threading.local()
+        self._writer: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS failures (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                video_id TEXT NOT NULL,
+                channel TEXT,
+                title TEXT,
+                strategy TEXT,
+                error_class TEXT,
+                http_status INTEGER,
+                attempt INTEGER,
+                message TEXT,
+                output_path TEXT,
+                final INTEGER DEFAULT 0,
+                resolved INTEGER DEFAULT 0,
+                ts REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_failures_video ON failures(video_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_failures_final ON failures(final, resolved)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    # ---------- write (non-blocking) ----------
+    def _ensure_writer(self) -> None:
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._start_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run, name="failure-ledger", daemon=True)
+                self._writer.start()
+
+    def record(
+        self,
+        video_id: str,
+        error_class: str,
+        channel: Optional[str] = None,
+        strategy: Optional[str] = None,
+        message: Optional[str] = None,
+        attempt: Optional[int] = None,
+        title: Optional[str] = None,
+        output_path: Optional[str] = None,
+        final: bool = False,
+        http_status: Optional[int] = None,
+    ) -> None:
+        """Antre satu baris; ditulis writer thread dalam batch."""
+        if http_status is None:
+            http_status = http_status_of(message)
+        row = (video_id, channel, title, strategy, error_class, http_status, attempt,
+               (message or "")[-2000:] or None, output_path, int(final), time.time())
+        self._ensure_writer()
+        self._q.put(row)
+
+    def resolve(self, video_id: str) -> None:
+        """Video akhirnya berhasil: tandai resolved (juga lewat writer thread)."""
+        self._ensure_writer()
+        self._q.put(_Resolve(video_id))
+
+    def _write(self, sql: str, batch: List[tuple], resolved: List[tuple]) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(sql, batch)
+            conn.executemany("UPDATE failures SET resolved=1 WHERE resolved=0 AND video_id=?", resolved)
+
+    def _run(self) -> None:
+        sql = f"INSERT INTO failures({','.join(_COLUMNS)}) VALUES({','.join('?' * len(_COLUMNS))})"
+        # baris dari batch yang gagal ditulis (mis. "database is locked") dibawa
+        # ke putaran berikutnya, bukan dibuang
+        carry_rows: List[tuple] = []
+        carry_resolved: List[tuple] = []
+        while True:
+            try:
+                item = self._q.get(timeout=WRITE_RETRY_DELAY if carry_rows or carry_resolved else None)
+            except queue.Empty:
+                item = None
+            batch, resolved, waiters = carry_rows, carry_resolved, []
+            carry_rows, carry_resolved = [], []
+            deadline = time.monotonic() + self.flush_interval
+            while item is not None:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif isinstance(item, _Resolve):
+                    resolved.append((item.video_id,))
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._q.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch or resolved:
+                for attempt in range(WRITE_RETRIES):
+                    try:
+                        self._write(sql, batch, resolved)
+                        break
+                    except Exception as e:
+                        err = e
+                        if attempt + 1 < WRITE_RETRIES:
+                            time.sleep(WRITE_RETRY_DELAY * (attempt + 1))
+                else:
+                    print(f"[LEDGER] gagal menulis {len(batch)} baris ({err}); dicoba lagi",
+                          file=sys.stderr)
+                    overflow = len(batch) - MAX_CARRY_ROWS
+                    if overflow > 0:
+                        print(f"[LEDGER] antrean tertunda penuh; {overflow} baris terlama dibuang",
+                              file=sys.stderr)
+                        batch = batch[overflow:]
+                    carry_rows, carry_resolved = batch, resolved
+            for ev in waiters:
+                ev.set()
+
+    def flush(self, timeout: float = 10.0) -> None:
+        """Tunggu semua baris yang sudah di-record tertulis ke DB."""
+        if self._writer is None or not self._writer.is_alive():
+            return
+        ev = threading.Event()
+        self._q.put(ev)
+        ev.wait(timeout)
+
+    # ---------- query ----------
+    def pending(self, channel: Optional[str] = None, since: Optional[float] = None,
+                error_class: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Skip terakhir (final=1, belum resolved) per video, terbaru dulu.
+        Field: video_id, channel, title, error_class, http_status, output_path, ts, skips.
+        """
+        self.flush()
+        where, args = ["final=1", "resolved=0"], []
+        if channel:
+            where.append("channel=?"); args.append(channel)
+        if since:
+            where.append("ts>=?"); args.append(since)
+        classes = list(error_class or [])
+        if classes:
+            where.append(f"error_class IN ({','.join('?' * len(classes))})"); args.extend(classes)
+        rows = self._conn().execute(f"""
+            SELECT video_id, channel, title, error_class, http_status, output_path, MAX(ts), COUNT(*)
+            FROM failures WHERE {' AND '.join(where)}
+            GROUP BY video_id ORDER BY MAX(ts) DESC
+        """, args).fetchall()
+        keys = ("video_id", "channel", "title", "error_class", "http_status", "output_path", "ts", "skips")
+        return [dict(zip(keys, r)) for r in rows]
+
+    def failed_ids(self, **filters) -> List[str]:
+        return [r["video_id"] for r in self.pending(**filters)]
+
+    def history(self, video_id: str) -> List[Dict[str, Any]]:
+        """Semua percobaan gagal satu video (lama -> baru)."""
+        self.flush()
+        rows = self._conn().execute(
+            f"SELECT {','.join(_COLUMNS)}, resolved FROM failures WHERE video_id=? ORDER BY ts",
+            (video_id,)).fetchall()
+        return [dict(zip(_COLUMNS + ("resolved",), r)) for r in rows]
+
+    def counts_by_class(self, since: Optional[float] = None, final_only: bool = True) -> Dict[str, int]:
+        self.flush()
+        where, args = ["resolved=0"], []
+        if final_only:
+            where.append("final=1")
+        if since:
+            where.append("ts>=?"); args.append(since)
+        return dict(self._conn().execute(
+            f"SELECT error_class, COUNT(DISTINCT video_id) FROM failures WHERE {' AND '.join(where)} "
+            "GROUP BY error_class", args).fetchall())
+
+    def mark_resolved(self, video_ids: Iterable[str]) -> int:
+        self.flush()
+        ids = list(video_ids)
+        n = 0
+        conn = self._conn()
+        with conn:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                n += conn.execute(
+                    f"UPDATE failures SET resolved=1 WHERE resolved=0 AND video_id IN ({','.join('?' * len(chunk))})",
+                    chunk).rowcount
+        return n
+
+
+_LEDGER: Optional[FailureLedger] = None
+_LEDGER_LOCK = threading.Lock()
+
+
+def get_failure_ledger() -> FailureLedger:
+    global _LEDGER
+    with _LEDGER_LOCK:
+        if _LEDGER is None:
+            _LEDGER = FailureLedger()
+            atexit.register(_LEDGER.flush)
+        return _LEDGER
@@ -1,21 +1,91 @@
+import time
 import traceback
 import yt_dlp
 
+from .config import LISTING_CACHE, LISTING_FULL_REFRESH_DAYS
+from .listing_cache import get_listing_cache
+
 __all__ = ["get_short_links"]
 
+# mode incremental: lebih dari ini entri baru tanpa ketemu ID lama -> listing penuh saja
+INCREMENTAL_MAX_NEW = 500
+
+
+def _shorts_tab(channel_url: str) -> str:
+    if '/@' in channel_url:
+        channel_username = channel_url.split('/@')[1].split('/')[0]
+        return f'https://www.youtube.com/@{channel_username}/shorts'
+    return channel_url.split('/about')[0] + '/shorts'
+
+
+def _sort_entries(entries):
+    # upload_date flat listing hampir selalu None -> urutan tab (terbaru dulu) dipertahankan
+    return sorted(entries, key=lambda v: v.get('upload_date') or '00000000', reverse=True)
+
 
-def get_short_links(channel_url: str, max_videos: int | None = None):
+def _list_incremental(ydl, tab_url: str, known: set):
+    """
+    Baca tab secara lazy (process=False -> entries generator, yt-dlp baru
+    meminta halaman continuation saat di-iterate) sampai ketemu ID yang
+    sudah dikenal. Return (entri baru, ketemu_id_lama, nama channel, tab habis).
+    """
+    result = ydl.extract_info(tab_url, download=False, process=False) or {}
+    channel_name = result.get('uploader') or result.get('channel')
+    new = []
+    for e in result.get('entries') or []:
+        if not e or not e.get('id'):
+            continue
+        if e['id'] in known:
+            return new, True, channel_name, False
+        new.append(e)
+        if len(new) >= INCREMENTAL_MAX_NEW:
+            return new, False, channel_name, False
+    return new, False, channel_name, True
+
+
+def get_short_links(channel_url: str, max_videos: int | None = None, limiter=None,
+                    incremental: bool | None = None):
+    """
+    List shorts channel via extract_flat.
+    limiter: HostRateLimiter opsional (discovery paralel) — acquire() sebelum request.
+    incremental: None -> config.LISTING_CACHE. Kalau listing channel ini sudah
+    ada di cache (dan belum lewat LISTING_FULL_REFRESH_DAYS), tab hanya dibaca
+    sampai ID yang sudah dikenal -> biasanya cuma 1 halaman.
+    """
     ydl_opts = {
         'quiet': True,
         'extract_flat': True,
         'playlistend': max_videos if max_videos else None,
     }
+    if incremental is None:
+        incremental = LISTING_CACHE
     try:
-        if '/@' in channel_url:
-            channel_username = channel_url.split('/@')[1].split('/')[0]
-            channel_url = f'https://www.youtube.com/@{channel_username}/shorts'
-        else:
-            channel_url = channel_url.split('/about')[0] + '/shorts'
+        channel_url = _shorts_tab(channel_url)
+
+        cache = get_listing_cache() if incremental else None
+        cached = cache.get(channel_url) if cache else None
+        if cached and not (cached["complete"] or (max_videos and len(cached["entries"]) >= max_videos)):
+            cached = None  # listing lama terpotong playlistend, tidak cukup untuk permintaan ini
+        if cached and time.time() - cached["full_at"] > LISTING_FULL_REFRESH_DAYS * 86400:
+            cached = None
+
+        if limiter is not None:
+            limiter.acquire(channel_url)
+
+        if cached:
+            known = {e["id"] for e in cached["entries"]}
+            with yt_dlp.YoutubeDL(dict(ydl_opts, playlistend=None)) as ydl:
+                new, hit, name, exhausted = _list_incremental(ydl, channel_url, known)
+            if hit or exhausted:
+                channel_name = name or cached["channel_name"] or channel_url.split('/@')[-1]
+                # tab habis tanpa ketemu ID lama -> hasil baca ini sudah listing lengkap
+                video_entries = new if exhausted and not hit else new + cached["entries"]
+                cache.put(channel_url, channel_name, video_entries,
+                          complete=cached["complete"] or exhausted, full=exhausted and not hit)
+                if max_videos:
+                    video_entries = video_entries[:max_videos]
+                return _sort_entries(video_entries), channel_name
+            # terlalu banyak video baru -> jatuh ke listing penuh
 
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             result = ydl.extract_info(channel_url, download=False)
@@ -23,7 +93,10 @@ def get_short_links(channel_url: str, max_videos: int | None = None):
         if 'entries' in result:
             video_entries = result['entries'][:max_videos] if max_videos else result['entries']
             channel_name = result.get('uploader', channel_url.split('/@')[-1])
-            video_entries = sorted(video_entries, key=lambda v: v.get('upload_date', '00000000'), reverse=True)
+            if cache:
+                cache.put(channel_url, channel_name, video_entries,
+                          complete=not max_videos or len(video_entries) < max_videos, full=True)
+            video_entries = _sort_entries(video_entries)
             return video_entries, channel_name
         else:
             print("Tidak ada video ditemukan di channel ini.")
@@ -34,4 +107,3 @@ def get_short_links(channel_url: str, max_videos: int | None = None):
         with open("download_errors.log", "a", encoding="utf-8") as log_file:
             log_file.write(f"Error fetching video list from {channel_url}:\n{tb}\n")
         return [], ""
-        
\ No newline at end of file
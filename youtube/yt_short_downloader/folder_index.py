@@ -0,0 +1,31 @@
+# yt_short_downloader/folder_index.py
+"""
+Re-export media_common.folder_index (satu modul untuk youtube/ dan tiktok/)
+dengan pola ID video YouTube ("... - <id>.mp4", "video_<id>", "[<id>]") dan
+snapshot di data/folder_index/.
+"""
+import os
+import re
+import sys
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
+
+from media_common.folder_index import (  # noqa: E402
+    VIDEO_EXTS, FolderIndex, configure, get_folder_index, ids_from_name, walk_folder_indexes,
+)
+
+from .config import FOLDER_INDEX_SNAPSHOT  # noqa: E402
+
+__all__ = [
+    "FolderIndex", "get_folder_index", "walk_folder_indexes",
+    "ids_from_name", "VIDEO_EXTS",
+]
+
+SNAPSHOT_DIR = os.path.join(os.getcwd(), "data", "folder_index")
+
+ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+BRACKET_ID_RE = re.compile(r"\[([A-Za-z0-9_-]{11})\]")
+
+configure(id_re=ID_RE, bracket_re=BRACKET_ID_RE, snapshot_dir=SNAPSHOT_DIR, snapshot=FOLDER_INDEX_SNAPSHOT)
@@ -0,0 +1,181 @@
+# yt_short_downloader/format_cache.py
+"""
+Cache on-disk untuk output ``yt-dlp -J`` / extract_info, per (video_id, client, shape).
+
+- Disimpan di SQLite (``data/format_cache.db``), payload JSON di-zlib.
+- ``shape`` membedakan info mentah engine in-process (``extract_info(...,
+  process=False)``, SHAPE_RAW) dari output ``yt-dlp -J`` yang sudah
+  diproses (SHAPE_PROCESSED); keduanya tidak pernah saling menimpa.
+- TTL default 6 jam, tapi tidak pernah melewati ``expire=`` terkecil di
+  URL format (signed URL YouTube) dikurangi margin, supaya info yang
+  dipakai untuk download langsung tidak berisi URL kedaluwarsa.
+- ``get_or_fetch`` = API read-through yang dipakai ytdlp_tools & planner.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+__all__ = ["FormatCache", "get_format_cache", "video_id_from_url", "SHAPE_RAW", "SHAPE_PROCESSED"]
+
+SHAPE_RAW = "raw"          # engine in-process, process=False (belum ada seleksi format)
+SHAPE_PROCESSED = "json"   # subprocess ``yt-dlp -J``
+
+DEFAULT_TTL = 6 * 3600
+URL_EXPIRY_MARGIN = 10 * 60  # jangan pakai URL yang tinggal < 10 menit
+
+_ID_RE = re.compile(r'(?:v=|/shorts/|youtu\.be/|/embed/)([A-Za-z0-9_-]{11})')
+_EXPIRE_RE = re.compile(r'[?&/]expire[=/](\d{9,11})')
+
+
+def video_id_from_url(video_url: str) -> Optional[str]:
+    m = _ID_RE.search(video_url or "")
+    if m:
+        return m.group(1)
+    # sudah berupa id polos
+    if re.fullmatch(r'[A-Za-z0-9_-]{11}', video_url or ""):
+        return video_url
+    return None
+
+
+def _url_expiry(info: Dict[str, Any]) -> Optional[float]:
+    """Expire terkecil dari semua URL format (None kalau tidak ada)."""
+    found = []
+    for f in info.get('formats') or []:
+        for key in ('url', 'manifest_url', 'fragment_base_url'):
+            m = _EXPIRE_RE.search(str(f.get(key) or ""))
+            if m:
+                found.append(int(m.group(1)))
+    return float(min(found)) if found else None
+
+
+class FormatCache:
+    def __init__(self, path: Optional[str] = None, ttl: int = DEFAULT_TTL):
+        base = path or os.path.join(os.getcwd(), "data", "format_cache.db")
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        self.db_path = base
+        self.ttl = ttl
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._init_db()
+        self.evict_expired()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Koneksi per operasi: commit/rollback lalu selalu ditutup."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._connect() as conn:
+            cols = [r[1] for r in conn.execute("PRAGMA table_info(formats)")]
+            if cols and "shape" not in cols:
+                # skema lama (tanpa shape) -> payload campur aduk; cache, buang saja
+                conn.execute("DROP TABLE formats")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS formats (
+                    video_id   TEXT,
+                    client     TEXT,
+                    shape      TEXT,
+                    fetched_at REAL,
+                    expires_at REAL,
+                    payload    BLOB,
+                    PRIMARY KEY (video_id, client, shape)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_formats_exp ON formats(expires_at)")
+
+    def get(self, video_id: str, client: str = "", shape: str = SHAPE_PROCESSED) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, expires_at FROM formats WHERE video_id=? AND client=? AND shape=?",
+                (video_id, client or "", shape)).fetchone()
+        if not row or row[1] <= time.time():
+            return None
+        try:
+            return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+        except Exception:
+            return None
+
+    def put(self, video_id: str, client: str, info: Dict[str, Any], shape: str = SHAPE_PROCESSED) -> None:
+        now = time.time()
+        expires = now + self.ttl
+        url_exp = _url_expiry(info)
+        if url_exp is not None:
+            expires = min(expires, url_exp - URL_EXPIRY_MARGIN)
+        if expires <= now:
+            return
+        blob = zlib.compress(json.dumps(info, ensure_ascii=False).encode("utf-8"))
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT INTO formats(video_id,client,shape,fetched_at,expires_at,payload)
+                VALUES(?,?,?,?,?,?)
+                ON CONFLICT(video_id,client,shape) DO UPDATE SET fetched_at=excluded.fetched_at,
+                    expires_at=excluded.expires_at, payload=excluded.payload
+            """, (video_id, client or "", shape, now, expires, blob))
+        with self._lock:
+            self._puts += 1
+            sweep = self._puts % 200 == 0
+        if sweep:
+            self.evict_expired()
+
+    def invalidate(self, video_id: str, client: Optional[str] = None) -> None:
+        """Hapus entri video (semua shape); client None -> semua client."""
+        with self._connect() as conn:
+            if client is None:
+                conn.execute("DELETE FROM formats WHERE video_id=?", (video_id,))
+            else:
+                conn.execute("DELETE FROM formats WHERE video_id=? AND client=?", (video_id, client))
+
+    def evict_expired(self) -> int:
+        try:
+            with self._connect() as conn:
+                cur = conn.execute("DELETE FROM formats WHERE expires_at <= ?", (time.time(),))
+                return cur.rowcount
+        except Exception:
+            return 0
+
+    def get_or_fetch(
+        self,
+        video_url: str,
+        client: str,
+        fetch: Callable[[], Optional[Dict[str, Any]]],
+        shape: str = SHAPE_PROCESSED,
+    ) -> Optional[Dict[str, Any]]:
+        """Read-through: hit -> dari disk; miss -> fetch() lalu simpan.
+        ``shape`` harus sesuai dengan bentuk hasil ``fetch``."""
+        vid = video_id_from_url(video_url)
+        if vid:
+            hit = self.get(vid, client, shape)
+            if hit is not None:
+                return hit
+        info = fetch()
+        if info and vid:
+            try:
+                self.put(vid, client, info, shape)
+            except Exception:
+                pass
+        return info
+
+
+_FORMAT_CACHE: Optional[FormatCache] = None
+_FORMAT_CACHE_LOCK = threading.Lock()
+
+def get_format_cache() -> FormatCache:
+    """Instance bersama (lazy, supaya path ikut cwd saat pertama dipakai)."""
+    global _FORMAT_CACHE
+    with _FORMAT_CACHE_LOCK:
+        if _FORMAT_CACHE is None:
+            _FORMAT_CACHE = FormatCache()
+        return _FORMAT_CACHE
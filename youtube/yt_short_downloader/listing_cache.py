@@ -0,0 +1,111 @@
+# yt_short_downloader/listing_cache.py
+"""
+Cache listing tab /shorts per channel (data/listing_cache.db).
+
+- Menyimpan entri flat terakhir (urutan tab: terbaru dulu), nama channel,
+  kapan terakhir listing penuh, dan apakah listing itu lengkap (tanpa
+  playlistend).
+- fetch.get_short_links memakai ini untuk mode incremental: halaman tab
+  dibaca sampai ketemu ID yang sudah dikenal, lalu berhenti; entri baru
+  digabung di depan entri cache. Listing penuh tetap dijalankan ulang tiap
+  LISTING_FULL_REFRESH_DAYS supaya video yang dihapus ikut hilang.
+- Payload JSON di-zlib, seperti format_cache.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+__all__ = ["ListingCache", "get_listing_cache", "slim_entry"]
+
+# field entri flat yang dipakai downstream (sisanya, mis. thumbnails, dibuang)
+_KEEP = ("_type", "ie_key", "id", "url", "title", "duration", "upload_date",
+         "timestamp", "view_count", "channel", "channel_id", "uploader")
+
+
+def slim_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: entry[k] for k in _KEEP if entry.get(k) is not None}
+
+
+class ListingCache:
+    def __init__(self, path: Optional[str] = None):
+        base = path or os.path.join(os.getcwd(), "data", "listing_cache.db")
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        self.db_path = base
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS listings (
+                    channel      TEXT PRIMARY KEY,
+                    channel_name TEXT,
+                    complete     INTEGER,
+                    full_at      REAL,
+                    updated_at   REAL,
+                    payload      BLOB
+                )
+            """)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Koneksi per operasi: commit/rollback lalu selalu ditutup."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, channel: str) -> Optional[Dict[str, Any]]:
+        """{"channel_name", "complete", "full_at", "updated_at", "entries"} atau None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT channel_name, complete, full_at, updated_at, payload FROM listings WHERE channel=?",
+                (channel,)).fetchone()
+        if not row:
+            return None
+        try:
+            entries = json.loads(zlib.decompress(row[4]).decode("utf-8"))
+        except Exception:
+            return None
+        return {"channel_name": row[0], "complete": bool(row[1]), "full_at": row[2] or 0.0,
+                "updated_at": row[3] or 0.0, "entries": entries}
+
+    def put(self, channel: str, channel_name: str, entries: List[Dict[str, Any]],
+            complete: bool, full: bool) -> None:
+        """Simpan listing; full=True -> full_at di-reset ke sekarang."""
+        now = time.time()
+        blob = zlib.compress(json.dumps([slim_entry(e) for e in entries if e and e.get("id")],
+                                        ensure_ascii=False).encode("utf-8"))
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT INTO listings(channel,channel_name,complete,full_at,updated_at,payload)
+                VALUES(?,?,?,?,?,?)
+                ON CONFLICT(channel) DO UPDATE SET channel_name=excluded.channel_name,
+                    complete=excluded.complete, updated_at=excluded.updated_at, payload=excluded.payload,
+                    full_at=CASE WHEN ? THEN excluded.full_at ELSE listings.full_at END
+            """, (channel, channel_name, int(complete), now, now, blob, int(full)))
+
+    def invalidate(self, channel: Optional[str] = None) -> None:
+        with self._connect() as conn:
+            if channel is None:
+                conn.execute("DELETE FROM listings")
+            else:
+                conn.execute("DELETE FROM listings WHERE channel=?", (channel,))
+
+
+_LISTING_CACHE: Optional[ListingCache] = None
+_LISTING_CACHE_LOCK = threading.Lock()
+
+
+def get_listing_cache() -> ListingCache:
+    """Instance bersama (lazy, supaya path ikut cwd saat pertama dipakai)."""
+    global _LISTING_CACHE
+    with _LISTING_CACHE_LOCK:
+        if _LISTING_CACHE is None:
+            _LISTING_CACHE = ListingCache()
+        return _LISTING_CACHE
@@ -0,0 +1,238 @@
+# yt_short_downloader/logsink.py
+"""
+Sink log asinkron untuk downloader (pengganti _LOG_LOCK + open/close per pesan).
+
+- Worker hanya emit() -> queue; satu writer thread menulis per batch ke
+  download_errors.log global + per-folder, dengan file handle yang tetap
+  terbuka (LRU, maks MAX_HANDLES), lalu print ke console.
+- Level diturunkan dari tag pesan ("[FATAL] ..." -> ERROR, "[REJECT] ..."
+  -> WARNING, lainnya INFO) kecuali diberikan eksplisit; pesan di bawah
+  config.LOG_LEVEL dibuang sebelum masuk queue.
+- config.LOG_JSON=True -> file log berisi JSON lines
+  {"ts","level","tag","msg","output_path"}; console tetap teks biasa.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import IO, List, Optional, Tuple
+
+from .config import LOG_JSON, LOG_LEVEL
+
+__all__ = ["LogSink", "get_log_sink", "level_of"]
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+MAX_HANDLES = 64
+
+_TAG_RE = re.compile(r"^\s*\[([A-Za-z][A-Za-z0-9 _:-]*)\]")
+_ERROR_WORDS = ("FATAL", "FAIL", "ERROR", "THREAD", "CALLBACK", "EXCEPTION")
+_WARN_WORDS = ("WARN", "REJECT", "TIMEOUT", "CB", "CLEANUP", "ENGINE", "RUN")
+
+_STOP = object()   # sentinel: writer thread selesai setelah batch terakhir
+
+
+def level_of(msg: str) -> Tuple[str, Optional[str]]:
+    """(level, tag) dari prefix "[TAG]" pesan."""
+    m = _TAG_RE.match(msg or "")
+    if not m:
+        return "INFO", None
+    tag = m.group(1)
+    up = tag.upper()
+    words = re.split(r"[\s_:-]+", up)
+    if any(w in _ERROR_WORDS for w in words):
+        return "ERROR", tag
+    if any(w in _WARN_WORDS for w in words):
+        return "WARNING", tag
+    if "DEBUG" in words:
+        return "DEBUG", tag
+    return "INFO", tag
+
+
+class LogSink:
+    def __init__(
+        self,
+        global_path: str = "download_errors.log",
+        level: str = "INFO",
+        json_lines: bool = False,
+        console: bool = True,
+        flush_interval: float = 0.5,
+        batch_size: int = 500,
+    ):
+        self.global_path = os.path.abspath(global_path) if global_path else None
+        self.min_level = LEVELS.get(str(level).upper(), 20)
+        self.json_lines = json_lines
+        self.console = console
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._q: "queue.Queue" = queue.Queue()
+        self._handles: "OrderedDict[str, IO[str]]" = OrderedDict()
+        self._writer: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._lock = threading.Lock()   # jaga _closed + jalur tulis sinkron setelah close
+        self._closed = False
+
+    # ---------- producer ----------
+    def emit(self, msg: str, output_path: Optional[str] = None, level: Optional[str] = None) -> None:
+        text = (msg or "").rstrip()
+        lvl, tag = level_of(text)
+        lvl = (level or lvl).upper()
+        if LEVELS.get(lvl, 20) < self.min_level:
+            return
+        rec = (time.time(), lvl, tag, text, output_path)
+        with self._lock:
+            if not self._closed:
+                self._ensure_writer()
+                self._q.put(rec)
+                return
+            # setelah close (atexit): writer sudah berhenti, tulis langsung
+            # lalu tutup lagi handle-nya
+            self._write_batch([rec])
+            self._close_handles()
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._start_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run, name="log-sink", daemon=True)
+                self._writer.start()
+
+    # ---------- writer thread ----------
+    def _handle(self, path: str) -> Optional[IO[str]]:
+        fh = self._handles.get(path)
+        if fh is not None:
+            self._handles.move_to_end(path)
+            return fh
+        try:
+            d = os.path.dirname(path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            fh = open(path, "a", encoding="utf-8", errors="replace")
+        except Exception:
+            return None
+        self._handles[path] = fh
+        while len(self._handles) > MAX_HANDLES:
+            _, old = self._handles.popitem(last=False)
+            try: old.close()
+            except Exception: pass
+        return fh
+
+    def _format(self, rec) -> str:
+        ts, lvl, tag, text, output_path = rec
+        if self.json_lines:
+            return json.dumps({
+                "ts": datetime.fromtimestamp(ts).isoformat(timespec="milliseconds"),
+                "level": lvl, "tag": tag, "msg": text, "output_path": output_path,
+            }, ensure_ascii=False) + "\n"
+        return text + "\n"
+
+    def _write_batch(self, batch: List[tuple]) -> None:
+        touched = set()
+        for rec in batch:
+            line = self._format(rec)
+            targets = [self.global_path] if self.global_path else []
+            if rec[4]:
+                targets.append(os.path.abspath(os.path.join(rec[4], "download_errors.log")))
+            for path in targets:
+                fh = self._handle(path)
+                if fh is None:
+                    continue
+                try:
+                    fh.write(line)
+                    touched.add(path)
+                except Exception:
+                    pass
+        for path in touched:
+            try: self._handles[path].flush()
+            except Exception: pass
+        if self.console:
+            for rec in batch:
+                try:
+                    print(rec[3])
+                except Exception:
+                    pass
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            item = self._q.get()
+            batch, waiters = [], []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stop = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._q.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                self._write_batch(batch)
+            for ev in waiters:
+                ev.set()
+
+    # ---------- lifecycle ----------
+    def flush(self, timeout: float = 10.0) -> None:
+        """Tunggu semua pesan yang sudah di-emit tertulis."""
+        if self._writer is None or not self._writer.is_alive():
+            return
+        ev = threading.Event()
+        self._q.put(ev)
+        ev.wait(timeout)
+
+    def _close_handles(self) -> None:
+        for fh in list(self._handles.values()):
+            try: fh.close()
+            except Exception: pass
+        self._handles.clear()
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Hentikan writer thread (setelah antrean habis) lalu tutup semua handle."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            writer = self._writer
+        if writer is not None and writer.is_alive():
+            self._q.put(_STOP)
+            writer.join(timeout)
+            if writer.is_alive():
+                # writer macet (mis. disk penuh): jangan tutup handle yang masih dipakai
+                return
+        with self._lock:
+            while True:
+                try:
+                    item = self._q.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is not _STOP:
+                    self._write_batch([item])
+            self._close_handles()
+
+
+_SINK: Optional[LogSink] = None
+_SINK_LOCK = threading.Lock()
+
+
+def get_log_sink() -> LogSink:
+    global _SINK
+    with _SINK_LOCK:
+        if _SINK is None:
+            _SINK = LogSink(level=LOG_LEVEL, json_lines=LOG_JSON)
+            atexit.register(_SINK.close)
+        return _SINK
@@ -2,10 +2,17 @@
 from __future__ import annotations
 
 import os
+import re
+import shutil
 import importlib
-from typing import List, Dict
+from typing import List, Dict, Optional
 from .db import TinyStore
+from .folder_index import get_folder_index
+from .logsink import get_log_sink
+from .postprocess import get_postprocess_stage
 from .utils import get_existing_index
+from .video_files import record_replaced
+from .ytdlp_tools import probe_resolution_bitrate
 
 __all__ = ["download_videos_with_db"]
 
@@ -67,6 +74,174 @@ def _safe_reserve_indices(
     return [start + i for i in range(n_items)]
 
 
+# ---------- resume (state machine per video di store) ----------
+_PARTIAL_RE = re.compile(r"(\.part|\.ytdl|\.temp\.\w+|\.f\d+\.\w+)$", re.IGNORECASE)
+
+
+def _stateful(store) -> bool:
+    return all(hasattr(store, n) for n in (
+        "set_video_state", "get_video_states", "reserve_for_videos",
+        "active_indices", "release_unused_indices"))
+
+
+def _discard_partials(output_path: str, index: int, leftover: Optional[str]) -> int:
+    """
+    Sisa run yang mati di fase fetching: .tmp/<index>, file .part/.ytdl/
+    hasil merge setengah jadi ber-prefix index ini, dan caption lama (supaya
+    download ulang menulis nama yang sama, bukan "_1"). Video final yang
+    sudah utuh dibiarkan: yt-dlp melewatinya sebagai "already downloaded".
+    """
+    n = 0
+    tmp_dir = os.path.join(output_path, ".tmp", f"{index:06d}")
+    if os.path.isdir(tmp_dir):
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        n += 1
+    fidx = get_folder_index(output_path)
+    victims = [os.path.join(output_path, f) for f in fidx.with_prefix(f"{index:02d} - ") if _PARTIAL_RE.search(f)]
+    if leftover and leftover.lower().endswith(".txt"):
+        victims.append(leftover)
+    for path in victims:
+        try:
+            os.remove(path)
+            n += 1
+        except OSError:
+            pass
+        fidx.discard(path)
+    return n
+
+
+def _sweep_tmp(output_path: str, keep) -> int:
+    """Hapus .tmp/<index> yang bukan milik video yang masih jalan/antre."""
+    tmp_root = os.path.join(output_path, ".tmp")
+    n = 0
+    try:
+        names = os.listdir(tmp_root)
+    except OSError:
+        return 0
+    for name in names:
+        if name.isdigit() and int(name) not in keep:
+            shutil.rmtree(os.path.join(tmp_root, name), ignore_errors=True)
+            n += 1
+    return n
+
+
+def _stage():
+    return get_postprocess_stage(log=lambda msg, out=None: get_log_sink().emit(msg, out))
+
+
+def _resolve_file(path: Optional[str]) -> Optional[str]:
+    """
+    Path file video yang masih ada untuk state downloaded/postprocessed:
+    file_path sendiri, atau hasil job post-process (convert/upscale sudah
+    mengganti file aslinya). None kalau dua-duanya tidak ada.
+    """
+    if not path:
+        return None
+    if os.path.exists(path):
+        return path
+    job = _stage().job(path)
+    if job and job["status"] == "done" and job["result"] and os.path.exists(job["result"]):
+        return job["result"]
+    return None
+
+
+def _note_replaced(old: Optional[str], new: Optional[str]) -> None:
+    try:
+        record_replaced(old, new)
+    except Exception as e:
+        get_log_sink().emit(f"[INDEX] {e}")
+
+
+def _finish_downloaded(store, channel_key: str, entry: Dict, st: Dict, output_path: str) -> None:
+    """Fase downloaded: file sudah di disk -> langsung post-process (tanpa download ulang)."""
+    vid, path = entry.get("id"), st["file_path"]
+
+    def _done(final: str) -> None:
+        _note_replaced(path, final)
+        store.set_video_state(channel_key, vid, "postprocessed", final)
+        store.set_video_state(channel_key, vid, "done", final)
+
+    stage = _stage()
+    # job yang sudah tercatat dilanjutkan apa adanya (w/h & status failed tidak ditimpa)
+    if stage.attach(path, _done):
+        return
+    whb = probe_resolution_bitrate(path)
+    w, h = (whb[0], whb[1]) if whb else (0, 0)
+    stage.submit(path, output_path, w, h, on_done=_done)
+
+
+def _download_resumable(
+    download_videos, video_entries: List[Dict], output_path: str, channel_name: str,
+    quality: str, file_format: str, channel_key: str, store,
+) -> None:
+    states = store.get_video_states(channel_key, [e.get("id") for e in video_entries])
+    out_abs = os.path.abspath(output_path)
+
+    todo: List[Dict] = []
+    indices: List[int] = []
+    fresh: List[Dict] = []
+    counts = {"post": 0, "done": 0, "refetch": 0, "cleaned": 0}
+    for e in video_entries:
+        st = states.get(e.get("id"))
+        fpath = st and st.get("file_path")
+        current = _resolve_file(fpath) if st and st["state"] in ("downloaded", "postprocessed") else None
+        if current:
+            if st["state"] == "postprocessed" or current != fpath:
+                # post-process sudah selesai (file asli diganti hasil convert/upscale)
+                _note_replaced(fpath, current)
+                store.set_video_state(channel_key, e["id"], "done", current)
+                counts["done"] += 1
+            else:
+                _finish_downloaded(store, channel_key, e, st, output_path)
+                counts["post"] += 1
+        elif st and st["state"] in ("queued", "fetching") and st.get("index") and st.get("output_path") == out_abs:
+            # index lama dipakai lagi, sisa download setengah jalan dibuang dulu
+            if st["state"] == "fetching":
+                counts["cleaned"] += _discard_partials(output_path, st["index"], fpath)
+                counts["refetch"] += 1
+            todo.append(e)
+            indices.append(st["index"])
+        else:
+            fresh.append(e)
+
+    # .tmp/<index> yatim + index yang di-reserve run lalu tapi tidak terpakai
+    counts["cleaned"] += _sweep_tmp(output_path, set(store.active_indices(output_path, ("fetching",))) - set(indices))
+    released = store.release_unused_indices(output_path, get_existing_index(output_path))
+
+    if fresh:
+        assigned = store.reserve_for_videos(channel_key, output_path, [e.get("id") for e in fresh],
+                                            get_existing_index(output_path))
+        for e in fresh:
+            idx = assigned.get(e.get("id"))
+            if idx is not None:
+                todo.append(e)
+                indices.append(idx)
+
+    if any(counts.values()) or released:
+        print(f"[RESUME] {channel_name}: {counts['done'] + counts['post']} selesai dari fase terakhir "
+              f"({counts['post']} lanjut post-process), {counts['refetch']} download diulang, "
+              f"{counts['cleaned']} sisa tmp/partial dibersihkan, {released} index dilepas")
+    if not todo:
+        return
+
+    def _on_phase(entry: Dict, _idx: int, phase: str, path: Optional[str]) -> None:
+        vid = entry.get("id")
+        store.set_video_state(channel_key, vid, phase, path)
+        if phase == "postprocessed":
+            store.set_video_state(channel_key, vid, "done", path)
+
+    download_videos(
+        video_entries=todo,
+        output_path=output_path,
+        channel_name=channel_name,
+        quality=quality,
+        file_format=file_format,
+        preassigned_indices=indices,
+        channel_key=channel_key,
+        on_phase=_on_phase,
+    )
+
+
 def download_videos_with_db(
     video_entries: List[Dict],
     output_path: str,
@@ -76,13 +251,23 @@ def download_videos_with_db(
     channel_key: str,
     store: TinyStore,
 ) -> None:
+    """
+    Download + tandai di store. Store dengan state machine per video
+    (queued -> fetching -> downloaded -> postprocessed -> done) melanjutkan
+    run yang terputus dari fase terakhir; store lama -> alur reserve biasa.
+    """
     os.makedirs(output_path, exist_ok=True)
 
+    download_videos = _load_download_videos()
+
+    if _stateful(store):
+        _download_resumable(download_videos, video_entries, output_path, channel_name,
+                            quality, file_format, channel_key, store)
+        return
+
     probe = get_existing_index(output_path)  # sekadar hint jika store butuh
     indices = _safe_reserve_indices(store, output_path, len(video_entries), probe)
 
-    download_videos = _load_download_videos()
-
     def _mark_ok(entry: Dict, _idx: int) -> None:
         vid = entry.get("id")
         if vid:
@@ -100,4 +285,5 @@ def download_videos_with_db(
         file_format=file_format,
         preassigned_indices=indices,
         on_success=_mark_ok,
+        channel_key=channel_key,
     )
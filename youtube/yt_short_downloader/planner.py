@@ -0,0 +1,220 @@
+# yt_short_downloader/planner.py
+"""
+Single-probe strategy planner.
+
+Alih-alih mencoba 8 strategi download berturut-turut, planner:
+  1. Resolve daftar format per player_client (metadata-only, tanpa download).
+     Client dengan win-rate tertinggi untuk channel ini dicoba duluan;
+     kalau sudah dapat ≥ 1080p langsung dipakai. Kalau belum, client
+     sisanya di-probe paralel.
+  2. Skor format pakai ``ytdlp_tools.score_formats`` (sama dengan
+     detect_best_hd_selector).
+  3. Hasilkan SATU rencana: client pemenang + pasangan format_id exact.
+
+Info per client lewat ``format_cache`` (read-through), jadi re-run /
+retry untuk video yang sama tidak perlu extract ulang selama URL-nya
+belum kedaluwarsa.
+
+Win-rate per channel disimpan di ``data/client_stats.json``.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .format_cache import SHAPE_RAW
+from .ytdlp_engine import EngineDownloadError, get_engine
+from .ytdlp_tools import get_video_info, score_formats
+
+__all__ = ["PLAN_CLIENTS", "ClientStats", "CLIENT_STATS", "client_args", "plan_download", "record_outcome"]
+
+# Urutan default (dipakai kalau channel belum punya statistik)
+PLAN_CLIENTS: Tuple[str, ...] = ("android", "web", "tv", "ios", "android_creator")
+
+STATS_PATH = os.path.join(os.getcwd(), "data", "client_stats.json")
+STATS_SAVE_INTERVAL = 30.0   # detik; record() hanya menandai dirty, file ditulis paling sering segini
+
+
+class ClientStats:
+    """Statistik {channel_key: {client: [wins, tries]}} yang persisten."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or STATS_PATH
+        self._lock = threading.Lock()
+        self._data: Optional[Dict[str, Dict[str, List[int]]]] = None
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def _load(self) -> Dict[str, Dict[str, List[int]]]:
+        if self._data is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except Exception:
+                self._data = {}
+        return self._data
+
+    def _save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, indent=2)
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except Exception:
+            pass
+        self._saved_at = time.monotonic()
+
+    def ranked(self, channel_key: Optional[str], clients: Tuple[str, ...] = PLAN_CLIENTS) -> List[str]:
+        """Client diurutkan berdasar win-rate (Laplace smoothing), stabil terhadap urutan default."""
+        with self._lock:
+            per = dict(self._load().get(channel_key or "", {}))
+
+        def rate(c: str) -> float:
+            wins, tries = per.get(c, [0, 0])
+            return (wins + 1) / (tries + 2)
+
+        return sorted(clients, key=rate, reverse=True)
+
+    def record(self, channel_key: Optional[str], client: str, won: bool) -> None:
+        with self._lock:
+            data = self._load()
+            per = data.setdefault(channel_key or "", {})
+            wins, tries = per.get(client, [0, 0])
+            per[client] = [wins + (1 if won else 0), tries + 1]
+            self._dirty = True
+            if time.monotonic() - self._saved_at >= STATS_SAVE_INTERVAL:
+                self._save()
+
+    def flush(self) -> None:
+        """Tulis statistik yang belum tersimpan (dipanggil juga saat exit)."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+
+CLIENT_STATS = ClientStats()
+atexit.register(CLIENT_STATS.flush)
+
+# Pool probe persisten: thread-nya hidup terus sehingga instance YoutubeDL
+# (thread-local di engine) tetap hangat antar video.
+_PROBE_POOL: Optional[ThreadPoolExecutor] = None
+_PROBE_POOL_LOCK = threading.Lock()
+
+def _probe_pool(max_parallel: int) -> ThreadPoolExecutor:
+    global _PROBE_POOL
+    with _PROBE_POOL_LOCK:
+        if _PROBE_POOL is None:
+            _PROBE_POOL = ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="plan-probe")
+        return _PROBE_POOL
+
+
+def client_args(client: str) -> str:
+    return f"youtube:player_client={client}"
+
+
+class _ProbeFailed(Exception):
+    """Info client tidak bisa diambil (error/transient) — beda dengan 'tidak ada HD'."""
+
+
+def _probe(video_url: str, client: str, engine: str, min_height: int) -> Optional[Tuple[float, str, int, Dict]]:
+    """
+    Info satu client (read-through format_cache) -> (score, selector, height, info)
+    atau None kalau tidak ada format ≥ min_height. Raise _ProbeFailed kalau
+    info-nya sendiri gagal diambil.
+    """
+    info = None
+    engine_ok = engine == "inproc" and get_engine().available
+    if engine_ok:
+        try:
+            info = get_video_info(video_url, client_args(client),
+                                  fetch=lambda: get_engine().extract_info(client, video_url),
+                                  shape=SHAPE_RAW)
+        except EngineDownloadError:
+            raise _ProbeFailed(client)
+        except Exception:
+            # crash engine -> coba jalur subprocess (cache shape terpisah)
+            engine_ok = False
+    if not engine_ok:
+        info = get_video_info(video_url, client_args(client))
+    if info is None:
+        raise _ProbeFailed(client)
+    if not info.get('formats'):
+        return None
+    scored = score_formats(info['formats'], min_height)
+    if not scored:
+        return None
+    return scored + (info,)
+
+
+def plan_download(
+    video_url: str,
+    channel_key: Optional[str] = None,
+    target_height: int = 1080,
+    floor_height: int = 720,
+    engine: str = "inproc",
+    max_parallel: int = 3,
+    stats: Optional[ClientStats] = None,
+) -> Dict:
+    """
+    Return {"client", "selector", "height", "info", "dead"}.
+    "client" None kalau tidak ada client yang punya format ≥ floor_height.
+    "info" = info ter-cache milik client pemenang (boleh dipakai langsung
+    untuk download tanpa extract ulang).
+    "dead" = client yang berhasil di-probe dan tidak punya format HD, jadi
+    strategi fallback dengan client itu tidak perlu dicoba lagi. Client yang
+    probe-nya error (mis. EngineDownloadError transient) tidak termasuk.
+    """
+    stats = stats or CLIENT_STATS
+    order = stats.ranked(channel_key)
+    failed = set()
+
+    # 1) Client favorit dulu — cukup kalau sudah ≥ target_height
+    first = order[0]
+    results: Dict[str, Optional[Tuple[float, str, int, Dict]]] = {}
+    try:
+        results[first] = _probe(video_url, first, engine, floor_height)
+    except Exception:
+        results[first] = None
+        failed.add(first)
+    best = results[first]
+    if not (best and best[2] >= target_height):
+        # 2) Sisanya paralel, ambil skor tertinggi
+        rest = order[1:]
+        pool = _probe_pool(max_parallel)
+        futs = {c: pool.submit(_probe, video_url, c, engine, floor_height) for c in rest}
+        for c, fut in futs.items():
+            try:
+                results[c] = fut.result()
+            except Exception:
+                results[c] = None
+                failed.add(c)
+
+    winner: Optional[str] = None
+    for c in order:
+        r = results.get(c)
+        if r and (winner is None or r[0] > results[winner][0]):
+            winner = c
+
+    # Client yang di-probe tapi kalah/kosong dicatat sebagai percobaan gagal
+    for c in results:
+        if c != winner:
+            stats.record(channel_key, c, won=False)
+
+    dead = [c for c, r in results.items() if not r and c not in failed]
+    if winner is None:
+        return {"client": None, "selector": None, "height": 0, "info": None, "dead": dead}
+    _, selector, height, info = results[winner]
+    return {"client": winner, "selector": selector, "height": height, "info": info, "dead": dead}
+
+
+def record_outcome(channel_key: Optional[str], plan: Dict, ok: bool, stats: Optional[ClientStats] = None) -> None:
+    """Catat hasil download rencana (menang hanya kalau file valid)."""
+    if plan.get("client"):
+        (stats or CLIENT_STATS).record(channel_key, plan["client"], won=ok)
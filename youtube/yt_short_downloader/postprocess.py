@@ -0,0 +1,272 @@
+# yt_short_downloader/postprocess.py
+"""
+Tahap post-processing terpisah (upscale 720p -> 1080p + konversi
+cek_resolusi) di process pool sendiri, supaya encode CPU-bound tidak
+menahan slot network di downloader.
+
+- download_video cukup probe + reject (< 720p) lalu submit(); thread
+  download langsung kembali mengambil video berikutnya.
+- Antrian persisten (SQLite data/postprocess_queue.db): job yang belum
+  selesai saat proses mati di-submit ulang otomatis saat stage dibuat lagi.
+- submit(..., on_done=cb): cb(path_final) dipanggil setelah job selesai
+  (juga kalau gagal -> path asal), dipakai orchestrator untuk menandai
+  fase "postprocessed" di store.
+- Pool berukuran cpu_count // 2 (min 1): ffmpeg/libx264 sendiri sudah
+  multi-thread, jadi 1 job per 2 core sudah memenuhi CPU.
+"""
+from __future__ import annotations
+
+import atexit
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .config import POSTPROCESS_WORKERS
+
+__all__ = ["PostProcessStage", "get_postprocess_stage", "drain_postprocess", "postprocess_file"]
+
+QUEUE_PATH = os.path.join(os.getcwd(), "data", "postprocess_queue.db")
+
+
+def postprocess_file(path: str, w: int = 0, h: int = 0) -> Tuple[str, List[str]]:
+    """
+    Jalan di worker process. Upscale kalau sisi pendek 720..999, lalu
+    konversi ke format Meta-compliant via cek_resolusi.
+    Return (path final, baris log).
+    """
+    from .ytdlp_tools import probe_resolution_bitrate, upscale_video_if_needed
+
+    logs: List[str] = []
+    final = path
+    if not os.path.exists(final):
+        return final, [f"[POST] file hilang: {final}"]
+    if not (w and h):
+        whb = probe_resolution_bitrate(final)
+        if not whb:
+            return final, logs
+        w, h, _ = whb
+
+    if 720 <= min(w, h) < 1000:
+        logs.append(f"[INFO] Got {w}x{h} (720p). Upscaling to 1080p...")
+        try:
+            up_path = upscale_video_if_needed(final, 1080)
+            if up_path and os.path.exists(up_path):
+                if up_path != final:
+                    try: os.remove(final)
+                    except OSError: pass
+                final = up_path
+        except Exception as e:
+            logs.append(f"[UPSCALE FAIL] {e}. Keeping 720p original.")
+
+    try:
+        parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        if parent_dir not in sys.path:
+            sys.path.append(parent_dir)
+        import cek_resolusi
+
+        new_path, converted = cek_resolusi.check_and_convert_video(final, target_mode='reels', force=False)
+        if converted and os.path.exists(new_path):
+            final = new_path
+    except ImportError:
+        pass  # cek_resolusi might not be available
+    except Exception as e:
+        logs.append(f"[RATIO CHECK FAIL] {e}")
+    return final, logs
+
+
+class PostProcessStage:
+    """Process pool + antrian persisten untuk post-processing file hasil download."""
+
+    def __init__(self, workers: Optional[int] = None, path: Optional[str] = None,
+                 log: Optional[Callable[[str, Optional[str]], None]] = None):
+        self.workers = workers or max(1, (os.cpu_count() or 2) // 2)
+        self.path = path or QUEUE_PATH
+        self.log = log or (lambda msg, _out=None: print(msg))
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+        self._callbacks: Dict[str, List[Callable[[str], None]]] = {}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._db() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    path TEXT PRIMARY KEY,
+                    output_path TEXT,
+                    w INTEGER,
+                    h INTEGER,
+                    status TEXT,
+                    result TEXT,
+                    updated_at TEXT
+                )
+            """)
+        self.resume()
+
+    @contextmanager
+    def _db(self) -> Iterator[sqlite3.Connection]:
+        """Koneksi per operasi: commit/rollback lalu selalu ditutup."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _set(self, path: str, status: str, result: Optional[str] = None) -> None:
+        now = datetime.utcnow().isoformat() + "Z"
+        with self._db() as conn:
+            conn.execute("UPDATE jobs SET status=?, result=?, updated_at=? WHERE path=?",
+                         (status, result, now, path))
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def _dispatch(self, path: str, output_path: Optional[str], w: int, h: int) -> None:
+        # dipanggil dengan self._lock dipegang
+        if path in self._futures and not self._futures[path].done():
+            return
+        fut = self._ensure_pool().submit(postprocess_file, path, w, h)
+        self._futures[path] = fut
+        fut.add_done_callback(lambda f, p=path, o=output_path: self._on_done(p, o, f))
+
+    def _on_done(self, path: str, output_path: Optional[str], fut: Future) -> None:
+        try:
+            final, logs = fut.result()
+        except Exception as e:
+            self.log(f"[POST FAIL] {os.path.basename(path)}: {e}", output_path)
+            self._set(path, "failed", str(e))
+            final = path
+        else:
+            for line in logs:
+                self.log(line, output_path)
+            self._set(path, "done" if os.path.exists(final) else "failed", final)
+        with self._lock:
+            callbacks = self._callbacks.pop(path, [])
+        for cb in callbacks:
+            try:
+                cb(final)
+            except Exception as e:
+                self.log(f"[POST CB] {os.path.basename(path)}: {e}", output_path)
+
+    def submit(self, path: str, output_path: Optional[str] = None, w: int = 0, h: int = 0,
+               on_done: Optional[Callable[[str], None]] = None) -> None:
+        """
+        Catat job ke antrian persisten lalu jalankan di pool (non-blocking).
+        Kalau job path yang sama sedang jalan (mis. hasil resume()), on_done
+        ikut dipanggil saat job itu selesai.
+        """
+        now = datetime.utcnow().isoformat() + "Z"
+        with self._db() as conn:
+            conn.execute("""
+                INSERT INTO jobs(path,output_path,w,h,status,result,updated_at)
+                VALUES(?,?,?,?,'pending',NULL,?)
+                ON CONFLICT(path) DO UPDATE SET output_path=excluded.output_path, w=excluded.w,
+                    h=excluded.h, status='pending', result=NULL, updated_at=excluded.updated_at
+            """, (path, output_path, int(w), int(h), now))
+        with self._lock:
+            if on_done is not None:
+                self._callbacks.setdefault(path, []).append(on_done)
+            self._dispatch(path, output_path, w, h)
+
+    def attach(self, path: str, on_done: Callable[[str], None]) -> bool:
+        """
+        Sambungkan on_done ke job yang sudah tercatat, tanpa menimpa w/h atau
+        status-nya: pending -> dijalankan (kalau belum) dan on_done dipanggil
+        saat selesai; done -> on_done(hasil); failed -> on_done(path asli),
+        sama seperti _on_done. Return False kalau belum ada job untuk path ini.
+        """
+        with self._db() as conn:
+            row = conn.execute("SELECT status, result, output_path, w, h FROM jobs WHERE path=?",
+                               (path,)).fetchone()
+        if row is None:
+            return False
+        status, result, output_path, w, h = row
+        if status == "pending":
+            with self._lock:
+                self._callbacks.setdefault(path, []).append(on_done)
+                self._dispatch(path, output_path, w or 0, h or 0)
+            return True
+        final = result if status == "done" and result and os.path.exists(result) else path
+        try:
+            on_done(final)
+        except Exception as e:
+            self.log(f"[POST CB] {os.path.basename(path)}: {e}", output_path)
+        return True
+
+    def job(self, path: str) -> Optional[Dict[str, Optional[str]]]:
+        """{"status": pending/done/failed, "result": path final / error} atau None."""
+        with self._db() as conn:
+            row = conn.execute("SELECT status, result FROM jobs WHERE path=?", (path,)).fetchone()
+        return {"status": row[0], "result": row[1]} if row else None
+
+    def resume(self) -> int:
+        """Submit ulang job 'pending' dari run sebelumnya yang terputus."""
+        with self._db() as conn:
+            rows = conn.execute("SELECT path, output_path, w, h FROM jobs WHERE status='pending'").fetchall()
+        n = 0
+        with self._lock:
+            for path, output_path, w, h in rows:
+                if not os.path.exists(path):
+                    self._set(path, "failed", "missing")
+                    continue
+                self._dispatch(path, output_path, w or 0, h or 0)
+                n += 1
+        if n:
+            self.log(f"[POST] melanjutkan {n} job post-process yang tertunda", None)
+        return n
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(1 for f in self._futures.values() if not f.done())
+
+    def drain(self) -> None:
+        """Tunggu semua job yang sedang antre/jalan selesai."""
+        n = self.pending()
+        if n:
+            self.log(f"[POST] menunggu {n} job post-process...", None)
+        while True:
+            with self._lock:
+                futs = [f for f in self._futures.values() if not f.done()]
+            if not futs:
+                break
+            for f in futs:
+                try:
+                    f.result()
+                except Exception:
+                    pass
+        with self._lock:
+            self._futures = {p: f for p, f in self._futures.items() if not f.done()}
+
+    def close(self) -> None:
+        self.drain()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+_STAGE: Optional[PostProcessStage] = None
+_STAGE_LOCK = threading.Lock()
+
+
+def get_postprocess_stage(log: Optional[Callable[[str, Optional[str]], None]] = None) -> PostProcessStage:
+    global _STAGE
+    with _STAGE_LOCK:
+        if _STAGE is None:
+            _STAGE = PostProcessStage(workers=POSTPROCESS_WORKERS, log=log)
+            atexit.register(_STAGE.close)
+        return _STAGE
+
+
+def drain_postprocess() -> None:
+    """Tunggu job post-process yang masih jalan (no-op kalau stage belum dibuat)."""
+    with _STAGE_LOCK:
+        stage = _STAGE
+    if stage is not None:
+        stage.drain()
@@ -0,0 +1,20 @@
+# yt_short_downloader/probe.py
+"""
+Re-export media_common.probe (satu modul untuk youtube/ dan tiktok/) dengan
+cache di data/probe_cache.db. Dipakai ytdlp_tools.probe_resolution*,
+cek_resolusi, dan postprocess.
+"""
+import os
+import sys
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
+
+from media_common.probe import (  # noqa: E402
+    ProbeCache, get_probe_cache, parse_ffprobe, probe_media, set_cache_path,
+)
+
+__all__ = ["probe_media", "parse_ffprobe", "ProbeCache", "get_probe_cache"]
+
+set_cache_path(os.path.join(os.getcwd(), "data", "probe_cache.db"))
@@ -0,0 +1,193 @@
+# yt_short_downloader/scheduler.py
+"""
+Scheduler download dengan concurrency adaptif (AIMD).
+
+- Job diambil dari satu antrian prioritas bersama: worker yang selesai
+  langsung mengambil job berikutnya (tidak ada job yang "terkunci" di
+  belakang video lambat).
+- Jumlah slot aktif = int(limit). limit naik +1/limit per sukses (≈ +1 per
+  satu "window" penuh) dan dipotong multiplikatif saat ada sinyal
+  kongesti: 403 baru di _SessionState atau success rate jeblok.
+- Throughput (byte/detik agregat) dicatat per level concurrency; kalau
+  menambah slot tidak menaikkan throughput, level itu jadi plafon
+  sementara.
+- Hasil di-yield sesuai urutan SELESAI.
+"""
+from __future__ import annotations
+
+import heapq
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+__all__ = ["AIMDLimit", "AdaptiveScheduler"]
+
+
+class AIMDLimit:
+    """Batas concurrency AIMD: additive increase, multiplicative decrease."""
+
+    def __init__(
+        self,
+        initial: int = 3,
+        min_limit: int = 1,
+        max_limit: int = 6,
+        decrease: float = 0.5,
+        cooldown: float = 15.0,       # jeda minimal antar pemotongan
+        ceiling_ttl: float = 120.0,   # plafon throughput kadaluarsa -> probing lagi
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.ceiling_ttl = ceiling_ttl
+        self._last_cut = 0.0
+        self._ceiling: Optional[int] = None
+        self._ceiling_ts = 0.0
+        self._tput: Dict[int, float] = {}  # level -> EMA byte/detik
+
+    @property
+    def slots(self) -> int:
+        return int(self.limit)
+
+    def _cap(self) -> float:
+        if self._ceiling is not None and time.monotonic() - self._ceiling_ts > self.ceiling_ttl:
+            self._ceiling = None
+        return float(self._ceiling if self._ceiling is not None else self.max_limit)
+
+    def on_success(self) -> None:
+        self.limit = min(self._cap(), self.limit + 1.0 / self.limit)
+
+    def on_congestion(self) -> bool:
+        """Potong limit (maks sekali per cooldown). Return True kalau dipotong."""
+        now = time.monotonic()
+        if now - self._last_cut < self.cooldown:
+            return False
+        self._last_cut = now
+        self.limit = max(float(self.min_limit), self.limit * self.decrease)
+        self._tput.clear()
+        return True
+
+    def on_throughput(self, level: int, rate: float) -> None:
+        old = self._tput.get(level)
+        self._tput[level] = rate if old is None else 0.7 * old + 0.3 * rate
+        below = self._tput.get(level - 1)
+        if below and self._tput[level] < below * 1.05:
+            # slot ke-`level` tidak menambah throughput
+            self._ceiling = max(self.min_limit, level - 1)
+            self._ceiling_ts = time.monotonic()
+            self.limit = min(self.limit, float(self._ceiling))
+
+
+class AdaptiveScheduler:
+    """
+    Jalankan fn(payload) untuk tiap job dengan jumlah slot mengikuti
+    AIMDLimit. `signals()` mengembalikan counter kumulatif
+    {"n_403": int, "bytes": int} (lihat downloader._SessionState.snapshot).
+
+        sched = AdaptiveScheduler(AIMDLimit(initial=3), _SESSION.snapshot)
+        for payload, ok, err in sched.run([(prio, payload), ...], fn):
+            ...
+    Prioritas kecil dijalankan lebih dulu.
+    """
+
+    def __init__(
+        self,
+        limit: AIMDLimit,
+        signals: Optional[Callable[[], Dict[str, int]]] = None,
+        window: int = 10,            # jumlah hasil terakhir untuk success rate
+        min_success_rate: float = 0.5,
+        tput_window: float = 60.0,   # detik, untuk throughput agregat
+        on_change: Optional[Callable[[int], None]] = None,
+    ):
+        self.limit = limit
+        self.signals = signals
+        self.min_success_rate = min_success_rate
+        self.tput_window = tput_window
+        self.on_change = on_change
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[Any, int, Any]] = []
+        self._active = 0
+        self._stop = False
+        self._recent: deque = deque(maxlen=max(1, window))
+        self._done_bytes: deque = deque()   # (ts, bytes)
+        self._last_sig = signals() if signals else {}
+
+    # ---------- sinyal ----------
+    def _feed(self, ok: bool) -> None:
+        # dipanggil dengan self._cond dipegang
+        before = self.limit.slots
+        now = time.monotonic()
+        sig = self.signals() if self.signals else {}
+        new_403 = sig.get("n_403", 0) - self._last_sig.get("n_403", 0)
+        new_bytes = sig.get("bytes", 0) - self._last_sig.get("bytes", 0)
+        self._last_sig = sig
+        self._recent.append(ok)
+
+        if new_bytes > 0:
+            self._done_bytes.append((now, new_bytes))
+        while self._done_bytes and now - self._done_bytes[0][0] > self.tput_window:
+            self._done_bytes.popleft()
+
+        rate_ok = sum(self._recent) / len(self._recent)
+        if new_403 > 0 or (len(self._recent) == self._recent.maxlen and rate_ok < self.min_success_rate):
+            if self.limit.on_congestion():
+                self._recent.clear()
+                self._done_bytes.clear()
+        else:
+            if ok:
+                self.limit.on_success()
+            if len(self._done_bytes) >= 2:
+                span = max(now - self._done_bytes[0][0], 1.0)
+                self.limit.on_throughput(before, sum(b for _, b in self._done_bytes) / span)
+
+        if self.limit.slots != before:
+            self._cond.notify_all()
+            if self.on_change:
+                try:
+                    self.on_change(self.limit.slots)
+                except Exception:
+                    pass
+
+    # ---------- worker ----------
+    def _worker(self, fn: Callable[[Any], Any], out: "queue.Queue") -> None:
+        while True:
+            with self._cond:
+                while not self._stop and self._heap and self._active >= self.limit.slots:
+                    self._cond.wait(0.5)
+                if self._stop or not self._heap:
+                    return
+                _, _, payload = heapq.heappop(self._heap)
+                self._active += 1
+            res, err = None, None
+            try:
+                res = fn(payload)
+            except BaseException as e:  # diteruskan ke konsumen
+                err = e
+            with self._cond:
+                self._active -= 1
+                self._feed(err is None and bool(res))
+                self._cond.notify_all()
+            out.put((payload, res, err))
+
+    def run(self, jobs: Iterable[Tuple[Any, Any]], fn: Callable[[Any], Any]) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+        jobs = list(jobs)
+        out: "queue.Queue" = queue.Queue()
+        with self._cond:
+            self._stop = False
+            for seq, (prio, payload) in enumerate(jobs):
+                heapq.heappush(self._heap, (prio, seq, payload))
+        n_threads = min(self.limit.max_limit, len(jobs))
+        for i in range(n_threads):
+            threading.Thread(target=self._worker, args=(fn, out), name=f"dl-{i}", daemon=True).start()
+        try:
+            for _ in range(len(jobs)):
+                yield out.get()
+        finally:
+            # konsumen berhenti lebih awal (Ctrl+C) -> job yang belum jalan dibatalkan
+            with self._cond:
+                self._stop = True
+                self._heap.clear()
+                self._cond.notify_all()
@@ -1,6 +1,7 @@
-import os
 import re, unicodedata
 
+from .folder_index import get_folder_index
+
 __all__ = [
     "get_existing_index",
     "sanitize_filename",
@@ -21,9 +22,8 @@ def _ascii_only(s: str) -> str:
     return s or "untitled"
 
 def get_existing_index(output_path: str) -> int:
-    files = os.listdir(output_path)
-    indexes = [int(f.split(' - ')[0]) for f in files if f.split(' - ')[0].isdigit()]
-    return max(indexes, default=0)
+    # FolderIndex: cukup stat folder kalau tidak ada yang berubah sejak scan terakhir
+    return get_folder_index(output_path, sync=True).max_index()
 
 
 
@@ -48,16 +48,7 @@ def validate_filename(filename: str) -> bool:
 
 
 def get_unique_filename(base_path: str, filename: str) -> str:
-    candidate = os.path.join(base_path, filename)
-    if not os.path.exists(candidate):
-        return filename
-    name, ext = os.path.splitext(filename)
-    counter = 1
-    while True:
-        new_filename = f"{name}_{counter}{ext}"
-        if not os.path.exists(os.path.join(base_path, new_filename)):
-            return new_filename
-        counter += 1
+    return get_folder_index(base_path).unique_name(filename)
 
 
 def normalize_upload_date(upload_date: str | None) -> str | None:
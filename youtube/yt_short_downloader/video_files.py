@@ -0,0 +1,258 @@
+# yt_short_downloader/video_files.py
+"""
+Reverse index video_id -> (mp4, txt, channel) untuk folder output.
+
+- Sumber utama: baris ``Link:`` (dan ``YouTube:`` untuk channel) di file
+  caption .txt yang ditulis downloader. File tanpa .txt tetap masuk kalau
+  ID-nya ada di nama file ("... - <id>.mp4", "video_<id>", "[<id>]").
+- Disimpan di SQLite (data/video_files.db). refresh(root) hanya membuka
+  folder yang mtime-nya berubah sejak refresh terakhir, dan hanya membaca
+  ulang .txt yang (size, mtime) berubah.
+- downloader memanggil record() saat caption / video selesai ditulis, dan
+  record_replaced() saat post-process mengganti file video (convert/upscale),
+  jadi index ikut ter-update tanpa menunggu refresh.
+Dipakai retry_skipped.py, sort.py dan repair_db.py.
+"""
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from .folder_index import get_folder_index, ids_from_name, walk_folder_indexes
+
+__all__ = ["VideoFileIndex", "get_video_file_index", "parse_caption_file", "record_replaced"]
+
+INDEX_PATH = os.path.join(os.getcwd(), "data", "video_files.db")
+
+_LINK_PATTERNS = (
+    re.compile(r"[?&]v=([A-Za-z0-9_-]{11})"),
+    re.compile(r"youtu\.be/([A-Za-z0-9_-]{11})"),
+    re.compile(r"/shorts/([A-Za-z0-9_-]{11})"),
+)
+
+
+def parse_caption_file(txt_path: str) -> Tuple[Optional[str], Optional[str]]:
+    """(video_id, channel) dari baris 'Link:' / 'YouTube:' di caption .txt."""
+    vid, channel = None, None
+    try:
+        with open(txt_path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                low = line.lower()
+                if low.startswith("youtube:"):
+                    channel = line.split(":", 1)[-1].strip() or None
+                elif low.startswith("link:"):
+                    url = line.split(":", 1)[-1].strip()
+                    for pat in _LINK_PATTERNS:
+                        m = pat.search(url)
+                        if m:
+                            vid = m.group(1)
+                            break
+                    if vid:
+                        break
+    except OSError:
+        pass
+    return vid, channel
+
+
+def _stat(path: str) -> Tuple[int, int]:
+    try:
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+    except OSError:
+        return -1, -1
+
+
+class VideoFileIndex:
+    """Tabel files (satu baris per .txt, atau per video bila tanpa .txt)."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or INDEX_PATH
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                dir TEXT,
+                txt TEXT,
+                mp4 TEXT,
+                video_id TEXT,
+                channel TEXT,
+                size INTEGER,
+                mtime_ns INTEGER
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_files_video_id ON files(video_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_files_dir ON files(dir)")
+        conn.execute("CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime_ns INTEGER)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    # ---------- build / refresh ----------
+    def _index_dir(self, fidx, stats: Dict[str, int]) -> None:
+        conn = self._conn()
+        known = {row[0]: row[1:] for row in conn.execute(
+            "SELECT path, size, mtime_ns, video_id, channel FROM files WHERE dir=?", (fidx.path,))}
+        rows = []
+        for base, pair in fidx.pairs().items():
+            txt = os.path.join(fidx.path, pair["txt"]) if pair["txt"] else None
+            mp4 = os.path.join(fidx.path, pair["video"]) if pair["video"] else None
+            vid = channel = None
+            if txt:
+                size, mtime = _stat(txt)
+                old = known.get(txt)
+                if old and old[0] == size and old[1] == mtime:
+                    vid, channel = old[2], old[3]
+                else:
+                    vid, channel = parse_caption_file(txt)
+                    stats["parsed"] += 1
+                if vid:
+                    rows.append((txt, fidx.path, txt, mp4, vid, channel, size, mtime))
+                    continue
+            if mp4:
+                for name_id in ids_from_name(pair["video"]):
+                    rows.append((mp4, fidx.path, txt, mp4, name_id, None, 0, 0))
+        with conn:
+            conn.execute("BEGIN")
+            conn.execute("DELETE FROM files WHERE dir=?", (fidx.path,))
+            conn.executemany("INSERT OR REPLACE INTO files VALUES(?,?,?,?,?,?,?,?)", rows)
+            conn.execute("INSERT OR REPLACE INTO dirs(path, mtime_ns) VALUES(?,?)",
+                         (fidx.path, fidx.mtime))
+
+    def refresh(self, root: str) -> Dict[str, int]:
+        """
+        Samakan index dengan folder `root` (rekursif). Folder yang mtime-nya
+        sama dengan refresh sebelumnya dilewati tanpa membaca file apa pun.
+        """
+        stats = {"dirs": 0, "skipped": 0, "parsed": 0, "removed": 0}
+        root = os.path.abspath(root)
+        conn = self._conn()
+        seen: Set[str] = set()
+        for fidx in walk_folder_indexes(root):
+            seen.add(fidx.path)
+            stats["dirs"] += 1
+            row = conn.execute("SELECT mtime_ns FROM dirs WHERE path=?", (fidx.path,)).fetchone()
+            if row and fidx.mtime is not None and row[0] == fidx.mtime:
+                stats["skipped"] += 1
+                continue
+            self._index_dir(fidx, stats)
+        # folder yang sudah hilang di bawah root
+        gone = [d for (d,) in conn.execute("SELECT path FROM dirs") if self._under(d, root) and d not in seen]
+        with conn:
+            conn.execute("BEGIN")
+            for d in gone:
+                stats["removed"] += conn.execute("DELETE FROM files WHERE dir=?", (d,)).rowcount
+                conn.execute("DELETE FROM dirs WHERE path=?", (d,))
+        return stats
+
+    @staticmethod
+    def _under(path: str, root: str) -> bool:
+        return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+    def record(self, video_id: str, txt: Optional[str] = None, mp4: Optional[str] = None,
+               channel: Optional[str] = None) -> None:
+        """Update incremental dari downloader (caption / video baru)."""
+        key = txt or mp4
+        if not (video_id and key):
+            return
+        key = os.path.abspath(key)
+        size, mtime = _stat(key) if txt else (0, 0)
+        conn = self._conn()
+        with conn:
+            conn.execute("""
+                INSERT INTO files(path,dir,txt,mp4,video_id,channel,size,mtime_ns) VALUES(?,?,?,?,?,?,?,?)
+                ON CONFLICT(path) DO UPDATE SET
+                    mp4=COALESCE(excluded.mp4, files.mp4),
+                    channel=COALESCE(excluded.channel, files.channel),
+                    video_id=excluded.video_id, size=excluded.size, mtime_ns=excluded.mtime_ns
+            """, (key, os.path.dirname(key), os.path.abspath(txt) if txt else None,
+                  os.path.abspath(mp4) if mp4 else None, video_id, channel, size, mtime))
+
+    def replace_file(self, old: str, new: str) -> None:
+        """File video `old` diganti `new` (post-process): pindahkan entry-nya."""
+        old, new = os.path.abspath(old), os.path.abspath(new)
+        if old == new:
+            return
+        conn = self._conn()
+        with conn:
+            conn.execute("UPDATE files SET mp4=? WHERE mp4=?", (new, old))
+            # video tanpa caption: barisnya di-key dengan path video itu sendiri
+            conn.execute("UPDATE OR REPLACE files SET path=?, dir=? WHERE path=?",
+                         (new, os.path.dirname(new), old))
+
+    # ---------- lookup ----------
+    def lookup(self, video_id: str) -> List[Dict[str, Optional[str]]]:
+        rows = self._conn().execute(
+            "SELECT mp4, txt, channel FROM files WHERE video_id=?", (video_id,)).fetchall()
+        return [{"mp4": m, "txt": t, "channel": c} for m, t, c in rows]
+
+    def present_ids(self, root: Optional[str] = None, exts: Tuple[str, ...] = (".mp4",)) -> Set[str]:
+        """Video ID yang punya file video (ekstensi `exts`) di bawah root."""
+        root = os.path.abspath(root) if root else None
+        out = set()
+        for vid, mp4, d in self._conn().execute(
+                "SELECT video_id, mp4, dir FROM files WHERE mp4 IS NOT NULL"):
+            if mp4.lower().endswith(exts) and (root is None or self._under(d, root)):
+                out.add(vid)
+        return out
+
+    def captions_under(self, root: str) -> Dict[str, str]:
+        """video_id -> path .txt untuk semua caption di bawah root."""
+        root = os.path.abspath(root)
+        return {vid: txt for vid, txt, d in self._conn().execute(
+                    "SELECT video_id, txt, dir FROM files WHERE txt IS NOT NULL")
+                if self._under(d, root)}
+
+    def video_id_for(self, video_path: str) -> Optional[str]:
+        """Video ID untuk file video (lewat .txt pasangannya, lalu nama file)."""
+        txt = os.path.abspath(os.path.splitext(video_path)[0] + ".txt")
+        size, mtime = _stat(txt)
+        if size >= 0:
+            row = self._conn().execute(
+                "SELECT video_id, size, mtime_ns FROM files WHERE path=?", (txt,)).fetchone()
+            if row and row[1] == size and row[2] == mtime:
+                return row[0]
+            vid, channel = parse_caption_file(txt)
+            if vid:
+                self.record(vid, txt=txt, mp4=os.path.abspath(video_path), channel=channel)
+                return vid
+        ids = ids_from_name(os.path.basename(video_path))
+        return next(iter(sorted(ids)), None)
+
+
+_INDEX: Optional[VideoFileIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_video_file_index() -> VideoFileIndex:
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            _INDEX = VideoFileIndex()
+        return _INDEX
+
+
+def record_replaced(old: str, new: Optional[str]) -> None:
+    """
+    Post-process mengganti file video (nama/ekstensi baru, file lama dihapus):
+    update reverse index dan FolderIndex folder itu.
+    """
+    if not (old and new) or os.path.abspath(old) == os.path.abspath(new) or not os.path.exists(new):
+        return
+    get_video_file_index().replace_file(old, new)
+    fidx = get_folder_index(os.path.dirname(os.path.abspath(new)))
+    if os.path.exists(old):
+        fidx.add(new)
+    else:
+        fidx.rename(old, new)
@@ -0,0 +1,247 @@
+# yt_short_downloader/ytdlp_engine.py
+"""
+In-process yt-dlp engine.
+
+Menyimpan instance ``yt_dlp.YoutubeDL`` yang sudah "hangat" (extractor sudah
+di-init, player JS sudah di-cache) per thread worker, satu per profil
+player-client. Strategi download yang sama dengan jalur subprocess
+dijalankan lewat Python API, jadi tidak ada biaya start interpreter + import
+extractor tiap percobaan.
+
+Jalur subprocess (``downloader._run_yt_dlp``) tetap ada sebagai fallback
+crash-isolation: kalau engine ini error di luar ``DownloadError`` (bug/crash
+internal), pemanggil boleh mengulang strategi yang sama via subprocess.
+"""
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import yt_dlp
+    from yt_dlp.utils import DownloadError as _YtDlpDownloadError
+    YTDLP_AVAILABLE = True
+except Exception:  # yt-dlp hanya tersedia sebagai executable
+    yt_dlp = None
+    _YtDlpDownloadError = None
+    YTDLP_AVAILABLE = False
+
+__all__ = [
+    "YTDLP_AVAILABLE",
+    "EngineDownloadError",
+    "EngineTimeout",
+    "InProcessEngine",
+    "get_engine",
+    "strategy_cli_args",
+    "strategy_profile",
+]
+
+_UA = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+       "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+
+
+class EngineDownloadError(Exception):
+    """yt-dlp melaporkan kegagalan download (403, format tidak ada, dst)."""
+
+
+class EngineTimeout(EngineDownloadError):
+    """Strategi melewati batas waktu (padanan subprocess timeout)."""
+
+
+# ---------- strategy translation ----------
+# Satu strategi = dict:
+#   name, format, player_client (opsional), force_ipv4, concurrent_fragments,
+#   cookies_from_browser, rm_cache, info (info dict ter-cache, opsional)
+
+def strategy_cli_args(strat: Dict[str, Any]) -> List[str]:
+    """Strategi -> argumen CLI yt-dlp (untuk jalur subprocess)."""
+    args: List[str] = ['-f', strat["format"]]
+    if strat.get("player_client"):
+        args += ['--extractor-args', f'youtube:player_client={strat["player_client"]}']
+    if strat.get("rm_cache"):
+        args += ['--rm-cache-dir']
+    if strat.get("cookies_from_browser"):
+        args += ['--cookies-from-browser', strat["cookies_from_browser"]]
+    if strat.get("force_ipv4"):
+        args += ['--force-ipv4']
+    if strat.get("concurrent_fragments"):
+        args += ['-N', str(strat["concurrent_fragments"])]
+    return args
+
+
+def strategy_profile(strat: Dict[str, Any]) -> Tuple:
+    """
+    Kunci profil instance YoutubeDL. Format & output path berubah per
+    panggilan, jadi tidak ikut; yang ikut hanya opsi yang mempengaruhi
+    extractor/network.
+    """
+    return (
+        strat.get("player_client") or "",
+        bool(strat.get("force_ipv4")),
+        int(strat.get("concurrent_fragments") or 0),
+        strat.get("cookies_from_browser") or "",
+    )
+
+
+def _base_ydl_opts() -> Dict[str, Any]:
+    # Padanan downloader._base_args() untuk Python API
+    return {
+        'quiet': True,
+        'no_warnings': True,
+        'noprogress': True,
+        'nocheckcertificate': True,
+        'noplaylist': True,
+        'geo_bypass': True,
+        'cachedir': False,
+        'retries': 3,
+        'fragment_retries': 3,
+        'retry_sleep_functions': {'http': lambda n: 5, 'fragment': lambda n: 5},
+        # read yang macet (extract maupun download) gagal setelah 30 detik;
+        # batas total per strategi dijaga watchdog di InProcessEngine.download
+        'socket_timeout': 30,
+        'http_headers': {
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Referer': 'https://www.youtube.com/',
+            'User-Agent': _UA,
+        },
+    }
+
+
+def _profile_opts(profile: Tuple) -> Dict[str, Any]:
+    client, ipv4, n_frag, cookies_browser = profile
+    opts = _base_ydl_opts()
+    if client:
+        opts['extractor_args'] = {'youtube': {'player_client': client.split(',')}}
+    if ipv4:
+        opts['source_address'] = '0.0.0.0'
+    if n_frag:
+        opts['concurrent_fragment_downloads'] = n_frag
+    if cookies_browser:
+        opts['cookiesfrombrowser'] = (cookies_browser,)
+    return opts
+
+
+# ---------- engine ----------
+
+class InProcessEngine:
+    """
+    Pool YoutubeDL per-thread, per-profil.
+
+    YoutubeDL tidak thread-safe, jadi tiap thread worker punya set instance
+    sendiri (threading.local). Dengan max_workers=3 dan ~6 profil, paling
+    banyak ~18 instance hidup selama proses berjalan.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def available(self) -> bool:
+        return YTDLP_AVAILABLE
+
+    def _instances(self) -> Dict[Tuple, Any]:
+        inst = getattr(self._local, "instances", None)
+        if inst is None:
+            inst = self._local.instances = {}
+        return inst
+
+    def _get(self, profile: Tuple):
+        inst = self._instances()
+        ydl = inst.get(profile)
+        if ydl is None:
+            ydl = yt_dlp.YoutubeDL(_profile_opts(profile))
+            ydl._engine_deadline = None
+            watchdog = lambda _d, _ydl=ydl: self._check_deadline(_ydl)
+            ydl.add_progress_hook(watchdog)
+            ydl.add_postprocessor_hook(watchdog)
+            inst[profile] = ydl
+        return ydl
+
+    @staticmethod
+    def _check_deadline(ydl) -> None:
+        # dipanggil yt-dlp tiap progress (juga dari thread fragment);
+        # exception dari hook membatalkan download yang sedang jalan
+        deadline = getattr(ydl, "_engine_deadline", None)
+        if deadline is not None and time.monotonic() > deadline[0]:
+            raise EngineTimeout(f"in-process download timed out after {deadline[1]}s")
+
+    def evict(self, strat: Dict[str, Any]) -> None:
+        """Buang instance profil ini (dipakai setelah crash internal)."""
+        ydl = self._instances().pop(strategy_profile(strat), None)
+        if ydl is not None:
+            try:
+                ydl.close()
+            except Exception:
+                pass
+
+    def download(self, strat: Dict[str, Any], video_url: str, out_template: str, tmp_dir: str,
+                 timeout: Optional[float] = None) -> None:
+        """
+        Jalankan satu strategi. Raise EngineDownloadError kalau yt-dlp
+        menolak/gagal (EngineTimeout kalau lewat `timeout` detik); exception
+        lain berarti crash engine.
+        rm_cache: instance profil dibuang dulu, jadi player JS/signature
+        di-extract ulang (padanan --rm-cache-dir; cachedir disk memang mati).
+        """
+        if not YTDLP_AVAILABLE:
+            raise RuntimeError("yt_dlp module not importable")
+        if strat.get("rm_cache"):
+            self.evict(strat)
+        ydl = self._get(strategy_profile(strat))
+
+        # Opsi per-panggilan: format, output, temp path
+        fmt = strat["format"]
+        if ydl.params.get('format') != fmt:
+            ydl.params['format'] = fmt
+            ydl.format_selector = ydl.build_format_selector(fmt)
+        ydl.params['outtmpl']['default'] = out_template
+        ydl.params['paths'] = {'temp': tmp_dir}
+
+        ydl._engine_deadline = (time.monotonic() + timeout, timeout) if timeout else None
+        try:
+            if strat.get("info"):
+                # Info dari format_cache: lewati extract, langsung seleksi + download
+                ydl.process_ie_result(copy.deepcopy(strat["info"]), download=True)
+            else:
+                ydl.extract_info(video_url, download=True)
+            self._check_deadline(ydl)
+        except EngineTimeout:
+            # instance bisa tertinggal di tengah download -> jangan dipakai lagi
+            self.evict(strat)
+            raise
+        except _YtDlpDownloadError as e:
+            if isinstance(getattr(e, "exc_info", (None, None))[1], EngineTimeout):
+                self.evict(strat)
+                raise e.exc_info[1] from e
+            raise EngineDownloadError(str(e)) from e
+        finally:
+            ydl._engine_deadline = None
+
+    def extract_info(self, player_client: str, video_url: str) -> Optional[Dict[str, Any]]:
+        """
+        Metadata-only untuk satu player_client (process=False -> tanpa
+        seleksi format, tanpa download). Hasil sudah di-sanitize sehingga
+        bisa di-JSON-kan (format_cache) dan diproses ulang oleh download().
+        """
+        if not YTDLP_AVAILABLE:
+            raise RuntimeError("yt_dlp module not importable")
+        ydl = self._get((player_client, False, 0, ""))
+        try:
+            info = ydl.extract_info(video_url, download=False, process=False)
+        except _YtDlpDownloadError as e:
+            raise EngineDownloadError(str(e)) from e
+        return ydl.sanitize_info(info) if info else None
+
+
+_ENGINE: Optional[InProcessEngine] = None
+_ENGINE_LOCK = threading.Lock()
+
+def get_engine() -> InProcessEngine:
+    """Engine bersama untuk satu proses (instance YoutubeDL tetap per-thread)."""
+    global _ENGINE
+    with _ENGINE_LOCK:
+        if _ENGINE is None:
+            _ENGINE = InProcessEngine()
+        return _ENGINE
@@ -1,11 +1,17 @@
 import json
 import os
 import subprocess
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+from .format_cache import SHAPE_PROCESSED, get_format_cache
+from .probe import probe_media
 
 __all__ = [
     "check_yt_dlp_installation",
+    "fetch_info_json",
+    "get_video_info",
     "get_available_formats",
+    "score_formats",
     "detect_best_hd_selector",
     "probe_resolution",
     "probe_resolution_bitrate",
@@ -27,7 +33,7 @@ def check_yt_dlp_installation() -> bool:
     except Exception:
         return False
 
-def get_available_formats(video_url: str, extractor_args: Optional[str]=None) -> Optional[List[Dict[str,Any]]]:
+def fetch_info_json(video_url: str, extractor_args: Optional[str]=None) -> Optional[Dict[str,Any]]:
     try:
         cmd = ['yt-dlp', '-J', '--no-warnings', '--quiet', '--no-check-certificates', video_url]
         if extractor_args:
@@ -36,10 +42,33 @@ def get_available_formats(video_url: str, extractor_args: Optional[str]=None) ->
             text=True, timeout=60, encoding='utf-8', errors='replace')
         if r.returncode != 0 or not r.stdout.strip():
             return None
-        data = json.loads(r.stdout)
-        return data.get('formats') or []
+        return json.loads(r.stdout)
+    except Exception:
+        return None
+
+def get_video_info(video_url: str, extractor_args: Optional[str]=None,
+                   fetch: Optional[Callable[[], Optional[Dict[str,Any]]]]=None,
+                   use_cache: bool=True, shape: str=SHAPE_PROCESSED) -> Optional[Dict[str,Any]]:
+    """
+    Info lengkap (setara `yt-dlp -J`) lewat cache on-disk per (video_id, client, shape).
+    `fetch` opsional untuk mengganti sumber (mis. engine in-process);
+    default-nya subprocess `yt-dlp -J`. `shape` = bentuk hasil `fetch`
+    (SHAPE_RAW untuk engine in-process).
+    """
+    fetch = fetch or (lambda: fetch_info_json(video_url, extractor_args))
+    if not use_cache:
+        return fetch()
+    try:
+        cache = get_format_cache()
     except Exception:
+        return fetch()
+    return cache.get_or_fetch(video_url, extractor_args or "", fetch, shape)
+
+def get_available_formats(video_url: str, extractor_args: Optional[str]=None) -> Optional[List[Dict[str,Any]]]:
+    data = get_video_info(video_url, extractor_args)
+    if data is None:
         return None
+    return data.get('formats') or []
 
 # ---------- HD scanner (multi-client) ----------
 
@@ -52,6 +81,66 @@ _CLIENTS = [
     "youtube:player_client=web;formats=incomplete",
 ]
 
+def _rank_codec(v: str) -> int:
+    vv = (v or "").lower()
+    # USER REQUEST: Prefer H.264/AVC for compatibility
+    if "h264" in vv or "avc1" in vv: return 3
+    if "vp9" in vv: return 2
+    if "av01" in vv or "av1" in vv: return 1
+    return 0
+
+def score_formats(fmts: List[Dict[str,Any]], min_height: int = 1080) -> Optional[Tuple[float, str, int]]:
+    """
+    Pilih pasangan <video+audio> terbaik (≥ min_height) dari daftar format
+    SATU player_client. Return (score, selector format_id, height) atau None.
+    Urutan skor: height >> fps >> codec (h264>vp9>av1) >> tbr.
+    """
+    best: Optional[Tuple[float, str, int]] = None
+
+    vids: List[Tuple[float, Dict[str,Any]]] = []
+    auds: List[Tuple[float, Dict[str,Any]]] = []
+    progs: List[Tuple[float, Dict[str,Any]]] = []
+
+    for f in fmts:
+        vcodec = f.get('vcodec')
+        acodec = f.get('acodec')
+        h      = int(f.get('height') or 0)
+        fps    = int(f.get('fps') or 0)
+        tbr    = float(f.get('tbr') or 0.0)
+
+        if vcodec and vcodec != 'none' and (not acodec or acodec == 'none'):
+            score = h*10000 + fps*100 + _rank_codec(vcodec)*50 + tbr
+            vids.append((score, f))
+        elif acodec and acodec != 'none' and (not vcodec or vcodec == 'none'):
+            score = float(f.get('abr') or 0.0)
+            auds.append((score, f))
+        elif vcodec and vcodec != 'none' and acodec and acodec != 'none':
+            score = h*10000 + fps*100 + _rank_codec(vcodec)*50 + tbr
+            progs.append((score, f))
+
+    vids.sort(key=lambda x:x[0], reverse=True)
+    auds.sort(key=lambda x:x[0], reverse=True)
+    progs.sort(key=lambda x:x[0], reverse=True)
+
+    # 1) prefer video-only ≥ min_height + audio terbaik
+    a_id = str(auds[0][1].get('format_id', "")) if auds else ""
+    if a_id:
+        for score, vf in vids:
+            h = int(vf.get('height') or 0)
+            if h >= min_height:
+                pair_score = score + auds[0][0]
+                if (best is None) or (pair_score > best[0]):
+                    best = (pair_score, f"{vf.get('format_id')}+{a_id}", h)
+
+    # 2) fallback progressive ≥ min_height
+    for score, pf in progs:
+        h = int(pf.get('height') or 0)
+        if h >= min_height:
+            if (best is None) or (score > best[0]):
+                best = (score, str(pf.get('format_id')), h)
+
+    return best
+
 def detect_best_hd_selector(
     video_url: str,
     min_height: int = 1080,
@@ -60,106 +149,33 @@ def detect_best_hd_selector(
     """
     Cari kombinasi <video+audio> TERBAIK (≥ min_height).
     - Sapu beberapa player_client (android/web/ios/tv) + formats=incomplete.
-    - Bangun selector berdasar format_id spesifik.
-    - Urutan skor: height >> fps >> codec (av1>vp9>h264) >> tbr.
+    - Bangun selector berdasar format_id spesifik (lihat score_formats).
     """
-    best_pair: Optional[Tuple[float, str]] = None
-
-    def rank_codec(v: str) -> int:
-        vv = (v or "").lower()
-        # USER REQUEST: Prefer H.264/AVC for compatibility
-        if "h264" in vv or "avc1" in vv: return 3
-        if "vp9" in vv: return 2
-        if "av01" in vv or "av1" in vv: return 1
-        return 0
+    best_pair: Optional[Tuple[float, str, int]] = None
 
     for extargs in _CLIENTS:
         fmts = get_available_formats(video_url, extractor_args=extargs)
         if not fmts: 
             continue
-
-        vids: List[Tuple[float, Dict[str,Any]]] = []
-        auds: List[Tuple[float, Dict[str,Any]]] = []
-        progs: List[Tuple[float, Dict[str,Any]]] = []
-
-        for f in fmts:
-            vcodec = f.get('vcodec')
-            acodec = f.get('acodec')
-            fid    = str(f.get('format_id'))
-            h      = int(f.get('height') or 0)
-            fps    = int(f.get('fps') or 0)
-            tbr    = float(f.get('tbr') or 0.0)
-
-            if vcodec and vcodec != 'none' and (not acodec or acodec == 'none'):
-                score = h*10000 + fps*100 + rank_codec(vcodec)*50 + tbr
-                vids.append((score, f))
-            elif acodec and acodec != 'none' and (not vcodec or vcodec == 'none'):
-                score = float(f.get('abr') or 0.0)
-                auds.append((score, f))
-            elif vcodec and vcodec != 'none' and acodec and acodec != 'none':
-                score = h*10000 + fps*100 + rank_codec(vcodec)*50 + tbr
-                progs.append((score, f))
-
-        vids.sort(key=lambda x:x[0], reverse=True)
-        auds.sort(key=lambda x:x[0], reverse=True)
-        progs.sort(key=lambda x:x[0], reverse=True)
-
-        # 1) prefer video-only ≥ min_height + audio terbaik
-        for score, vf in vids:
-            if int(vf.get('height') or 0) >= min_height:
-                v_id = str(vf.get('format_id'))
-                a_id = str((auds[0][1] if auds else {}).get('format_id', "")) if auds else ""
-                if a_id:
-                    sel = f"{v_id}+{a_id}"
-                    pair_score = score + (auds[0][0] if auds else 0.0)
-                    if (best_pair is None) or (pair_score > best_pair[0]):
-                        best_pair = (pair_score, sel)
-                else:
-                    # tidak ada audio terpisah; coba progressive ≥ min_height
-                    pass
-
-        # 2) fallback progressive ≥ min_height
-        for score, pf in progs:
-            if int(pf.get('height') or 0) >= min_height:
-                sel = str(pf.get('format_id'))
-                if (best_pair is None) or (score > best_pair[0]):
-                    best_pair = (score, sel)
+        cand = score_formats(fmts, min_height)
+        if cand and ((best_pair is None) or (cand[0] > best_pair[0])):
+            best_pair = cand
 
     return best_pair[1] if best_pair else None
 
 # ---------- ffprobe/ffmpeg helpers ----------
 
 def probe_resolution(filepath: str) -> Optional[Tuple[int, int]]:
-    try:
-        r = subprocess.run(
-            ['ffprobe','-v','error','-select_streams','v:0',
-             '-show_entries','stream=width,height','-of','csv=p=0', filepath],
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-            text=True, timeout=20, encoding='utf-8', errors='replace'
-        )
-        if r.returncode != 0 or not r.stdout.strip():
-            return None
-        w,h = r.stdout.strip().split(',')
-        return int(w), int(h)
-    except Exception:
+    rec = probe_media(filepath)
+    if not rec or not (rec["w"] and rec["h"]):
         return None
+    return rec["w"], rec["h"]
 
 def probe_resolution_bitrate(filepath: str) -> Optional[Tuple[int,int,int]]:
-    try:
-        r = subprocess.run(
-            ['ffprobe','-v','error','-select_streams','v:0',
-             '-show_entries','stream=width,height,bit_rate','-of','csv=p=0', filepath],
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-            text=True, timeout=20, encoding='utf-8', errors='replace'
-        )
-        if r.returncode != 0 or not r.stdout.strip():
-            return None
-        parts = r.stdout.strip().split(',')
-        w,h = int(parts[0]), int(parts[1])
-        br = int(parts[2])//1000 if len(parts)>2 and parts[2].isdigit() else 0
-        return w,h,br
-    except Exception:
+    rec = probe_media(filepath)
+    if not rec or not (rec["w"] and rec["h"]):
         return None
+    return rec["w"], rec["h"], rec["bitrate"]
 
 def _has_ffmpeg_sr_filter() -> bool:
     try: